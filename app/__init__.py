@@ -1,14 +1,57 @@
 # app/__init__.py
 import os
-from flask import Flask, jsonify
+import time
+_IMPORT_T0 = time.perf_counter()   # worker boot = importing this package + create_app()
+
+from flask import Flask, current_app, jsonify
 from sqlalchemy import event, text
 from dotenv import load_dotenv
 
+# before the app modules below: sql_trace, profiling and warmup read their PQP_*
+# settings at import, and gunicorn doesn't load .env itself
+load_dotenv(override=True)
+
 from .extensions import db, migrate  # shared instances
+from .sql_trace import init_sql_trace
+from . import metrics
+from .metrics import init_metrics
+from .profiling import install_profiler
+from .warmup import init_warmup
+
+_ORG_ID_PROBE = text("""
+    SELECT
+      EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema='pqp' AND table_name='project' AND column_name='org_id'
+      )
+      AND
+      EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema='pqp' AND table_name='checklist_item' AND column_name='org_id'
+      )
+""")
+
+
+def has_org_id(app=None) -> bool:
+    """
+    Do the SaaS org_id columns exist? Probed on first use rather than in
+    create_app() (the warm-up does it when enabled), then kept in
+    app.config["HAS_ORG_ID"]. Missing tables or a failed probe count as no.
+    """
+    app = app or current_app
+    val = app.config.get("HAS_ORG_ID")
+    if val is None:
+        try:
+            with db.engine.connect() as conn:   # own connection: never poisons the request session
+                val = bool(conn.execute(_ORG_ID_PROBE).scalar())
+        except Exception:
+            val = False
+        app.config["HAS_ORG_ID"] = val
+    return val
 
-load_dotenv(override=True)
 
 def create_app():
+    t_create = time.perf_counter()
     app = Flask(__name__)
 
     # ---- DB config ----
@@ -19,6 +62,7 @@ def create_app():
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
     # Helpful with Supabase pooler
     app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", {"pool_pre_ping": True})
+    app.config["HAS_ORG_ID"] = None   # probed on first use, see has_org_id()
 
     db.init_app(app)
     migrate.init_app(app, db)
@@ -31,33 +75,24 @@ def create_app():
             cur.close()
         event.listen(db.engine, "connect", _set_search_path)
 
-        # Optional: detect org_id presence without crashing if tables are missing
-        try:
-            has_org_id = db.session.execute(text("""
-                SELECT
-                  EXISTS (
-                    SELECT 1 FROM information_schema.columns
-                    WHERE table_schema='pqp' AND table_name='project' AND column_name='org_id'
-                  )
-                  AND
-                  EXISTS (
-                    SELECT 1 FROM information_schema.columns
-                    WHERE table_schema='pqp' AND table_name='checklist_item' AND column_name='org_id'
-                  )
-            """)).scalar()
-        except Exception:
-            has_org_id = False
-        app.config["HAS_ORG_ID"] = bool(has_org_id)
+        # per-request query count / db time / N+1 flags (Server-Timing + log line)
+        init_sql_trace(app, db.engine)
+        # Prometheus /metrics (latency, pool, imports, exports, caches)
+        init_metrics(app, db.engine)
 
     # Lightweight DB health
     @app.get("/api/pqp/health/db")
     def health_db():
         sp = db.session.execute(text("SELECT current_setting('search_path')")).scalar()
-        return jsonify(ok=True, search_path=sp, has_org_id=app.config["HAS_ORG_ID"])
+        return jsonify(ok=True, search_path=sp, has_org_id=has_org_id(app))
 
     # ---- Blueprints (register ONLY inside the factory) ----
     # app/pqp/__init__.py should NOT register anything at import time.
     from app.pqp import pqp_bp, pqp_api_bp, risk_api_bp  # risk_api_bp may be None if not present
+    from app.pqp import registry
+    registry.check(app.logger)   # section declarations: fail the boot, not each request
+    from app.pqp.project_summary import init_project_summary
+    init_project_summary(db.session)   # section writes keep pqp.project_summaries current
 
     app.register_blueprint(pqp_bp)
     app.register_blueprint(pqp_api_bp)
@@ -67,4 +102,15 @@ def create_app():
     from .routes_root import root_bp
     app.register_blueprint(root_bp)
 
+    # per-request cProfile / stack sampling on demand (not installed unless PQP_PROFILING=1)
+    install_profiler(app)
+
+    # reflection, schema caches, templates... before the first request (PQP_WARMUP=1)
+    with app.app_context():
+        init_warmup(app, db.engine)
+
+    t_done = time.perf_counter()
+    metrics.observe_boot(t_create - _IMPORT_T0, t_done - t_create)
+    app.logger.info("boot: imports %.0f ms, create_app %.0f ms (pid %s)",
+                    (t_create - _IMPORT_T0) * 1000, (t_done - t_create) * 1000, os.getpid())
     return app
@@ -0,0 +1,161 @@
+# app/metrics.py
+"""
+Prometheus metrics, scraped from GET /metrics.
+
+Under gunicorn every worker is its own process, so values go through
+prometheus_client's multiprocess mode: set PROMETHEUS_MULTIPROC_DIR (the
+bundled gunicorn.conf.py does, and wipes it on start) and each scrape
+merges all workers' files. Without it the registry is per process, which is
+fine for `flask run`.
+
+What is recorded:
+  pqp_http_request_duration_seconds{endpoint,method,status}   histogram
+  pqp_db_queries_per_request{endpoint}, pqp_db_seconds_per_request{endpoint}
+  pqp_db_pool_checked_out / pqp_db_pool_overflow / pqp_db_pool_size  (live workers summed)
+  pqp_import_duration_seconds{kind}, pqp_import_rows_total{kind},
+  pqp_import_rows_per_second{kind}, pqp_import_bytes_total{kind}
+  pqp_export_bytes_total{endpoint}        attachment responses
+  pqp_cache_requests_total{cache,result}  hit / miss (ratio = hit / total)
+  pqp_section_lock_wait_seconds, pqp_section_lock_timeouts_total
+  pqp_worker_boot_seconds{phase}         import / create_app (incl. warm-up) / total
+
+prometheus_client is optional: without it every helper is a no-op and
+/metrics answers 503. METRICS_TOKEN, when set, must be sent as a Bearer token.
+"""
+from __future__ import annotations
+
+import os
+import time
+
+try:
+    import prometheus_client as prom
+    from prometheus_client import multiprocess
+except ImportError:                           # metrics are optional
+    prom = None
+
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR") or os.getenv("prometheus_multiproc_dir")
+
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+class _Noop:
+    def labels(self, *a, **kw):
+        return self
+
+    def observe(self, *a, **kw):
+        pass
+
+    def inc(self, *a, **kw):
+        pass
+
+    def set(self, *a, **kw):
+        pass
+
+
+if prom is not None:
+    REQUEST_SECONDS = prom.Histogram("pqp_http_request_duration_seconds", "Request latency",
+                                     ["endpoint", "method", "status"], buckets=_LATENCY_BUCKETS)
+    DB_QUERIES = prom.Histogram("pqp_db_queries_per_request", "SQL statements per request",
+                                ["endpoint"], buckets=(1, 2, 5, 10, 20, 50, 100, 250, 1000))
+    DB_SECONDS = prom.Histogram("pqp_db_seconds_per_request", "Time in SQL per request",
+                                ["endpoint"], buckets=_LATENCY_BUCKETS)
+    POOL_CHECKED_OUT = prom.Gauge("pqp_db_pool_checked_out", "Connections checked out",
+                                  multiprocess_mode="livesum")
+    POOL_OVERFLOW = prom.Gauge("pqp_db_pool_overflow", "Connections over pool_size",
+                               multiprocess_mode="livesum")
+    POOL_SIZE = prom.Gauge("pqp_db_pool_size", "Configured pool size", multiprocess_mode="livesum")
+    IMPORT_SECONDS = prom.Histogram("pqp_import_duration_seconds", "Import commit duration", ["kind"],
+                                    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300))
+    IMPORT_ROWS = prom.Counter("pqp_import_rows_total", "Rows written by imports", ["kind"])
+    IMPORT_RATE = prom.Histogram("pqp_import_rows_per_second", "Import throughput", ["kind"],
+                                 buckets=(100, 500, 1000, 5000, 10000, 50000, 100000))
+    IMPORT_BYTES = prom.Counter("pqp_import_bytes_total", "Bytes uploaded to imports", ["kind"])
+    EXPORT_BYTES = prom.Counter("pqp_export_bytes_total", "Bytes sent as attachments", ["endpoint"])
+    CACHE_REQUESTS = prom.Counter("pqp_cache_requests_total", "Cache lookups", ["cache", "result"])
+    LOCK_WAIT = prom.Histogram("pqp_section_lock_wait_seconds", "Section advisory lock wait",
+                               buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10))
+    LOCK_TIMEOUTS = prom.Counter("pqp_section_lock_timeouts_total", "Section lock timeouts")
+    BOOT_SECONDS = prom.Histogram("pqp_worker_boot_seconds", "Worker boot time", ["phase"],
+                                  buckets=(0.25, 0.5, 1, 2, 3, 5, 8, 13, 20, 30, 60))
+else:
+    REQUEST_SECONDS = DB_QUERIES = DB_SECONDS = POOL_CHECKED_OUT = POOL_OVERFLOW = POOL_SIZE = _Noop()
+    IMPORT_SECONDS = IMPORT_ROWS = IMPORT_RATE = IMPORT_BYTES = EXPORT_BYTES = _Noop()
+    CACHE_REQUESTS = LOCK_WAIT = LOCK_TIMEOUTS = BOOT_SECONDS = _Noop()
+
+
+# -------------------------- helpers for call sites --------------------------
+
+def observe_import(kind: str, seconds: float, rows: int, nbytes: int | None = None) -> None:
+    IMPORT_SECONDS.labels(kind).observe(seconds)
+    IMPORT_ROWS.labels(kind).inc(rows)
+    if seconds > 0 and rows:
+        IMPORT_RATE.labels(kind).observe(rows / seconds)
+    if nbytes:
+        IMPORT_BYTES.labels(kind).inc(nbytes)
+
+
+def cache_event(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def observe_lock_wait(waited_ms: float, timed_out: bool) -> None:
+    if timed_out:
+        LOCK_TIMEOUTS.inc()
+    else:
+        LOCK_WAIT.observe(waited_ms / 1000)
+
+
+def observe_boot(import_s: float, create_s: float) -> None:
+    BOOT_SECONDS.labels("import").observe(import_s)
+    BOOT_SECONDS.labels("create_app").observe(create_s)
+    BOOT_SECONDS.labels("total").observe(import_s + create_s)
+
+
+# -------------------------- wiring --------------------------
+
+def init_metrics(app, engine) -> None:
+    """Request hooks + GET /metrics."""
+    from flask import Response, g, request
+    from app.sql_trace import current_trace
+
+    @app.before_request
+    def _metrics_start():
+        g._metrics_t0 = time.perf_counter()
+
+    @app.after_request
+    def _metrics_finish(response):
+        t0 = g.pop("_metrics_t0", None)
+        if t0 is None or request.endpoint == "metrics":
+            return response
+        endpoint = request.endpoint or "unmatched"
+        REQUEST_SECONDS.labels(endpoint, request.method, str(response.status_code)).observe(
+            time.perf_counter() - t0)
+
+        tr = current_trace()
+        if tr is not None:
+            DB_QUERIES.labels(endpoint).observe(tr.queries)
+            DB_SECONDS.labels(endpoint).observe(tr.db_ms / 1000)
+
+        pool = engine.pool
+        if hasattr(pool, "checkedout"):
+            POOL_CHECKED_OUT.set(pool.checkedout())
+            POOL_OVERFLOW.set(max(0, pool.overflow()))
+            POOL_SIZE.set(pool.size())
+
+        if "attachment" in (response.headers.get("Content-Disposition") or "") and response.content_length:
+            EXPORT_BYTES.labels(endpoint).inc(response.content_length)
+        return response
+
+    @app.get("/metrics", endpoint="metrics")
+    def metrics():
+        if prom is None:
+            return Response("prometheus_client is not installed\n", status=503, mimetype="text/plain")
+        token = os.getenv("METRICS_TOKEN")
+        if token and request.headers.get("Authorization") != f"Bearer {token}":
+            return Response("unauthorized\n", status=401, mimetype="text/plain")
+        if MULTIPROC_DIR:
+            registry = prom.CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        else:
+            registry = prom.REGISTRY
+        return Response(prom.generate_latest(registry), mimetype=prom.CONTENT_TYPE_LATEST)
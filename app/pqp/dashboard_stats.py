@@ -0,0 +1,231 @@
+# app/pqp/dashboard_stats.py
+"""
+Dashboard summary tiles, one aggregate query, cached per org.
+
+    stats = dashboard_stats(org_id)   # org_id None = every project
+    stats["total_projects"], stats["avg_completion"], stats["up_to_date"], stats["overdue"], ...
+
+Everything comes from a single SELECT over
+
+  scope              project codes: ProjectRecords, or pqp.project of one org (SaaS)
+  project_summaries  completion_pct (see project_summary.py)
+  pqp_sections       sections marked completed, for projects without a summary row
+  checklist_item     open items past due
+  risk tables        open / high risks and open risks past due (section101, risk_*)
+
+A project is overdue when it has an open checklist item or open risk past its
+due date; every other project is up to date. Tables or columns missing in this
+database are left out of the query, which is built once per worker.
+
+Results are kept per org for PQP_DASHBOARD_TTL_S seconds (default 30), so a
+dashboard under load costs one query per org per TTL however many projects
+there are; at most MAX_CACHED_ORGS orgs are kept. The queries run on their
+own connection, and a failure is logged and shows empty tiles, never a 500.
+
+project_page() lists the same project scope a page at a time, so the
+project list and its pager agree with the total tile.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+from app import metrics
+from app.pqp.project_summary import _DONE, SECTION_COUNT, _linked, available
+
+log = logging.getLogger(__name__)
+
+TTL_S = int(os.getenv("PQP_DASHBOARD_TTL_S", "30"))
+RISK_TABLES = ("section101", "risk_concept", "risk_docs", "risk_works", "risk_register")
+CLOSED_RISK = "('closed', 'done', 'resolved', 'complete', 'completed')"
+MAX_CACHED_ORGS = 256
+FAILED_RETRY_S = 15   # failed query: empty tiles, retried this soon
+
+_TEXT = ("text", "character varying", "character")
+_DATES = ("date", "timestamp without time zone", "timestamp with time zone")
+
+_lock = threading.Lock()
+_cache: dict = {}   # org key -> (monotonic time, stats)
+_sql: dict = {}     # (kind, by_org) -> built text()
+
+
+def _risk_union(conn) -> str | None:
+    """One `select code, open, high, late` over the risk tables that exist here."""
+    from app.pqp.grid_data import table_columns
+    parts = []
+    for t in RISK_TABLES:
+        cols = table_columns(conn, f"pqp.{t}")
+        # the project code lives in a text "id" column on these tables; every
+        # expression below is only added for a column of the type it assumes
+        if cols.get("id") not in _TEXT or "status" not in cols:
+            continue
+        opened = (f"lower(coalesce(status, 'open')) not in {CLOSED_RISK}" if cols["status"] in _TEXT
+                  else "true")
+        high = " or ".join(f"lower(coalesce({c}, '')) = 'high'"
+                           for c in ("likelihood", "impact") if cols.get(c) in _TEXT)
+        late = "due_date < current_date" if cols.get("due_date") in _DATES else "false"
+        parts.append(f"select id as code, {opened} as open, ({high or 'false'}) as high, "
+                     f"({late}) as late from pqp.{t}")
+    return " union all ".join(parts) or None
+
+
+def _scope(conn, by_org: bool) -> str:
+    """The project codes the tiles and the project list cover."""
+    from app.extensions import db
+    from app.pqp.pqp_routes import PR_COL_CODE, PR_SCHEMA, PR_TABLE, _col, _projectrecords
+    if by_org:
+        return "select distinct project_code as code from project where org_id = :org and project_code is not null"
+    q = conn.dialect.identifier_preparer.quote
+    code = q(_col(_projectrecords(db.engine), PR_COL_CODE).name)
+    return f"select distinct {code} as code from {q(PR_SCHEMA)}.{q(PR_TABLE)} where {code} is not null"
+
+
+def _parts(conn, by_org: bool):
+    """(ctes, joins, completion, overdue, has_risks) shared by the tiles and the project list."""
+    scope = _scope(conn, by_org)
+    ctes = [
+        f"scope as ({scope})",
+        """sec as (select s.project_code as code, count(*) filter (where s.completed) as done
+                     from pqp.pqp_sections s join scope on scope.code = s.project_code group by 1)""",
+    ]
+    joins = ["left join sec on sec.code = scope.code"]
+    completion = f"coalesce(sec.done, 0) * 100.0 / {SECTION_COUNT}"
+    late = []
+
+    if available(conn):
+        ctes.append("""summ as (select ps.project_code as code, ps.completion_pct, ps.status
+                                  from pqp.project_summaries ps join scope on scope.code = ps.project_code)""")
+        joins.append("left join summ on summ.code = scope.code")
+        completion = f"coalesce(summ.completion_pct, {completion})"
+    if _linked(conn):
+        ctes.append(f"""chk as (select p.project_code as code,
+                                       bool_or(not {_DONE} and c.due_date < current_date) as late
+                                  from project p
+                                  join checklist_item c on c.project_id = p.id
+                                  join scope on scope.code = p.project_code
+                                 group by 1)""")
+        joins.append("left join chk on chk.code = scope.code")
+        late.append("coalesce(chk.late, false)")
+    risks = _risk_union(conn)
+    if risks:
+        ctes.append(f"""risk as (select r.code, count(*) filter (where r.open) as open,
+                                        count(*) filter (where r.open and r.high) as high,
+                                        bool_or(r.open and r.late) as late
+                                   from ({risks}) r join scope on scope.code = r.code group by 1)""")
+        joins.append("left join risk on risk.code = scope.code")
+        late.append("coalesce(risk.late, false)")
+    return ctes, joins, completion, " or ".join(late) or "false", bool(risks)
+
+
+def _build(conn, by_org: bool):
+    ctes, joins, completion, overdue, risks = _parts(conn, by_org)
+    open_risks, high_risks = ("coalesce(sum(risk.open), 0)", "coalesce(sum(risk.high), 0)") if risks else ("0", "0")
+
+    return text(f"""
+        with {', '.join(ctes)}
+        select count(*)                                          as total_projects,
+               coalesce(round(avg({completion})), 0)             as avg_completion,
+               count(*) filter (where {completion} >= 100)       as completed,
+               count(*) filter (where not ({overdue}))           as up_to_date,
+               count(*) filter (where {overdue})                 as overdue,
+               {open_risks}                                      as open_risks,
+               {high_risks}                                      as high_risks
+          from scope
+          {' '.join(joins)}
+    """)
+
+
+def _build_page(conn, by_org: bool):
+    # same CTEs as the tiles, so a project the overdue tile counts is flagged here too
+    ctes, joins, _, overdue, _ = _parts(conn, by_org)
+    status, pct = ("summ.status", "summ.completion_pct") if available(conn) else ("null", "null")
+    return text(f"""
+        with {', '.join(ctes)}
+        select scope.code, {status} as status, {pct} as completion_pct, ({overdue}) as overdue
+          from scope
+          {' '.join(joins)}
+         order by scope.code limit :limit offset :offset
+    """)
+
+
+def _statement(conn, kind: str, org_id):
+    """(statement, params) for "stats" / "page"; built once per worker and scope."""
+    by_org = bool(org_id) and _linked(conn)   # org scope needs project.project_code
+    key = (kind, by_org)
+    stmt = _sql.get(key)
+    if stmt is None:
+        stmt = _sql[key] = (_build if kind == "stats" else _build_page)(conn, by_org)
+    return stmt, ({"org": org_id} if by_org else {})
+
+
+def compute(conn, org_id=None) -> dict:
+    """Run the aggregate now (no cache)."""
+    stmt, params = _statement(conn, "stats", org_id)
+    row = conn.execute(stmt, params).mappings().one()
+    return {k: int(v or 0) for k, v in row.items()}
+
+
+def _evict(now: float, ttl: int) -> None:
+    """Keep at most MAX_CACHED_ORGS entries: expired ones first, then the oldest."""
+    for k in [k for k, (at, _) in _cache.items() if now - at >= ttl]:
+        del _cache[k]
+    while len(_cache) >= MAX_CACHED_ORGS:
+        del _cache[min(_cache, key=lambda k: _cache[k][0])]
+
+
+def dashboard_stats(org_id=None, ttl: int = TTL_S) -> dict:
+    """
+    Tile numbers for one org (None = all projects), at most ttl seconds old per
+    worker. Runs on its own connection; a failing query is logged and gives
+    empty tiles rather than failing the page.
+    """
+    from app.extensions import db
+    key = str(org_id) if org_id else None
+    hit = _cache.get(key)
+    if hit is not None and time.monotonic() - hit[0] < ttl:
+        metrics.cache_event("dashboard_stats", True)
+        return hit[1]
+    with _lock:
+        now = time.monotonic()
+        hit = _cache.get(key)
+        if hit is not None and now - hit[0] < ttl:
+            return hit[1]
+        metrics.cache_event("dashboard_stats", False)
+        try:
+            with db.engine.connect() as conn:
+                stats, at = compute(conn, org_id), time.monotonic()
+        except (SQLAlchemyError, KeyError):
+            log.exception("dashboard stats query failed")
+            stats, at = {}, time.monotonic() - ttl + FAILED_RETRY_S
+        _evict(now, ttl)
+        _cache[key] = (at, stats)
+        return stats
+
+
+def project_page(org_id=None, page: int = 1, per_page: int = 50) -> list:
+    """
+    One page of the projects the tiles count (same scope, ordered by code),
+    with status / completion / overdue from the summaries. [] on failure.
+    """
+    from app.extensions import db
+    try:
+        with db.engine.connect() as conn:
+            stmt, params = _statement(conn, "page", org_id)
+            rows = conn.execute(stmt, {**params, "limit": per_page,
+                                       "offset": (max(page, 1) - 1) * per_page}).mappings().all()
+    except (SQLAlchemyError, KeyError):
+        log.exception("dashboard project list query failed")
+        return []
+    return [dict(r) for r in rows]
+
+
+def clear_cache() -> None:
+    """Drop cached tiles and the built queries (after schema changes)."""
+    with _lock:
+        _cache.clear()
+        _sql.clear()
@@ -0,0 +1,321 @@
+# app/pqp/grid_data.py
+"""
+Server-side paging, sorting and filtering for the section grids.
+
+Two row sources:
+  - PQPSection.rows_json (a JSON array per section)  -> page_json_section()
+  - physical section tables (pqp.section31, ...)     -> page_table()
+
+Both push the work into Postgres and return only one page of rows plus the
+total count, so the cost of a request scales with the page size instead of
+the section size.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+from datetime import date, datetime
+from types import MappingProxyType
+
+from sqlalchemy import text
+
+DEFAULT_PER_PAGE = 50
+MAX_PER_PAGE = 500
+FILTER_PREFIX = "f."          # ?f.Status=open&f.Owner=jo
+
+
+# -------------------------- request args --------------------------
+
+def parse_grid_args(args) -> dict:
+    """
+    Read paging/sort/filter options from request.args:
+      page (1-based), per_page, sort (column label), dir (asc|desc), f.<label>=<text>
+    The virtual grid asks for a row range instead: start (0-based), end (exclusive);
+    when start is present it wins over page/per_page.
+    """
+    try:
+        page = max(1, int(args.get("page") or 1))
+    except (TypeError, ValueError):
+        page = 1
+    try:
+        per_page = int(args.get("per_page") or DEFAULT_PER_PAGE)
+    except (TypeError, ValueError):
+        per_page = DEFAULT_PER_PAGE
+    per_page = min(max(1, per_page), MAX_PER_PAGE)
+    offset = (page - 1) * per_page
+
+    if args.get("start") is not None:
+        try:
+            offset = max(0, int(args.get("start")))
+            end = int(args.get("end") or offset + per_page)
+        except (TypeError, ValueError):
+            offset, end = 0, per_page
+        per_page = min(max(1, end - offset), MAX_PER_PAGE)
+        page = offset // per_page + 1
+
+    filters = {}
+    for k, v in args.items():
+        if k.startswith(FILTER_PREFIX) and (v or "").strip():
+            filters[k[len(FILTER_PREFIX):]] = v.strip()
+
+    return {
+        "page": page,
+        "per_page": per_page,
+        "offset": offset,
+        "sort": (args.get("sort") or "").strip(),
+        "desc": (args.get("dir") or "").lower() == "desc",
+        "filters": filters,
+    }
+
+
+def _like(value: str) -> str:
+    """Contains-pattern for ILIKE with the user's % and _ taken literally."""
+    v = value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{v}%"
+
+
+def cell(v) -> str:
+    """Display string for a DB value (dates as ISO, None as '')."""
+    if v is None:
+        return ""
+    if isinstance(v, datetime):
+        return v.date().isoformat()
+    if isinstance(v, date):
+        return v.isoformat()
+    return str(v)
+
+
+def pretty_label(column: str) -> str:
+    """'appointment_review_date' -> 'Appointment Review Date' ('id' stays 'id')."""
+    if column == "id":
+        return "id"
+    return " ".join(w.capitalize() for w in column.replace("_", " ").split())
+
+
+def row_version(row: dict) -> str:
+    """
+    Version token for a row as stored: a short hash of its content, key order
+    ignored, '_'-prefixed helper keys (_rid, _v) excluded. See row_edit.py.
+    """
+    body = {k: v for k, v in row.items() if not str(k).startswith("_")}
+    raw = json.dumps(body, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+# -------------------------- PQPSection JSON rows --------------------------
+
+# rows_json has been written both as a real JSON array and as a JSON *string*
+# holding the array (json.dumps into a JSONB column), and older rows keep
+# {"rows": [...]} in content. Normalise all of that inside the query.
+_JSON_ELEMENTS = """
+    with sec as (
+        select case jsonb_typeof(coalesce(rows_json, content))
+                 when 'string' then (coalesce(rows_json, content) #>> '{}')::jsonb
+                 else coalesce(rows_json, content)
+               end as doc
+        from pqp.pqp_sections
+        where project_code = :code and section_number = :n
+    ), el as (
+        select e.value as r, e.ordinality as pos
+        from sec,
+             jsonb_array_elements(case jsonb_typeof(sec.doc)
+                                    when 'array'  then sec.doc
+                                    when 'object' then coalesce(sec.doc -> 'rows', '[]'::jsonb)
+                                    else '[]'::jsonb
+                                  end) with ordinality as e
+    )
+"""
+
+
+def page_json_section(session, project_code: str, section_number: int,
+                      columns: list[str], gq: dict):
+    """
+    One page of PQPSection rows for (project_code, section_number).
+    Sort/filter keys must be in `columns`; anything else is ignored.
+    Returns (rows, total) where rows are the raw JSON row dicts.
+    """
+    params = {"code": project_code, "n": section_number}
+    where = []
+    for i, (label, value) in enumerate(gq["filters"].items()):
+        if label not in columns:
+            continue
+        where.append(f"coalesce(r ->> :fk{i}, '') ilike :fv{i}")
+        params[f"fk{i}"] = label
+        params[f"fv{i}"] = _like(value)
+    where_sql = ("where " + " and ".join(where)) if where else ""
+
+    total = session.execute(
+        text(f"{_JSON_ELEMENTS} select count(*) from el {where_sql}"), params
+    ).scalar() or 0
+    if not total:
+        return [], 0
+
+    order_sql = "order by pos"
+    if gq["sort"] in columns:
+        params["sk"] = gq["sort"]
+        order_sql = f"order by coalesce(r ->> :sk, '') {'desc' if gq['desc'] else 'asc'}, pos"
+
+    params.update({"lim": gq["per_page"], "off": gq["offset"]})
+    rows = session.execute(
+        text(f"{_JSON_ELEMENTS} select r from el {where_sql} {order_sql} limit :lim offset :off"),
+        params,
+    ).scalars().all()
+    return [r for r in rows if isinstance(r, dict)], int(total)
+
+
+def page_rows(rows: list[dict], gq: dict, columns: list[str]):
+    """In-memory fallback with the same semantics (used for one-off hydrated rows)."""
+    out = rows
+    for label, value in gq["filters"].items():
+        if label in columns:
+            needle = value.lower()
+            out = [r for r in out if needle in str(r.get(label) or "").lower()]
+    if gq["sort"] in columns:
+        out = sorted(out, key=lambda r: str(r.get(gq["sort"]) or ""), reverse=gq["desc"])
+    return out[gq["offset"]:gq["offset"] + gq["per_page"]], len(out)
+
+
+# -------------------------- physical section tables --------------------------
+
+# Table shapes are cached for the life of the worker (read-only views, shared
+# by every caller). Missing tables are not cached. Nothing invalidates them
+# across processes: after scripts/upgrade_schema.py restart the workers (or
+# call clear_schema_cache() and dashboard_stats.clear_cache() in each).
+_COLUMNS_CACHE: dict[str, MappingProxyType] = {}
+_PK_CACHE: dict[str, str | None] = {}
+
+
+def clear_schema_cache() -> None:
+    _COLUMNS_CACHE.clear()
+    _PK_CACHE.clear()
+
+
+def table_columns(conn, table_qualified: str) -> MappingProxyType:
+    """Ordered read-only {column_name: data_type} for a schema-qualified table (cached per worker)."""
+    cached = _COLUMNS_CACHE.get(table_qualified)
+    if cached is not None:
+        return cached
+    schema, table = table_qualified.split(".", 1)
+    rows = conn.execute(text("""
+        select column_name, data_type
+        from information_schema.columns
+        where table_schema = :s and table_name = :t
+        order by ordinal_position
+    """), {"s": schema, "t": table}).fetchall()
+    cols = MappingProxyType({r[0]: (r[1] or "").lower() for r in rows})
+    if cols:
+        _COLUMNS_CACHE[table_qualified] = cols
+    return cols
+
+
+def table_pk(conn, table_qualified: str, col_types: dict) -> str | None:
+    """Primary-key column; falls back to row_id / id when the table has no PK."""
+    if table_qualified in _PK_CACHE:
+        pk = _PK_CACHE[table_qualified]
+    else:
+        pk = _primary_key(conn, table_qualified)
+        if col_types:
+            _PK_CACHE[table_qualified] = pk
+    if pk:
+        return pk
+    for cand in ("row_id", "id"):
+        if cand in col_types:
+            return cand
+    return None
+
+
+def _primary_key(conn, table_qualified: str) -> str | None:
+    schema, table = table_qualified.split(".", 1)
+    return conn.execute(text("""
+        select a.attname
+        from pg_index i
+        join pg_class c on c.oid = i.indrelid
+        join pg_namespace n on n.oid = c.relnamespace
+        join pg_attribute a on a.attrelid = i.indrelid and a.attnum = any(i.indkey)
+        where i.indisprimary and n.nspname = :s and c.relname = :t
+    """), {"s": schema, "t": table}).scalar()
+
+
+def project_filter(conn, col_types: dict, project_code: str):
+    """
+    WHERE clause tying a section table to one project. Same precedence as
+    _fetch_table_rows: project_code, id (text), project_id, id (int).
+    Returns (sql, params) or None when the table cannot be filtered.
+    """
+    id_type = col_types.get("id", "")
+    if "project_code" in col_types:
+        return '"project_code" = :_code', {"_code": project_code}
+    if "id" in col_types and ("character" in id_type or id_type == "text"):
+        return '"id" = :_code', {"_code": project_code}
+
+    if "project_id" in col_types or "integer" in id_type:
+        try:
+            pid = conn.execute(
+                text("select id from pqp.project where project_code = :c"), {"c": project_code}
+            ).scalar()
+        except Exception:
+            pid = None
+        if pid is not None:
+            col = "project_id" if "project_id" in col_types else "id"
+            return f'"{col}" = :_pid', {"_pid": pid}
+    return None
+
+
+def page_table(conn, table_qualified: str, project_code: str, gq: dict):
+    """
+    One page of rows from a physical section table, keyed by pretty labels.
+    Each row also carries '_rid' (its primary key) for edit/delete and '_v'
+    (its version token) for PATCH.
+    Returns (labels, rows, total).
+    """
+    col_types = table_columns(conn, table_qualified)
+    if not col_types:
+        return [], [], 0
+
+    names = list(col_types)
+    if "id" in names:
+        names = ["id"] + [c for c in names if c != "id"]
+    label_to_col = {pretty_label(c): c for c in names}
+    labels = list(label_to_col)
+
+    flt = project_filter(conn, col_types, project_code)
+    if flt is None:
+        return labels, [], 0
+    where, params = [flt[0]], dict(flt[1])
+
+    for i, (label, value) in enumerate(gq["filters"].items()):
+        col = label_to_col.get(label)
+        if not col:
+            continue
+        where.append(f'cast("{col}" as text) ilike :fv{i}')
+        params[f"fv{i}"] = _like(value)
+    where_sql = " and ".join(where)
+
+    total = conn.execute(
+        text(f"select count(*) from {table_qualified} where {where_sql}"), params
+    ).scalar() or 0
+    if not total:
+        return labels, [], 0
+
+    pk = table_pk(conn, table_qualified, col_types)
+    sort_col = label_to_col.get(gq["sort"])
+    if sort_col:
+        order_sql = f'order by "{sort_col}" {"desc" if gq["desc"] else "asc"} nulls last'
+    else:
+        order_sql = "order by 1"
+    if pk and pk != sort_col:
+        order_sql += f', "{pk}"'
+
+    params.update({"lim": gq["per_page"], "off": gq["offset"]})
+    raw = conn.execute(
+        text(f"select * from {table_qualified} where {where_sql} {order_sql} limit :lim offset :off"),
+        params,
+    ).mappings().all()
+
+    rows = []
+    for m in raw:
+        d = {lbl: cell(m.get(col)) for lbl, col in label_to_col.items()}
+        d["_v"] = row_version(d)
+        d["_rid"] = cell(m.get(pk)) if pk else ""
+        rows.append(d)
+    return labels, rows, int(total)
@@ -6,12 +6,15 @@ import re
 from io import BytesIO
 from typing import Any, Dict, List, Tuple, Optional
 
-from openpyxl import load_workbook
-
 # Pure metadata – safe to import (no app/route side effects)
 from app.pqp.sections import SECTION_DEFS, DEFAULT_SECTION_TITLES
 # Model only (no routes) – avoids circular imports
 from app.pqp.pqp_models import PQPSection
+from app.pqp.section_lock import SectionBusy, lock_section
+from app.pqp.ingest.import_diff import apply_section_diff, diff_section, section_rows
+from app.pqp.ingest.import_undo import section_undo
+from app.pqp.ingest.code_detect import detect_project_code
+from app.pqp.ingest.header_map import CONFIRM_CONFIDENCE, HeaderMatcher, template_key
 
 
 # -------------------------- helpers --------------------------
@@ -63,34 +66,28 @@ def _dump_section_rows(rows: List[dict]) -> str:
 
 # -------------------------- parsing --------------------------
 
-def parse_workbook_to_payload(stream, project_code: Optional[str] = None
-                             ) -> Tuple[Dict[str, Any], List[str], Optional[str]]:
+def parse_workbook_to_payload(stream, project_code: Optional[str] = None,
+                              learned=None) -> Tuple[Dict[str, Any], List[str], Optional[str]]:
     """
     Returns (payload, issues, detected_code).
-    payload = {"code": <str>, "sections": [{"index": n, "rows": [...]}, ...]}
+    payload = {"code": <str>, "sections": [{"index": n, "rows": [...],
+               "template_key": str, "mapping": [{header, column, confidence, source}]}, ...]}
+    Headers are matched to SECTION_DEFS columns by header_map.HeaderMatcher;
+    learned(template_key) -> {normalised header: column} supplies mappings
+    confirmed by earlier commits of the same sheet layout.
     """
+    from openpyxl import load_workbook  # deferred: slow to import, only imports need it
+
     issues: List[str] = []
     wb = load_workbook(filename=BytesIO(stream.read()), data_only=True)
 
-    # --- naive code detection from first couple of sheets ---
+    # --- code detection (bounded scan, see code_detect) when not given ---
     detected_code: Optional[str] = None
-    try:
-        for ws in wb.worksheets[:2]:
-            for row in ws.iter_rows(min_row=1, max_row=10, min_col=1, max_col=10, values_only=True):
-                for val in row:
-                    s = _clean_cell(val)
-                    if not s:
-                        continue
-                    # heuristic: letters + 2+ digits (eg "P700", "GENL-PQP-04")
-                    if re.match(r"^[A-Za-z]*\d{2,}[A-Za-z0-9\-]*$", s):
-                        detected_code = s
-                        break
-                if detected_code:
-                    break
-            if detected_code:
-                break
-    except Exception as e:
-        issues.append(f"Code detection failed: {e}")
+    if not project_code:
+        try:
+            detected_code = detect_project_code(workbook=wb).code or None
+        except Exception as e:
+            issues.append(f"Code detection failed: {e}")
 
     code_for_payload = project_code or detected_code or ""
     payload: Dict[str, Any] = {"code": code_for_payload, "sections": []}
@@ -108,24 +105,34 @@ def parse_workbook_to_payload(stream, project_code: Optional[str] = None
             payload["sections"].append({"index": idx, "rows": []})
             continue
 
+        key = template_key(idx, header)
+        mapping = HeaderMatcher.for_section(idx).map_header(header, learned(key) if learned else None)
+        colmap = [(m["pos"], m["column"], "date" in m["column"].lower()) for m in mapping if m["column"]]
+        dropped = [m["header"] for m in mapping if m["header"] and not m["column"]]
+        if dropped:
+            issues.append(f"Sheet '{ws.title}': no column for {', '.join(map(repr, dropped))}")
+        weak = [m["header"] for m in mapping if m["column"] and m["confidence"] < CONFIRM_CONFIDENCE]
+        if weak:
+            issues.append(f"Sheet '{ws.title}': check mapping of {', '.join(map(repr, weak))}")
+
         rows: List[Dict[str, Any]] = []
         for r in ws.iter_rows(min_row=2, values_only=True):
             rec: Dict[str, Any] = {}
             any_val = False
-            for j, col in enumerate(header):
-                if col in expected_cols:
-                    val = _clean_cell(r[j] if j < len(r) else "")
-                    if "date" in col.lower():
-                        val = _iso_date_like(val)
-                    rec[col] = val
-                    if val not in ("", None):
-                        any_val = True
+            for j, col, is_date in colmap:
+                val = _clean_cell(r[j] if j < len(r) else "")
+                if is_date:
+                    val = _iso_date_like(val)
+                rec[col] = val
+                if val not in ("", None):
+                    any_val = True
             if any_val:
                 if "id" in expected_cols and "id" not in rec:
                     rec["id"] = ""
                 rows.append(rec)
 
-        payload["sections"].append({"index": idx, "rows": rows})
+        payload["sections"].append({"index": idx, "rows": rows,
+                                    "template_key": key, "mapping": mapping})
 
     return payload, issues, detected_code
 
@@ -134,10 +141,18 @@ def parse_workbook_to_payload(stream, project_code: Optional[str] = None
 
 def commit_payload(payload: Dict[str, Any],
                    project_code: Optional[str],
-                   db_session) -> Tuple[bool, List[str]]:
+                   db_session,
+                   undo: Optional[List[dict]] = None) -> Tuple[bool, List[str]]:
     """
     Write parsed payload into PQPSection per section.
-    Merge by 'id' when present, otherwise append.
+    Each section is diffed against its current rows (see import_diff): only
+    new rows are appended and only changed fields of matched rows are written;
+    identical rows, with or without an id, are left alone.
+    If `undo` is a list, one reverse delta per written section is appended
+    to it (see import_undo) for ImportJob.undo.
+    Only flushes: the caller commits, so the section writes and its own
+    record of them (ImportJob.undo, status) land in one transaction, and
+    rolls back when ok is False.
     Returns (ok, issues).
     """
     issues: List[str] = []
@@ -150,25 +165,41 @@ def commit_payload(payload: Dict[str, Any],
     if not isinstance(sections, list):
         return False, ["Invalid 'sections' structure"]
 
-    total_created = 0
-    total_updated = 0
+    totals = {"created": 0, "updated": 0, "unchanged": 0, "duplicate": 0}
 
-    for sec_payload in sections:
+    # one transaction for all sections: take their locks in a fixed order
+    def _sec_no(sp):
         try:
-            idx = int(sec_payload.get("index") or 0)
+            return int(sp.get("index") or 0)
         except Exception:
-            idx = 0
+            return 0
+    sections = sorted((sp for sp in sections if isinstance(sp, dict)), key=_sec_no)
+
+    for sec_payload in sections:
+        idx = _sec_no(sec_payload)
         if idx < 1 or idx > len(SECTION_DEFS):
             issues.append(f"Skipping invalid section index: {sec_payload.get('index')!r}")
             continue
 
-        new_rows = sec_payload.get("rows") or []
-        if not isinstance(new_rows, list):
-            issues.append(f"Section {idx}: rows not a list; skipping")
+        new_rows = section_rows(sec_payload)
+        if not new_rows:
             continue
 
-        # fetch/create PQPSection
-        sec = PQPSection.query.filter_by(project_code=code, section_number=idx).first()
+        # fetch/create PQPSection (locked until the caller commits)
+        try:
+            lock_section(db_session, code, idx)
+        except SectionBusy as e:
+            return False, issues + [str(e)]
+        sec = (PQPSection.query.filter_by(project_code=code, section_number=idx)
+               .populate_existing().first())
+        existing = _load_section_rows(sec) if sec else []
+
+        diff = diff_section(existing, new_rows)
+        totals["unchanged"] += diff["counts"]["unchanged"]
+        totals["duplicate"] += diff["counts"]["duplicate"]
+        if not diff["insert"] and not diff["update"]:
+            continue                                   # nothing to write
+
         if not sec:
             sec = PQPSection(
                 project_code=code,
@@ -176,32 +207,12 @@ def commit_payload(payload: Dict[str, Any],
                 title=DEFAULT_SECTION_TITLES.get(idx, f"Section {idx}")
             )
             db_session.add(sec)
-            db_session.flush()
-
-        existing = _load_section_rows(sec)
-
-        # merge by id if present
-        # build index for existing rows with id
-        existing_by_id = {}
-        for er in existing:
-            if isinstance(er, dict):
-                rid = str(er.get("id") or "").strip()
-                if rid:
-                    existing_by_id[rid] = er
-
-        for nr in new_rows:
-            if not isinstance(nr, dict):
-                continue
-            rid = str(nr.get("id") or "").strip()
-            if rid and rid in existing_by_id:
-                existing_by_id[rid].update(nr)
-                total_updated += 1
-            else:
-                # ensure id key exists if schema includes it
-                if "id" in SECTION_DEFS[idx - 1] and "id" not in nr:
-                    nr["id"] = ""
-                existing.append(nr)
-                total_created += 1
+
+        res = apply_section_diff(existing, new_rows, diff, with_id="id" in SECTION_DEFS[idx - 1])
+        totals["created"] += res["created"]
+        totals["updated"] += res["updated"]
+        if undo is not None:
+            undo.append(section_undo(idx, existing, diff))
 
         # write back
         if hasattr(sec, "rows_json"):
@@ -209,7 +220,7 @@ def commit_payload(payload: Dict[str, Any],
         else:
             sec.content = _dump_section_rows(existing)
 
-    db_session.commit()
-    if total_created or total_updated:
-        issues.append(f"Upserted rows — created: {total_created}, updated: {total_updated}")
+    db_session.flush()
+    issues.append("Rows — created: {created}, updated: {updated}, unchanged: {unchanged}, "
+                  "duplicates skipped: {duplicate}".format(**totals))
     return True, issues
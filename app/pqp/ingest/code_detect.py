@@ -0,0 +1,225 @@
+# app/pqp/ingest/code_detect.py
+"""
+Project code detection for uploaded workbooks.
+
+Project codes look like '291RT', '322IN' or '291RT P700' (core plus an
+optional phase suffix). detect_project_code() collects candidates from
+
+  filename, document properties (title/subject/keywords), defined names
+  (e.g. a 'ProjectCode' range), sheet names, and cells - at most
+  CELL_BUDGET cells from the top-left of the first sheets, with cells next
+  to a 'Project Code' / 'Project No' label weighted up
+
+scores them (SOURCE_WEIGHT per distinct source, summed), and, when the
+canonical code index is given, strongly prefers codes that exist there.
+The workbook is opened read-only, so only the scanned rows are parsed.
+
+    det = detect_project_code(filename=f.filename, xlsx_bytes=data, known=known_codes(load))
+    det.code, det.score, det.source, det.candidates
+"""
+from __future__ import annotations
+
+import logging
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from io import BytesIO
+from typing import Callable, Dict, Iterable, List, Optional
+
+from app import metrics
+
+log = logging.getLogger(__name__)
+
+CELL_BUDGET = 400          # cells read from the workbook, all sheets together
+SCAN_SHEETS = 3
+SCAN_ROWS = 20
+SCAN_COLS = 10
+INDEX_TTL_S = 300
+INDEX_RETRY_S = 15         # after a failed load: retry this soon instead of caching for the TTL
+
+CODE_RE = re.compile(r"\b(\d{3}[A-Z]{2,3})\b(?:\s*(P\d{2,4})\b)?", re.IGNORECASE)
+_LABEL_RE = re.compile(r"^\s*(?:project|proj\.?)\s*(?:code|no\.?|number|id|ref)\b", re.IGNORECASE)
+_NAME_RE = re.compile(r"project_?(?:code|no|number|id)", re.IGNORECASE)
+
+SOURCE_WEIGHT = {
+    "defined_name": 4.0,
+    "label_cell": 3.5,
+    "filename": 3.0,
+    "properties": 2.5,
+    "sheet_name": 2.0,
+    "cell": 1.0,
+}
+KNOWN_BONUS = 10.0
+
+
+def normalize_code(s) -> str:
+    """First code in s, upper-cased, one space before a suffix: 'pqp 291rt  p700.xlsx' -> '291RT P700'."""
+    m = CODE_RE.search(str(s or ""))
+    if not m:
+        return ""
+    core, suffix = m.group(1).upper(), (m.group(2) or "").upper()
+    return f"{core} {suffix}" if suffix else core
+
+
+@dataclass
+class Detection:
+    code: str = ""
+    score: float = 0.0
+    source: str = ""
+    candidates: List[dict] = field(default_factory=list)   # best first: {code, score, sources, known}
+
+
+_SPLIT_RE = re.compile(r"[\s_/\\.,;:()\[\]]+")
+
+
+class _Candidates:
+    """code -> {source: weight}; codes that don't fit CODE_RE count when they are in `known`."""
+
+    def __init__(self, known: Optional[set]):
+        self.known = known or set()
+        self.by_code: Dict[str, Dict[str, float]] = {}
+
+    def _put(self, code: str, source: str) -> None:
+        srcs = self.by_code.setdefault(code, {})
+        srcs[source] = max(srcs.get(source, 0.0), SOURCE_WEIGHT[source])
+
+    def add(self, text, source: str) -> bool:
+        code = normalize_code(text)
+        if code:
+            self._put(code, source)
+            return True
+        if self.known and text:
+            for tok in _SPLIT_RE.split(str(text).upper()):
+                if tok in self.known:
+                    self._put(tok, source)
+                    return True
+        return False
+
+
+def _scan_workbook(wb, cands: _Candidates, budget: int) -> None:
+    props = getattr(wb, "properties", None)
+    if props is not None:
+        for attr in ("title", "subject", "keywords", "description"):
+            cands.add(getattr(props, attr, None), "properties")
+
+    try:
+        names = wb.defined_names
+        items = names.items() if hasattr(names, "items") else [(d.name, d) for d in names.definedName]
+        for name, dn in items:
+            if _NAME_RE.search(name or ""):
+                for title, ref in dn.destinations:
+                    if budget <= 0:
+                        break
+                    cell = wb[title][ref.replace("$", "").split(":")[0]]
+                    budget -= 1
+                    cands.add(cell.value, "defined_name")
+    except Exception:
+        pass                                  # broken/foreign names never block detection
+
+    for ws in wb.worksheets[:SCAN_SHEETS]:
+        cands.add(ws.title, "sheet_name")
+        if budget <= 0:
+            continue
+        after_label = False
+        for row in ws.iter_rows(min_row=1, max_row=SCAN_ROWS, max_col=SCAN_COLS, values_only=True):
+            for val in row:
+                if budget <= 0:
+                    break
+                budget -= 1
+                if val is None or isinstance(val, (int, float)):
+                    after_label = False
+                    continue
+                s = str(val)
+                if cands.add(s, "label_cell" if after_label or _LABEL_RE.match(s) else "cell"):
+                    after_label = False
+                else:
+                    after_label = bool(_LABEL_RE.match(s))
+            after_label = False
+            if budget <= 0:
+                break
+
+
+def detect_project_code(filename: Optional[str] = None, workbook=None, xlsx_bytes: Optional[bytes] = None,
+                        known: Optional[set] = None, cell_budget: int = CELL_BUDGET) -> Detection:
+    """
+    Best project code from the filename and the workbook (an open openpyxl
+    workbook, or raw xlsx bytes opened read-only here). known = canonical
+    codes (see known_codes); a candidate whose core matches exactly one
+    known full code is promoted to it.
+    """
+    cands = _Candidates(known)
+    cands.add(filename, "filename")
+
+    wb, opened = workbook, False
+    if wb is None and xlsx_bytes:
+        try:
+            from openpyxl import load_workbook
+            wb, opened = load_workbook(BytesIO(xlsx_bytes), read_only=True, data_only=True), True
+        except Exception:
+            wb = None
+    if wb is not None:
+        try:
+            _scan_workbook(wb, cands, cell_budget)
+        finally:
+            if opened:
+                wb.close()
+
+    by_core: Dict[str, List[str]] = {}
+    for k in known or ():
+        by_core.setdefault(k.split(" ")[0], []).append(k)
+
+    merged: Dict[str, Dict[str, float]] = {}
+    for code, srcs in cands.by_code.items():
+        if known and code not in known and len(by_core.get(code, [])) == 1:
+            code = by_core[code][0]                           # '291RT' -> '291RT P700'
+        into = merged.setdefault(code, {})
+        for src, w in srcs.items():
+            into[src] = max(into.get(src, 0.0), w)
+
+    scored = []
+    for code, srcs in merged.items():
+        is_known = bool(known) and code in known
+        score = sum(srcs.values()) + (KNOWN_BONUS if is_known else 0.0)
+        scored.append({"code": code, "score": round(score, 2), "known": is_known,
+                       "sources": sorted(srcs, key=srcs.get, reverse=True)})
+    scored.sort(key=lambda c: c["score"], reverse=True)     # stable: first seen wins ties
+
+    if not scored:
+        return Detection()
+    best = scored[0]
+    return Detection(best["code"], best["score"], best["sources"][0], scored[:10])
+
+
+# -------------------------- canonical code index --------------------------
+
+_index_lock = threading.Lock()
+_index: Dict[str, object] = {"codes": None, "at": 0.0}
+
+
+def known_codes(load: Callable[[], Iterable[str]], ttl: int = INDEX_TTL_S) -> set:
+    """
+    Normalised set of existing project codes, refreshed at most every ttl
+    seconds per worker. load() returns the raw codes (one query).
+    When the load fails the previous set (or an empty one, which disables the
+    known-code bonus) is kept for INDEX_RETRY_S seconds only. load() should use
+    its own connection so a failure can't abort the caller's transaction.
+    """
+    now = time.monotonic()
+    codes = _index["codes"]
+    if codes is not None and now - _index["at"] < ttl:
+        metrics.cache_event("project_codes", True)
+        return codes
+    with _index_lock:
+        if _index["codes"] is not None and time.monotonic() - _index["at"] < ttl:
+            return _index["codes"]
+        metrics.cache_event("project_codes", False)
+        try:
+            codes = {" ".join(str(c).upper().split()) for c in load() if c}
+            at = time.monotonic()
+        except Exception:
+            log.warning("project code index load failed; retrying in %ss", INDEX_RETRY_S, exc_info=True)
+            codes = _index["codes"] or set()
+            at = time.monotonic() - ttl + INDEX_RETRY_S
+        _index["codes"], _index["at"] = codes, at
+        return codes
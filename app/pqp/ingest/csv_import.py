@@ -0,0 +1,181 @@
+# app/pqp/ingest/csv_import.py
+"""
+CSV -> PQPSection rows, in one streaming pass.
+
+    imp = CsvSectionImport(file.stream, expected_columns)
+    if imp.missing: ...                      # header check, nothing read past it
+    for err in imp.merge_into(rows):         # rows = the section's row list (mutated)
+        ...                                  # per-row problems as they happen
+    imp.stats                                # {"created", "updated", "skipped", "duplicate"}
+
+The column map (expected column -> CSV position) is compiled once from the
+header, rows are read in chunks with the csv module, new ids are issued one
+batch per chunk and updates resolve through RowIndex, so the cost is
+O(rows x expected columns) regardless of how many rows the section holds.
+
+preview_csv() is the read-only twin for the preview endpoint: header plus the
+first N rows, the rest only counted, so memory stays flat for any file size.
+Both count bytes as they read and stop with UploadTooLarge past max_bytes.
+"""
+from __future__ import annotations
+
+import csv
+import io
+import os
+from itertools import islice
+from typing import Dict, Iterator, List, Optional
+
+from app.pqp.row_ids import RowIndex, new_row_ids
+from app.pqp.ingest.import_diff import content_hash
+
+CHUNK_ROWS = 5000
+PREVIEW_ROWS = 100
+MAX_CSV_BYTES = int(os.getenv("PQP_MAX_CSV_BYTES", str(256 * 1024 * 1024)))
+
+
+class UploadTooLarge(ValueError):
+    def __init__(self, max_bytes: int):
+        super().__init__(f"CSV is larger than the {max_bytes // (1024 * 1024)} MB limit")
+        self.max_bytes = max_bytes
+
+
+class _SizeLimitedRaw(io.RawIOBase):
+    """Raw reader over an upload stream that counts bytes and enforces max_bytes."""
+
+    def __init__(self, stream, max_bytes: Optional[int]):
+        self._stream = stream
+        self.max_bytes = max_bytes
+        self.bytes_read = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        data = self._stream.read(len(b))
+        n = len(data)
+        self.bytes_read += n
+        if self.max_bytes and self.bytes_read > self.max_bytes:
+            raise UploadTooLarge(self.max_bytes)
+        b[:n] = data
+        return n
+
+
+def open_csv_text(stream, max_bytes: Optional[int] = MAX_CSV_BYTES) -> io.TextIOWrapper:
+    """
+    Text view over an upload stream; a UTF-8 BOM is dropped, bad bytes replaced.
+    Reading past max_bytes raises UploadTooLarge (None = no limit).
+    """
+    raw = io.BufferedReader(_SizeLimitedRaw(stream, max_bytes))
+    return io.TextIOWrapper(raw, encoding="utf-8-sig", errors="replace", newline="")
+
+
+def _non_blank(reader) -> Iterator[tuple]:
+    """(line_no, cells) for every record with at least one non-blank cell."""
+    for cells in reader:
+        if cells and any(c.strip() for c in cells):
+            yield reader.line_num, cells
+
+
+def preview_csv(stream, expected: List[str], limit: int = PREVIEW_ROWS,
+                max_bytes: Optional[int] = MAX_CSV_BYTES) -> dict:
+    """
+    Header, missing/extra columns, the first `limit` rows (expected columns
+    only) and the total row count. Rows after the first `limit` are parsed
+    and counted but never kept.
+    """
+    reader = csv.reader(open_csv_text(stream, max_bytes))
+    header = [h.strip() for h in next(reader, [])]
+    colmap = [(c, i) for c, i in compile_column_map(header, expected) if i is not None]
+
+    rows = _non_blank(reader)
+    preview = [{c: (cells[i] if i < len(cells) else "") for c, i in colmap}
+               for _, cells in islice(rows, limit)]
+    row_count = len(preview) + sum(1 for _ in rows)
+
+    return {
+        "header": header,
+        "missing_columns": [c for c in expected if c not in header],
+        "extra_columns": [c for c in header if c not in expected],
+        "row_count": row_count,
+        "preview_rows": preview,
+    }
+
+
+def compile_column_map(header: List[str], expected: List[str]):
+    """[(column, position-or-None), ...] in expected order; first header match wins."""
+    pos: Dict[str, int] = {}
+    for i, h in enumerate(header):
+        pos.setdefault(h, i)
+    return [(c, pos.get(c)) for c in expected]
+
+
+class CsvSectionImport:
+    def __init__(self, stream, expected: List[str], chunk_rows: int = CHUNK_ROWS,
+                 max_bytes: Optional[int] = MAX_CSV_BYTES, dedupe: bool = True):
+        self.expected = list(expected)
+        self.chunk_rows = chunk_rows
+        self.dedupe = dedupe
+        self._reader = csv.reader(open_csv_text(stream, max_bytes))
+        self.header = [h.strip() for h in next(self._reader, [])]
+        self.missing = [c for c in self.expected if c not in self.header]
+        self.extra = [c for c in self.header if c not in self.expected]
+        self.colmap = compile_column_map(self.header, self.expected)
+        self.stats = {"created": 0, "updated": 0, "skipped": 0, "duplicate": 0}
+
+    def _chunks(self) -> Iterator[List[tuple]]:
+        """Lists of (line_no, cells), skipping blank lines."""
+        it = _non_blank(self._reader)
+        while True:
+            chunk = list(islice(it, self.chunk_rows))
+            if not chunk:
+                return
+            yield chunk
+
+    def _error(self, line_no: int, reason: str) -> dict:
+        self.stats["skipped"] += 1
+        return {"row": line_no, "reason": reason}
+
+    def merge_into(self, rows: list) -> Iterator[dict]:
+        """
+        Upsert every CSV row into `rows` by id (new ids for blank ones).
+        With dedupe, a row without an id whose content (content_hash) is
+        already in the section or earlier in the file is not added again.
+        Yields one {"row": line_no, "reason": ...} per skipped row.
+        """
+        index = RowIndex(rows)
+        index.repair_duplicates()
+        known = {content_hash(r) for r in rows if isinstance(r, dict)} if self.dedupe else set()
+        known.discard("")
+        width = len(self.header)
+        colmap = self.colmap
+        id_pos: Optional[int] = dict(colmap).get("id")
+
+        try:
+            for chunk in self._chunks():
+                need = sum(1 for _, cells in chunk
+                           if id_pos is None or id_pos >= len(cells) or not cells[id_pos].strip())
+                fresh = iter(new_row_ids(need))
+
+                for line_no, cells in chunk:
+                    if len(cells) > width and any(c.strip() for c in cells[width:]):
+                        yield self._error(line_no, f"{len(cells)} values for {width} columns")
+                        continue
+                    if len(cells) < width:
+                        cells = cells + [""] * (width - len(cells))
+
+                    row = {c: (cells[i] if i is not None else "") for c, i in colmap}
+                    if not str(row.get("id") or "").strip():
+                        if self.dedupe:
+                            h = content_hash(row)
+                            if h and h in known:
+                                self.stats["duplicate"] += 1
+                                continue
+                            known.add(h)
+                        row["id"] = next(fresh)
+                    if index.upsert(row):
+                        self.stats["updated"] += 1
+                    else:
+                        self.stats["created"] += 1
+        except csv.Error as e:
+            # the reader cannot resync after a malformed record; stop here
+            yield self._error(self._reader.line_num, f"CSV parse error, import stopped: {e}")
@@ -0,0 +1,199 @@
+# app/pqp/ingest/header_map.py
+"""
+Workbook header -> SECTION_DEFS column matching for the AI import.
+
+    hm = HeaderMatcher.for_section(idx)          # built once per section, cached
+    hm.match("Rep. Name")                        # -> ("Representative Name", 0.95, "synonym")
+    hm.match("E-mail address")                   # -> ("Email", 0.6, "token")
+
+Resolution order for one header (first hit wins):
+  learned    a mapping confirmed by an earlier commit of the same template
+  exact      normalised header == normalised column label              1.0
+  synonym    normalised header == one of SYNONYMS[label]               0.95
+  token      best token overlap (token -> labels index, abbreviations
+             expanded), Dice score x 0.9, kept if >= MIN_CONFIDENCE
+
+A "template" is a sheet layout: template_key() hashes the section number and
+the normalised header row, so the same client workbook resolves from
+import_header_maps in one indexed lookup on the next import.
+"""
+from __future__ import annotations
+
+import hashlib
+import re
+import unicodedata
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from app import metrics
+from app.pqp.sections import SECTION_DEFS
+from app.pqp.registry import SYNONYMS   # label -> normalised alternative names
+from app.pqp.models_import import HeaderMapping
+
+MIN_CONFIDENCE = 0.5
+CONFIRM_CONFIDENCE = 0.8      # mappings at or above this are remembered on commit
+
+# token spellings that mean the same thing in client headers
+_ABBREV = {
+    "rep": "representative", "reps": "representative",
+    "no": "number", "nr": "number", "num": "number", "ref": "reference",
+    "tel": "telephone", "phone": "telephone", "mobile": "cell",
+    "org": "organisation", "organization": "organisation", "organisations": "organisation",
+    "desc": "description", "proj": "project", "addr": "address",
+    "incl": "including", "dt": "date", "mgr": "manager", "req": "required", "reqd": "required",
+    "e": "", "mail": "email",
+}
+_STOP = {"", "s", "the", "of", "a", "an", "to", "is", "and", "for"}
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+
+
+def _ascii_lower(s) -> str:
+    return unicodedata.normalize("NFKD", str(s or "")).encode("ascii", "ignore").decode().strip().lower()
+
+
+def norm_header(s) -> str:
+    """'Rep. Name ' -> 'repname' (the key form SYNONYMS uses)."""
+    return _NON_ALNUM_RE.sub("", _ascii_lower(s))
+
+
+def header_tokens(s) -> frozenset:
+    """'E-mail' -> {'email'}; 'Rep. Name' -> {'representative', 'name'}."""
+    toks = _TOKEN_RE.findall(_ascii_lower(s))
+    return frozenset(t for t in (_ABBREV.get(t, t) for t in toks) if t not in _STOP)
+
+
+def template_key(idx: int, header: List[str]) -> str:
+    raw = f"{idx}|" + "|".join(norm_header(h) for h in header)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class HeaderMatcher:
+    """Per-section index: normalised key -> label, token -> labels."""
+
+    def __init__(self, labels: List[str]):
+        self.labels = [l for l in labels if l != "id"]
+        self.exact: Dict[str, Tuple[str, float, str]] = {"id": ("id", 1.0, "exact")}
+        self.label_tokens: Dict[str, frozenset] = {}
+        self.token_index: Dict[str, set] = {}
+
+        for lbl in self.labels:
+            self.exact.setdefault(norm_header(lbl), (lbl, 1.0, "exact"))
+        for lbl in self.labels:
+            for syn in SYNONYMS.get(lbl, []):
+                key = norm_header(syn)
+                hit = self.exact.get(key)
+                if hit is None:
+                    self.exact[key] = (lbl, 0.95, "synonym")
+                elif hit[2] == "synonym" and hit[0] != lbl:
+                    self.exact[key] = (hit[0], 0.6, "synonym")     # shared by two labels
+            toks = header_tokens(lbl)
+            self.label_tokens[lbl] = toks
+            for t in toks:
+                self.token_index.setdefault(t, set()).add(lbl)
+
+    @classmethod
+    @lru_cache(maxsize=None)
+    def for_section(cls, idx: int) -> "HeaderMatcher":
+        return cls(SECTION_DEFS[idx - 1])
+
+    def match(self, header) -> Optional[Tuple[str, float, str]]:
+        """(label, confidence, source) or None."""
+        key = norm_header(header)
+        if not key:
+            return None
+        hit = self.exact.get(key)
+        if hit:
+            return hit
+
+        toks = header_tokens(header)
+        cands = set()
+        for t in toks:
+            cands |= self.token_index.get(t, set())
+        best, best_score = None, 0.0
+        for lbl in cands:
+            lt = self.label_tokens[lbl]
+            score = 2 * len(toks & lt) / (len(toks) + len(lt))
+            if score > best_score or (score == best_score and best and self.labels.index(lbl) < self.labels.index(best)):
+                best, best_score = lbl, score
+        conf = round(best_score * 0.9, 2)
+        return (best, conf, "token") if best and conf >= MIN_CONFIDENCE else None
+
+    def map_header(self, header: List[str], learned: Optional[Dict[str, str]] = None) -> List[dict]:
+        """
+        One entry per header cell: {"pos", "header", "column", "confidence", "source"}
+        (column None when unmatched). Each column is taken by its best header only.
+        """
+        learned = learned or {}
+        out, taken = [], {}
+        for pos, h in enumerate(header):
+            ent = {"pos": pos, "header": h, "column": None, "confidence": 0.0, "source": None}
+            lbl = learned.get(norm_header(h))
+            hit = (lbl, 1.0, "learned") if lbl in self.labels or lbl == "id" else self.match(h)
+            if hit:
+                ent["column"], ent["confidence"], ent["source"] = hit
+                prev = taken.get(ent["column"])
+                if prev is not None and prev["confidence"] >= ent["confidence"]:
+                    ent["column"], ent["source"] = None, "taken"
+                else:
+                    if prev is not None:
+                        prev["column"], prev["source"] = None, "taken"
+                    taken[ent["column"]] = ent
+            out.append(ent)
+        return out
+
+
+def best_section(header: List[str]) -> Tuple[int, List[dict], float]:
+    """
+    (section number, mapping, score) of the section whose columns the header
+    matches best (score = summed confidence; 0 when nothing matches).
+    """
+    best = (1, [], 0.0)
+    for idx in range(1, len(SECTION_DEFS) + 1):
+        mapping = HeaderMatcher.for_section(idx).map_header(header)
+        score = sum(m["confidence"] for m in mapping if m["column"] and m["column"] != "id")
+        if score > best[2]:
+            best = (idx, mapping, score)
+    return best
+
+
+def confirmed(mapping: List[dict]) -> Dict[str, str]:
+    """{normalised header: column} for the entries worth remembering."""
+    return {norm_header(m["header"]): m["column"] for m in mapping
+            if m.get("column") and m.get("confidence", 0) >= CONFIRM_CONFIDENCE}
+
+
+# -------------------------- learned mappings --------------------------
+
+def learned_lookup(session):
+    """template_key -> {normalised header: column} (or None), one indexed query per key."""
+    def lookup(key: str) -> Optional[Dict[str, str]]:
+        hm = session.query(HeaderMapping).filter_by(template_key=key).first()
+        metrics.cache_event("header_map", hm is not None)
+        return hm.mapping if hm else None
+    return lookup
+
+
+def remember_mappings(session, payload: dict) -> int:
+    """
+    Store the confident header mappings of a committed payload per template
+    (caller commits). Returns the number of templates written.
+    """
+    n = 0
+    for sp in (payload or {}).get("sections") or []:
+        key, mapping = sp.get("template_key"), sp.get("mapping")
+        if not key or not mapping:
+            continue
+        learned = confirmed(mapping)
+        if not learned:
+            continue
+        hm = session.query(HeaderMapping).filter_by(template_key=key).first()
+        if hm is None:
+            hm = HeaderMapping(template_key=key, section_number=int(sp.get("index") or 0), uses=0)
+            session.add(hm)
+        hm.mapping = {**(hm.mapping or {}), **learned}
+        hm.uses = (hm.uses or 0) + 1
+        hm.updated_at = datetime.utcnow()
+        n += 1
+    return n
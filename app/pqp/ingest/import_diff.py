@@ -0,0 +1,202 @@
+# app/pqp/ingest/import_diff.py
+"""
+Diff an import payload against the rows already in PQPSection.
+
+Each incoming row is classified per section as
+  insert     - new id, or no id and no existing row with the same content
+  update     - id matches an existing row and at least one field differs
+  unchanged  - id matches and nothing differs, or no id but an identical row exists
+  duplicate  - no id and the same content already appeared earlier in the file
+  empty      - no values at all (ignored)
+
+Content is compared via content_hash(): the row's non-empty fields except
+'id', each normalised by norm_for_hash() (whitespace collapsed, case folded,
+dates as ISO, 5.0 == 5), so a re-imported workbook matches the rows it
+produced last time. The diff stored on ImportJob.diff references payload
+rows by position, so it stays small; commit re-runs the diff against the
+current section (under the section lock) and applies only inserts and the
+changed fields of updates.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+from datetime import date, datetime
+from typing import Any, Dict, List, Tuple
+
+from app.pqp.row_ids import RowIndex, new_row_ids
+
+
+_WS_RE = re.compile(r"\s+")
+_ISO_DATE_RE = re.compile(r"(\d{4})[-/](\d{1,2})[-/](\d{1,2})(?:[ T]00:00(?::00(?:\.0+)?)?)?")
+_DMY_DATE_RE = re.compile(r"(\d{1,2})[/\-.](\d{1,2})[/\-.](\d{4})")   # day first, as in ai_import
+
+
+def norm_value(v) -> str:
+    return "" if v is None else str(v).strip()
+
+
+def _iso(y, m, d) -> str:
+    try:
+        return date(int(y), int(m), int(d)).isoformat()
+    except ValueError:
+        return ""
+
+
+def norm_for_hash(v) -> str:
+    """
+    Canonical form of a cell for duplicate detection:
+      datetime/date and date strings (2024-1-5, 2024/01/05, 05/01/2024,
+      '2024-01-05 00:00:00') -> '2024-01-05'; 5.0 -> '5'; whitespace
+      collapsed; case folded.
+    """
+    if v is None:
+        return ""
+    if isinstance(v, datetime):
+        v = v.date() if v.time() == datetime.min.time() else v.isoformat(sep=" ")
+    if isinstance(v, date):
+        return v.isoformat()
+    if isinstance(v, float) and v.is_integer():
+        v = int(v)
+    s = _WS_RE.sub(" ", str(v)).strip()
+    if s[:1].isdigit():
+        m = _ISO_DATE_RE.fullmatch(s)
+        if m:
+            s = _iso(*m.groups()) or s
+        else:
+            m = _DMY_DATE_RE.fullmatch(s)
+            if m:
+                d, mth, y = m.groups()
+                s = _iso(y, mth, d) or s
+    return s.casefold()
+
+
+def content_hash(row: dict) -> str:
+    """Hash of the row's non-empty normalised fields (id and '_' keys excluded); '' for an empty row."""
+    body = {str(k).strip(): norm_for_hash(v) for k, v in row.items()
+            if k != "id" and not str(k).startswith("_")}
+    body = {k: v for k, v in body.items() if v}
+    if not body:
+        return ""
+    raw = json.dumps(body, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def dedupe_rows(rows: list) -> Tuple[list, int]:
+    """
+    Drop rows whose content_hash matches an earlier row (first one kept, ids
+    ignored). Used by the one-off cleanup (scripts/dedupe_sections.py).
+    Returns (kept_rows, removed_count).
+    """
+    seen, kept = set(), []
+    for r in rows:
+        h = content_hash(r) if isinstance(r, dict) else ""
+        if h and h in seen:
+            continue
+        if h:
+            seen.add(h)
+        kept.append(r)
+    return kept, len(rows) - len(kept)
+
+
+def section_rows(sec_payload: dict) -> list:
+    """Rows of one payload section (parsers use rows / data / items / table)."""
+    if not isinstance(sec_payload, dict):
+        return []
+    rows = (sec_payload.get("rows") or sec_payload.get("data")
+            or sec_payload.get("items") or sec_payload.get("table") or [])
+    return rows if isinstance(rows, list) else []
+
+
+def diff_section(existing: list, incoming: list) -> Dict[str, Any]:
+    """
+    {"insert": [pos, ...], "update": [{"pos", "id", "changes": {col: [old, new]}}],
+     "counts": {insert, update, unchanged, duplicate, empty}}
+    Positions index into `incoming`.
+    """
+    index = RowIndex(existing)
+    known = {content_hash(r) for r in existing if isinstance(r, dict)}
+    known.discard("")
+    seen = set()
+
+    inserts: List[int] = []
+    updates: List[dict] = []
+    counts = {"insert": 0, "update": 0, "unchanged": 0, "duplicate": 0, "empty": 0}
+
+    for pos, nr in enumerate(incoming):
+        if not isinstance(nr, dict):
+            continue
+        h = content_hash(nr)
+        rid = norm_value(nr.get("id"))
+        if not h:
+            counts["empty"] += 1
+            continue
+
+        if rid and rid in index:
+            cur = index.get(rid)
+            changes = {k: [cur.get(k, ""), v] for k, v in nr.items()
+                       if k != "id" and not str(k).startswith("_")
+                       and norm_value(v) != norm_value(cur.get(k))}
+            if changes:
+                updates.append({"pos": pos, "id": rid, "changes": changes})
+                counts["update"] += 1
+            else:
+                counts["unchanged"] += 1
+        elif not rid and h in known:
+            counts["unchanged"] += 1
+        elif not rid and h in seen:
+            counts["duplicate"] += 1
+        else:
+            inserts.append(pos)
+            counts["insert"] += 1
+        seen.add(h)
+
+    return {"insert": inserts, "update": updates, "counts": counts}
+
+
+def diff_payload(payload: dict, load_existing, n_sections: int) -> Dict[str, Any]:
+    """
+    Diff every payload section. load_existing(section_number) -> current rows.
+    Returns {"sections": [{"index", **diff}], "totals": counts, "computed_at"}.
+    """
+    out, totals = [], {"insert": 0, "update": 0, "unchanged": 0, "duplicate": 0, "empty": 0}
+    for sp in (payload or {}).get("sections") or []:
+        try:
+            idx = int(sp.get("index") or sp.get("section") or 0)
+        except Exception:
+            continue
+        incoming = section_rows(sp)
+        if not 1 <= idx <= n_sections or not incoming:
+            continue
+        d = diff_section(load_existing(idx), incoming)
+        out.append({"index": idx, **d})
+        for k, v in d["counts"].items():
+            totals[k] += v
+    return {"sections": out, "totals": totals, "computed_at": datetime.utcnow().isoformat()}
+
+
+def apply_section_diff(existing: list, incoming: list, diff: Dict[str, Any],
+                       with_id: bool = True) -> Dict[str, int]:
+    """
+    Apply a diff_section() result to `existing` (mutated): append the inserts
+    (blank ids filled from one batch) and write only the changed fields of updates.
+    """
+    index = RowIndex(existing)
+    index.repair_duplicates()
+
+    new_rows = [dict(incoming[pos]) for pos in diff["insert"]]
+    if with_id:
+        blank = [r for r in new_rows if not norm_value(r.get("id"))]
+        for r, rid in zip(blank, new_row_ids(len(blank))):
+            r["id"] = rid
+    for r in new_rows:
+        index.append(r)
+
+    updated = 0
+    for u in diff["update"]:
+        cur = index.get(u["id"])
+        if cur is not None:
+            cur.update({k: new for k, (_old, new) in u["changes"].items()})
+            updated += 1
+    return {"created": len(new_rows), "updated": updated}
@@ -0,0 +1,85 @@
+# app/pqp/ingest/import_undo.py
+"""
+Reverse deltas for AI import commits.
+
+commit_payload() records, per section it writes, what the import changed:
+
+    {"index": 3,
+     "remove":  [{"id", "h"}, ...],                  # rows it inserted (+ content_hash)
+     "restore": [{"id", "old": {col: v}, "new": {col: v}}, ...]}
+
+Only touched rows and touched fields are stored, so the delta grows with
+the size of the import's change, not with the section. The list is kept on
+ImportJob.undo; rollback_section() applies one entry to the section's
+current rows.
+
+A field (or inserted row) that was edited after the import is a conflict:
+it is left as it is and reported, unless force is set. The rollback route
+refuses the whole rollback when there are conflicts and force is not set.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, List
+
+from app.pqp.row_ids import RowIndex
+from app.pqp.ingest.import_diff import content_hash, norm_value
+
+
+def section_undo(idx: int, existing: list, diff: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Reverse delta for apply_section_diff(existing, incoming, diff). Call it
+    after apply_section_diff: the inserted rows are then the tail of
+    `existing` and carry their issued ids. Old/new field values come from
+    the diff itself.
+    """
+    n_new = len(diff["insert"])
+    inserted = existing[len(existing) - n_new:] if n_new else []
+
+    restore = [{"id": u["id"],
+                "old": {col: before for col, (before, _after) in u["changes"].items()},
+                "new": {col: after for col, (_before, after) in u["changes"].items()}}
+               for u in diff["update"]]
+
+    return {
+        "index": idx,
+        "remove": [{"id": norm_value(r.get("id")), "h": content_hash(r)} for r in inserted],
+        "restore": restore,
+    }
+
+
+def rollback_section(rows: list, delta: Dict[str, Any], force: bool = False) -> Dict[str, Any]:
+    """
+    Undo one section delta on `rows` (mutated in place).
+    Returns {"removed", "restored", "conflicts": [str, ...]}.
+    """
+    conflicts: List[str] = []
+    index = RowIndex(rows)
+
+    drop = set()
+    for rm in delta.get("remove") or []:
+        cur = index.get(rm["id"]) if rm.get("id") else None
+        if cur is None:
+            continue                                      # already deleted on the form
+        if not force and content_hash(cur) != rm.get("h"):
+            conflicts.append(f"row {rm['id']} was edited after the import; kept")
+            continue
+        drop.add(id(cur))
+
+    restored = 0
+    for rs in delta.get("restore") or []:
+        cur = index.get(rs["id"])
+        if cur is None:
+            conflicts.append(f"row {rs['id']} no longer exists; not restored")
+            continue
+        changed = False
+        for col, new in (rs.get("new") or {}).items():
+            if not force and norm_value(cur.get(col)) != norm_value(new):
+                conflicts.append(f"row {rs['id']} field {col!r} was edited after the import; kept")
+                continue
+            cur[col] = rs["old"].get(col, "")
+            changed = True
+        restored += changed
+
+    if drop:
+        rows[:] = [r for r in rows if id(r) not in drop]
+    return {"removed": len(drop), "restored": restored, "conflicts": conflicts}
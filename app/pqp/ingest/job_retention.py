@@ -0,0 +1,96 @@
+# app/pqp/ingest/job_retention.py
+"""
+Retention for import_jobs.
+
+Every AI import preview adds a job that holds the whole parsed workbook.
+  - preview / failed jobs older than PQP_IMPORT_PREVIEW_DAYS (default 7)
+    are deleted: they were never committed, nothing refers to them;
+  - committed / rolled_back jobs older than PQP_IMPORT_KEEP_DAYS (default 90)
+    are archived: the row (filename, code, status, issues, dates) stays as
+    the import history, payload / diff / undo are dropped (no rollback past
+    that point) and purged_at is set.
+
+purge_import_jobs() runs both as bulk statements. maybe_purge() is the
+cheap hook for request paths: at most once per PURGE_INTERVAL_S per worker.
+scripts/purge_import_jobs.py runs it by hand and compresses legacy payloads.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import null
+
+from app.pqp.models_import import ImportJob
+
+log = logging.getLogger(__name__)
+
+PREVIEW_DAYS = int(os.getenv("PQP_IMPORT_PREVIEW_DAYS", "7"))
+KEEP_DAYS = int(os.getenv("PQP_IMPORT_KEEP_DAYS", "90"))
+PURGE_INTERVAL_S = int(os.getenv("PQP_IMPORT_PURGE_INTERVAL_S", "3600"))
+
+_last_run = 0.0
+_run_lock = threading.Lock()
+
+
+def purge_import_jobs(session, now: datetime | None = None,
+                      preview_days: int = PREVIEW_DAYS, keep_days: int = KEEP_DAYS) -> dict:
+    """Delete stale previews, archive old commits. Commits; returns counts."""
+    now = now or datetime.utcnow()
+    deleted = (session.query(ImportJob)
+               .filter(ImportJob.status.in_(("preview", "failed")),
+                       ImportJob.created_at < now - timedelta(days=preview_days))
+               .delete(synchronize_session=False))
+    archived = (session.query(ImportJob)
+                .filter(ImportJob.status.in_(("committed", "rolled_back")),
+                        ImportJob.created_at < now - timedelta(days=keep_days),
+                        ImportJob.purged_at.is_(None))
+                .update({ImportJob._payload_json: null(), ImportJob.payload_gz: None,
+                         ImportJob.diff: null(), ImportJob.undo: null(),
+                         ImportJob.stored_bytes: 0, ImportJob.purged_at: now},
+                        synchronize_session=False))
+    session.commit()
+    return {"deleted": deleted, "archived": archived}
+
+
+def maybe_purge(session) -> dict | None:
+    """purge_import_jobs() if this worker hasn't run it in PURGE_INTERVAL_S; never raises."""
+    global _last_run
+    if time.monotonic() - _last_run < PURGE_INTERVAL_S or not _run_lock.acquire(blocking=False):
+        return None
+    try:
+        _last_run = time.monotonic()
+        res = purge_import_jobs(session)
+        if res["deleted"] or res["archived"]:
+            log.info("import_jobs retention: %s", res)
+        return res
+    except Exception as e:
+        session.rollback()
+        log.warning("import_jobs retention failed: %s", e)
+        return None
+    finally:
+        _run_lock.release()
+
+
+def compress_legacy(session, batch: int = 200) -> int:
+    """
+    Move uncompressed payloads (jobs written before payload_gz) into
+    payload_gz. Those are the rows without payload_bytes. Returns jobs converted.
+    """
+    done = 0
+    while True:
+        jobs = (session.query(ImportJob)
+                .filter(ImportJob.payload_bytes.is_(None), ImportJob.purged_at.is_(None))
+                .order_by(ImportJob.id).limit(batch).all())
+        if not jobs:
+            return done
+        for j in jobs:
+            data = j._payload_json
+            j.payload = data
+            if data is None:
+                j.payload_bytes = j.stored_bytes = 0
+        session.commit()
+        done += len(jobs)
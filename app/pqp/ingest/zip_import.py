@@ -0,0 +1,59 @@
+# app/pqp/ingest/zip_import.py
+"""
+Read side of the "Export All Sections (CSV .zip)" bundle.
+
+pqp_export_zip_csv writes one section_N.csv per SECTION_DEFS entry. Here we
+find those members, check every header before anything is written, and hand
+each member to CsvSectionImport as a decompressing stream (members are never
+extracted to memory or disk as a whole).
+"""
+from __future__ import annotations
+
+import re
+import zipfile
+from typing import Dict, List, Tuple
+
+from app.pqp.sections import SECTION_DEFS
+from app.pqp.ingest.csv_import import MAX_CSV_BYTES, CsvSectionImport, UploadTooLarge
+
+SECTION_FILE_RE = re.compile(r"(?:^|/)section_(\d+)\.csv$", re.IGNORECASE)
+
+
+def section_members(zf: zipfile.ZipFile) -> Tuple[Dict[int, zipfile.ZipInfo], List[str]]:
+    """{section_number: ZipInfo} for section_N.csv members (any folder), plus notes."""
+    members: Dict[int, zipfile.ZipInfo] = {}
+    notes: List[str] = []
+    for info in zf.infolist():
+        if info.is_dir() or info.filename.startswith("__MACOSX/"):
+            continue
+        m = SECTION_FILE_RE.search(info.filename)
+        if not m:
+            notes.append(f"{info.filename}: not a section_N.csv file, ignored")
+            continue
+        n = int(m.group(1))
+        if not 1 <= n <= len(SECTION_DEFS):
+            notes.append(f"{info.filename}: no section {n}, ignored")
+        elif n in members:
+            notes.append(f"{info.filename}: duplicate of {members[n].filename}, ignored")
+        elif info.file_size > MAX_CSV_BYTES:
+            notes.append(f"{info.filename}: {UploadTooLarge(MAX_CSV_BYTES)}")
+        else:
+            members[n] = info
+    return members, notes
+
+
+def check_headers(zf: zipfile.ZipFile, members: Dict[int, zipfile.ZipInfo]) -> Dict[int, List[str]]:
+    """{section_number: missing columns} for every member whose header is incomplete."""
+    bad = {}
+    for n, info in sorted(members.items()):
+        with zf.open(info) as fh:
+            missing = CsvSectionImport(fh, SECTION_DEFS[n - 1]).missing
+        if missing:
+            bad[n] = missing
+    return bad
+
+
+def open_section(zf: zipfile.ZipFile, n: int, info: zipfile.ZipInfo):
+    """(open member stream, CsvSectionImport) — caller closes the stream."""
+    fh = zf.open(info)
+    return fh, CsvSectionImport(fh, SECTION_DEFS[n - 1])
@@ -1,10 +1,21 @@
 # app/pqp/models_import.py
+import gzip
+import json
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, JSON, DateTime
+from sqlalchemy import Column, Integer, String, JSON, DateTime, LargeBinary
+from sqlalchemy.orm import deferred, validates
 
 # <-- use the same db you already use everywhere else -->
 from app import db
 
+MAX_ISSUES = 200          # per job; older entries are dropped first
+
+
+def compress_payload(payload):
+    """(gzip bytes, uncompressed size). Values JSON can't encode (pandas Timestamps) become str."""
+    raw = json.dumps(payload, ensure_ascii=False, default=str, separators=(",", ":")).encode("utf-8")
+    return gzip.compress(raw, compresslevel=6), len(raw)
+
 
 class ImportJob(db.Model):
     __tablename__ = "import_jobs"
@@ -12,8 +23,60 @@ class ImportJob(db.Model):
     id = Column(Integer, primary_key=True)
     filename = Column(String(260))
     project_code = Column(String(50))
-    status = Column(String(30), default="preview")   # preview|committed|failed
-    issues = Column(JSON)                            # list[str]
-    payload = Column(JSON)                           # normalized data by section
+    status = Column(String(30), default="preview")   # preview|committed|failed|rolled_back
+    issues = Column(JSON)                            # list[str], capped at MAX_ISSUES
+    # normalized data by section: gzip(JSON) in payload_gz; "payload" is the
+    # uncompressed column of jobs written before compression (read-only now).
+    # Both are deferred so job listings never load them.
+    _payload_json = deferred(Column("payload", JSON))
+    payload_gz = deferred(Column(LargeBinary))
+    payload_bytes = Column(Integer)                  # uncompressed JSON size
+    stored_bytes = Column(Integer)                   # size of payload_gz
+    diff = deferred(Column(JSON))                    # insert/update/unchanged per section (import_diff)
+    undo = deferred(Column(JSON))                    # reverse delta per written section (import_undo)
     created_at = Column(DateTime, default=datetime.utcnow)
     committed_at = Column(DateTime)
+    rolled_back_at = Column(DateTime)
+    purged_at = Column(DateTime)                     # payload/diff/undo dropped by retention
+
+    @property
+    def payload(self):
+        gz = self.payload_gz
+        if gz is None:
+            return self._payload_json
+        cache = self.__dict__.get("_payload_cache")
+        if cache is None or cache[0] is not gz:
+            cache = (gz, json.loads(gzip.decompress(gz)))
+            self.__dict__["_payload_cache"] = cache
+        return cache[1]
+
+    @payload.setter
+    def payload(self, value):
+        if value is None:
+            self.payload_gz = None
+            self.payload_bytes = self.stored_bytes = None
+        else:
+            gz, size = compress_payload(value)
+            self.payload_gz = gz
+            self.payload_bytes = size
+            self.stored_bytes = len(gz)
+        self._payload_json = None
+
+    @validates("issues")
+    def _cap_issues(self, _key, issues):
+        if isinstance(issues, list) and len(issues) > MAX_ISSUES:
+            dropped = len(issues) - MAX_ISSUES + 1
+            issues = [f"({dropped} earlier issues dropped)"] + issues[-(MAX_ISSUES - 1):]
+        return issues
+
+
+class HeaderMapping(db.Model):
+    """Confirmed workbook header -> section column mappings per sheet layout (header_map)."""
+    __tablename__ = "import_header_maps"
+
+    id = Column(Integer, primary_key=True)
+    template_key = Column(String(40), unique=True, index=True, nullable=False)   # header_map.template_key()
+    section_number = Column(Integer)
+    mapping = Column(JSON)                           # {normalised header: column label}
+    uses = Column(Integer, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
@@ -226,3 +226,25 @@ class PQPSection(db.Model):
     completed      = db.Column(db.Boolean, nullable=False, server_default=text("false"))
     last_edited_on = db.Column(db.DateTime(timezone=True), server_default=func.now())
     created_at     = db.Column(db.DateTime(timezone=True), server_default=func.now())
+
+
+class ProjectSummary(db.Model):
+    """One row per project_code, maintained on write (see app/pqp/project_summary.py)."""
+    __tablename__  = "project_summaries"
+    __table_args__ = (
+        db.Index("ix_project_summaries_status_completion", "status", "completion_pct"),
+        db.Index("ix_project_summaries_last_activity", "last_activity_at"),
+        {"schema": "pqp"},
+    )
+
+    project_code     = db.Column(db.Text, primary_key=True)
+    sections         = db.Column(JSONB, nullable=False, server_default=text("'{}'::jsonb"))  # {"<n>": {pct, rows, completed}}
+    completion_pct   = db.Column(db.Integer, nullable=False, server_default=text("0"))
+    sections_done    = db.Column(db.Integer, nullable=False, server_default=text("0"))
+    status           = db.Column(db.Text)        # ProjectRecords Status, else inferred from end_date
+    end_date         = db.Column(db.Date)
+    checklist_open   = db.Column(db.Integer, nullable=False, server_default=text("0"))
+    overdue_count    = db.Column(db.Integer, nullable=False, server_default=text("0"))
+    next_due         = db.Column(db.Date)        # earliest open checklist due date
+    last_activity_at = db.Column(db.DateTime(timezone=True))
+    updated_at       = db.Column(db.DateTime(timezone=True), server_default=func.now())
@@ -1,13 +1,13 @@
 # app/pqp/pqp_routes.py
 import os
 import io
+import uuid
 import csv
 import json
 import time
 import zipfile
 from datetime import date, datetime
 
-import psycopg2.extras
 from flask import jsonify
 
 # DB connection helper
@@ -38,13 +38,22 @@ def as_bool(val):
     """Convert form values like 'on', 'true', '1' to boolean True, else False."""
     return str(val).lower() in ("1", "true", "on", "yes")
 
-from sqlalchemy import select, update, insert, MetaData, Table, func, text
+from sqlalchemy import select, update, insert, MetaData, Table, Text, and_, cast, func, text
 import re                               # <- needed for the slug helper
 
 
 from datetime import datetime
 from app.pqp.models_import import ImportJob
+from app.pqp.ingest.job_retention import maybe_purge
 from app.pqp.ingest.ai_import import parse_workbook_to_payload, commit_payload
+from app.pqp.ingest.csv_import import MAX_CSV_BYTES, CsvSectionImport, UploadTooLarge, preview_csv
+from app.pqp.ingest.zip_import import check_headers, open_section, section_members
+from app.pqp.ingest.import_diff import diff_payload
+from app.pqp.ingest.code_detect import detect_project_code, known_codes
+from app.pqp.ingest.header_map import best_section, learned_lookup, remember_mappings
+from app.pqp.dashboard_stats import dashboard_stats, project_page
+from app.pqp.project_summary import available as summaries_available, checklist_changed, infer_status
+from app.pqp.project_summary import refresh_header as refresh_summary_header
 
 # String/date helpers
 from datetime import date, datetime
@@ -76,7 +85,7 @@ def normalize_code_full(s: str) -> str:
 
 from flask import (
     Blueprint, render_template, request, redirect, url_for, flash,
-    Response, jsonify, send_file, abort, current_app
+    Response, jsonify, send_file, abort, current_app, stream_with_context, session
 )
 from werkzeug.utils import secure_filename
 
@@ -91,317 +100,32 @@ from sqlalchemy.exc import NoSuchTableError
 from app.extensions import db
 
 
-from app.pqp.pqp_models import Project, PQPDetail, PQPSection
+from app.pqp.pqp_models import Project, PQPDetail, PQPSection, ProjectSummary
 from app.pqp.sections import SECTION_DEFS, DEFAULT_SECTION_TITLES, get_section_columns
+from app.pqp.grid_data import parse_grid_args, page_json_section, page_rows, page_table, row_version, table_columns
+from app.pqp.row_edit import patch_json_row, patch_table_row
+from app.pqp.section_lock import SectionBusy, lock_section, lock_stats
+from app.pqp.row_ids import RowIndex, new_row_id, new_row_ids
+from app.pqp import registry
+from app.pqp.registry import (LABEL_KEYS, SECTION_COLS, SECTION_PART_COLS, SECTION_PART_TABLES,
+                              SUB_TABLE_MAP, SUBSECTIONS, norm_key)
+from app import has_org_id, metrics
 
 from sqlalchemy import text  # needed by the API queries
 
 
 
-# --- Harden section lookup: map codes -> table(s)
-SECTION_META = {
-    "section101":   {"tables": ["pqp.section101"], "title": "Section 101"},
-    "risk_concept": {"tables": ["pqp.risk_concept"], "title": "Concept & Design Development"},
-    "risk_docs":    {"tables": ["pqp.risk_docs"],    "title": "Documentation & Tender"},
-    "risk_works":   {"tables": ["pqp.risk_works"],   "title": "Implementation / Works"},
-    # Example for multi-table sections later:
-    # "section3": {"tables": ["pqp.section3_header", "pqp.section3_items"], "title": "Appointment & Milestones"}
-}
+# Section declarations and their compiled indexes live in app/pqp/registry.py.
+# SECTION_TABLE is a per-process copy: _hydrate_section_from_tables caches guessed tables in it.
+SECTION_TABLE = dict(registry.SECTION_TABLE)
+
 
 def _columns_for_table(engine, table_qualified: str):
-    """Return column list using information_schema (ordered)."""
-    schema, table = table_qualified.split('.', 1)
-    sql = """
-    select column_name
-    from information_schema.columns
-    where table_schema = :s and table_name = :t
-    order by ordinal_position
-    """
-    from sqlalchemy import text
+    """Return column list using information_schema (ordered, cached per worker)."""
     with engine.connect() as c:
-        return [r[0] for r in c.execute(text(sql), {"s": schema, "t": table})]
-
-
-
-
-
-# --- Section → DB table mapping (aligned with Supabase current schema) ---
-# NOTE: Section 3 is composite (31/32/33) and is handled by _load_section3_from_parts.
-#       Section 9 (Scope Register) may be composite (91/92); we keep it special-friendly.
-SECTION_TABLE = {
-    1: "pqp.section1",
-    2: "pqp.section2",
-    3: None,              # composite, handled separately
-    4: "pqp.section4",
-    5: "pqp.section5",
-    6: "pqp.section6",
-    7: "pqp.section7",
-    8: "pqp.section8",
-    9: "pqp.section9",    # if yours is split 91/92, leave this as None and load via its own helper
-    10: None,             # keep spare; your UI shows up to 10 panels
-}
-
-# --- UI column labels per panel (kept exactly as your templates expect) ---
-SECTION_COLS = {
-    1: ["id","Project Description","Location","Client Organisation","Primary Contact Name",
-        "VAT Number","Designation","Invoice Address"],
-    2: ["id","Role","Req'd","Organisation","Representative Name","Email","Cell",
-        "Subconsultant to HN?","Subconsultant Agreement?","CPG Partner?","CPG %","Comments"],
-    3: ["id","In Place","Date","Filing Location","Notes",
-        "Appointment Date","Expected Duration","Contract/Ref No","Comments"],
-    4: ["id","Design Criteria/Requirements","Planning & Design Risks",
-        "Scope Register Location","Design Notes"],
-    5: ["id","Client Tender Doc Requirements","Form of Contract","Standard Specs",
-        "Client Template Date","Documentation Risks","Tender Phase Notes"],
-    6: ["id","Construction Description","Contractor Organisation","Contract Number",
-        "Award Value (incl VAT)","Award Date","Original Order No","Original Date of Order",
-        "Inception Meeting Date","Final Payment Cert Date","Final Value (incl VAT)",
-        "Commencement of Works","Date of EA's Instruction","Where Instruction Recorded",
-        "Completion Date","Final Approval Date","Client Takeover Date",
-        "Commencement Instruction Date","Commencement Instruction Location",
-        "Construction Phase Risks","Construction Phase Notes"],
-    7: ["id","Additional Services Done","Project-specific Risks",
-        "Mitigating Measures","Record of Action Taken","Notes"],
-    8: ["id","Date CSQ Submitted","Date CSQ Received","CSQ Rating","Location",
-        "Comments on Feedback","Actual Close-Out Date","General Remarks/Lessons Learned"],
-    9: ["id","Scope Item","Category","Owner","Status","Due Date","Notes"],
-    10: ["id"],  # reserved; template will tolerate empty rows
-}
-
-# --- DB→UI column name mapping per section (non-destructive; best effort) ---
-# Left side: actual DB column names; right side: your UI label names in SECTION_COLS.
-# If a column is missing, it is silently ignored.
-DB_TO_UI_COLS = {
-    1: {
-        "project_code": "id",
-        "project_description": "Project Description",
-        "location": "Location",
-        "client_organisation": "Client Organisation",
-        "primary_contact_name": "Primary Contact Name",
-        "vat_number": "VAT Number",
-        "designation": "Designation",
-        "invoice_address": "Invoice Address",
-    },
-    2: {
-        "project_code": "id",
-        "role": "Role",
-        "required": "Req'd",
-        "organisation": "Organisation",
-        "representative_name": "Representative Name",
-        "email": "Email",
-        "cell": "Cell",
-        "is_subconsultant": "Subconsultant to HN?",
-        "has_subconsultant_agreement": "Subconsultant Agreement?",
-        "is_cpg_partner": "CPG Partner?",
-        "cpg_percent": "CPG %",
-        "comments": "Comments",
-    },
-    4: {
-        "project_code": "id",
-        "design_criteria": "Design Criteria/Requirements",
-        "planning_design_risks": "Planning & Design Risks",
-        "scope_register_location": "Scope Register Location",
-        "design_notes": "Design Notes",
-    },
-    5: {
-        "project_code": "id",
-        "client_tender_requirements": "Client Tender Doc Requirements",
-        "form_of_contract": "Form of Contract",
-        "standard_specs": "Standard Specs",
-        "client_template_date": "Client Template Date",
-        "documentation_risks": "Documentation Risks",
-        "tender_phase_notes": "Tender Phase Notes",
-    },
-    6: {
-        "project_code": "id",
-        "construction_description": "Construction Description",
-        "contractor_organisation": "Contractor Organisation",
-        "contract_number": "Contract Number",
-        "award_value_incl_vat": "Award Value (incl VAT)",
-        "award_date": "Award Date",
-        "original_order_no": "Original Order No",
-        "original_order_date": "Original Date of Order",
-        "inception_meeting_date": "Inception Meeting Date",
-        "final_payment_cert_date": "Final Payment Cert Date",
-        "final_value_incl_vat": "Final Value (incl VAT)",
-        "commencement_of_works": "Commencement of Works",
-        "ea_instruction_date": "Date of EA's Instruction",
-        "ea_instruction_location": "Where Instruction Recorded",
-        "completion_date": "Completion Date",
-        "final_approval_date": "Final Approval Date",
-        "client_takeover_date": "Client Takeover Date",
-        "commencement_instruction_date": "Commencement Instruction Date",
-        "commencement_instruction_location": "Commencement Instruction Location",
-        "construction_phase_risks": "Construction Phase Risks",
-        "construction_phase_notes": "Construction Phase Notes",
-    },
-    7: {
-        "project_code": "id",
-        "additional_services_done": "Additional Services Done",
-        "project_specific_risks": "Project-specific Risks",
-        "mitigating_measures": "Mitigating Measures",
-        "record_of_action": "Record of Action Taken",
-        "notes": "Notes",
-    },
-    8: {
-        "project_code": "id",
-        "date_csq_submitted": "Date CSQ Submitted",
-        "date_csq_received": "Date CSQ Received",
-        "csq_rating": "CSQ Rating",
-        "location": "Location",
-        "feedback_comments": "Comments on Feedback",
-        "actual_close_out_date": "Actual Close-Out Date",
-        "general_remarks": "General Remarks/Lessons Learned",
-    },
-    9: {
-        "project_code": "id",
-        "scope_item": "Scope Item",
-        "category": "Category",
-        "owner": "Owner",
-        "status": "Status",
-        "due_date": "Due Date",
-        "notes": "Notes",
-    },
-}
-
-# === BEGIN ADD: multi-table section metadata ===============================
-
-# For sections that are composed of multiple physical tables (e.g., 3 = 31/32/33,
-# 4 = 41/42, etc). The UI will use these to render sub-panels, and the loader
-# will know which underlying tables to read from.
-SECTION_PART_TABLES = {
-    3:  {
-        "31": ("Appointment — Records/Storage",   "pqp.section31"),
-        "32": ("Appointment — Review",            "pqp.section32"),
-        "33": ("Appointment — Deliverables",      "pqp.section33"),
-    },
-    4:  {
-        "41": ("Planning & Design — Criteria",    "pqp.section41"),
-        "42": ("Planning & Design — Approvals",   "pqp.section42"),
-    },
-    5:  {
-        "51": ("Documentation — Requirements",    "pqp.section51"),
-        "52": ("Tender — Notes/Risks",            "pqp.section52"),
-    },
-    6:  {
-        "61": ("Works — Contract/Award",          "pqp.section61"),
-        "62": ("Works — Dates/Instructions",      "pqp.section62"),
-        "63": ("Works — Completion/Final",        "pqp.section63"),
-    },
-    7:  {
-        "71": ("Additional Services — Items",     "pqp.section71"),
-        "72": ("Additional Services — Actions",   "pqp.section72"),
-    },
-    9:  {
-        "91": ("Scope Register — Items",          "pqp.section91"),
-        "92": ("Scope Register — Tasks",          "pqp.section92"),
-    },
-    10: {
-        "101": ("Risk Register",                  "pqp.section101"),
-    },
-}
-
-# Optional: if you already know a part’s column order, declare it here so the UI
-# can label columns consistently. When not provided, we’ll derive from the table
-# itself (information_schema) and still display.
-SECTION_PART_COLS = {
-    # Section 3 already has a dedicated loader; you can leave it empty here or
-    # duplicate it for consistency. Example:
-    3: {
-        "31": ["id", "item", "in_place", "date_val", "filing_location", "notes"],
-        "32": ["id", "appointment_review_date", "appointment_reviewer", "review_comments",
-               "appointment_roles", "appointment_date", "expected_duration",
-               "original_end_date", "contract_ref_no", "general_comments"],
-        "33": ["id", "ecsa_project_stage", "date_completed", "description_of_deliverable",
-               "deliverable", "deliverable_accepted", "employer_approved", "comments"],
-    },
-    # Section 10 (Risk Register) — from your screenshot/notes
-    10: {
-        "101": [
-            "heading_id","id","risk_code","title","description","cause","consequence",
-            "category","likelihood","impact","treatment","owner","due_date","status",
-            "extra","date_created","date_modified","row_id"
-        ],
-    },
-}
-
-# === END ADD: multi-table section metadata =================================
-
-
-
-
-# --- MULTI-TABLE SECTIONS (add once) ---------------------------------------
-from collections import OrderedDict
-
-SUBSECTIONS = {
-    3: OrderedDict([
-        ("31", {"title": "3.1 Appointment",                  "table": "pqp.section31"}),
-        ("32", {"title": "3.2 Milestones",                   "table": "pqp.section32"}),
-        ("33", {"title": "3.3 Deliverables / Approvals",     "table": "pqp.section33"}),
-    ]),
-    4: OrderedDict([
-        ("41", {"title": "4.1 Planning & Design",            "table": "pqp.section41"}),
-        ("42", {"title": "4.2 Project-specific Risks",       "table": "pqp.section42"}),
-    ]),
-    5: OrderedDict([
-        ("51", {"title": "5.1 Documentation",                "table": "pqp.section51"}),
-        ("52", {"title": "5.2 Tender",                       "table": "pqp.section52"}),
-    ]),
-    6: OrderedDict([
-        ("61", {"title": "6.1 Contracts / Orders",           "table": "pqp.section61"}),
-        ("62", {"title": "6.2 Payments / Certificates",      "table": "pqp.section62"}),
-        ("63", {"title": "6.3 Instructions / Handover",      "table": "pqp.section63"}),
-    ]),
-    7: OrderedDict([
-        ("71", {"title": "7.1 Additional Services",          "table": "pqp.section71"}),
-        ("72", {"title": "7.2 Actions & Notes",              "table": "pqp.section72"}),
-    ]),
-    9: OrderedDict([
-        ("91", {"title": "9.1 Scope Items",                  "table": "pqp.section91"}),
-        ("92", {"title": "9.2 Scope Notes",                  "table": "pqp.section92"}),
-    ]),
-    10: OrderedDict([
-        ("101", {"title": "10 Risk Register",                "table": "pqp.section101"}),
-    ]),
-}
-
-# name-matching hints for auto-guessing when a table name differs
-SECTION_KEYWORDS = {
-    31: ["section31","appoint","appointment"],
-    32: ["section32","milestone"],
-    33: ["section33","deliver","approval"],
-    41: ["section41","planning","design"],
-    42: ["section42","risk"],
-    51: ["section51","doc","documentation"],
-    52: ["section52","tender"],
-    61: ["section61","contract","order"],
-    62: ["section62","payment","certificate"],
-    63: ["section63","instruction","handover"],
-    71: ["section71","additional","service"],
-    72: ["section72","action","note"],
-    91: ["section91","scope","item"],
-    92: ["section92","scope","note"],
-    101:["section101","risk","register"],
-}
-
-# exact UI column set for 101 (Risk Register)
-COLS_101 = [
-    "id","risk_code","title","description","cause","consequence","category",
-    "likelihood","impact","treatment","owner","due_date","status",
-    "heading_id","extra","date_created","date_modified","row_id"
-]
-# ---------------------------------------------------------------------------
+        return list(table_columns(c, table_qualified))
+
 
-# ---- PQP SUBSECTION → TABLE MAP (schema 'pqp') ----
-SUB_TABLE_MAP = {
-    31: "section31", 32: "section32", 33: "section33",
-    41: "section41", 42: "section42",
-    51: "section51", 52: "section52",
-    61: "section61", 62: "section62", 63: "section63",
-    71: "section71", 72: "section72",
-    91: "section91", 92: "section92",       # Scope Register
-    101: "risk_register"                     # Risk Register
-}
 # Columns we don't want to *display* by default (still kept in row dicts)
 HIDE_DISPLAY_COLS = {"id", "project_code", "project code", "tenant_id", "tenant id"}
 
@@ -439,27 +163,7 @@ def fetch_section_rows(conn, project_code: str, section_number: int):
 
 
 
-# ---------- Project ID detection helpers ----------
-
-
-_CODE_CORE = r"(?:\b\d{3}[A-Z]{2,3}\b)"               # e.g., 291RT, 322IN, 320ST, 101RT
-_CODE_SUFFIX = r"(?:\s*(?:P\d{3}))"                    # optional: ' P700', ' P232'
-_CODE_FULL_RE = re.compile(rf"{_CODE_CORE}(?:{_CODE_SUFFIX})?", re.IGNORECASE)
-
-def _normalize_project_id(s: str) -> str:
-    """
-    Returns a normalized project_id.
-    - Keeps forms like '291RT P700' intact if present.
-    - Otherwise returns the core like '322IN'.
-    - Trims repeated whitespace.
-    """
-    if not s:
-        return ""
-    s = " ".join(str(s).strip().split())
-    m = _CODE_FULL_RE.search(s)
-    if not m:
-        return ""
-    return m.group(0).upper()
+# ---------- Project ID detection: app/pqp/ingest/code_detect.py ----------
 
 
 def _to_str(v):
@@ -561,38 +265,16 @@ def _load_section3_from_parts(code: str):
 
 
 
-def _detect_project_id_from_context(filename: str, sheetnames: list[str], first_cells_text: str = "") -> str:
-    """
-    Tries to find a project_id in (1) filename, then (2) sheet names, then (3) a blob of sampled cell text.
-    Returns '' if nothing matched.
-    """
-    # 1) filename
-    pid = _normalize_project_id(filename or "")
-    if pid:
-        return pid
-
-    # 2) sheet names (scan them all, pick the first that matches)
-    for nm in sheetnames or []:
-        pid = _normalize_project_id(nm or "")
-        if pid:
-            return pid
-
-    # 3) sampled cell text (if caller provides it)
-    pid = _normalize_project_id(first_cells_text or "")
-    return pid
-# ---------------------------------------------------
-
-
-
-
 # -------------------------- helpers --------------------------
 # These helpers are used to manage section rows in the PQPSection model.
 def _upsert_section_rows(project_code: str, section_number: int, columns: list, rows: list):
     """
     Ensure PQPSection(project_code, section_number) exists and store rows as JSON list.
     """
+    lock_section(db.session, project_code, section_number)
     sec = (db.session.query(PQPSection)
            .filter_by(project_code=project_code, section_number=section_number)
+           .populate_existing()
            .first())
     if not sec:
         sec = PQPSection(project_code=project_code, section_number=section_number)
@@ -605,6 +287,10 @@ def _upsert_section_rows(project_code: str, section_number: int, columns: list,
             cleaned.append({c: r.get(c) for c in columns})
         else:
             cleaned.append(r)
+    # rows without an id get one (single batch)
+    missing = [r for r in cleaned if isinstance(r, dict) and "id" in r and not str(r.get("id") or "").strip()]
+    for r, rid in zip(missing, new_row_ids(len(missing))):
+        r["id"] = rid
 
     sec.rows_json = json.dumps(cleaned)          # preferred by the form
     # Optional: also keep columns for the form if your template uses them
@@ -712,6 +398,15 @@ def _col(t, name: str):
     raise KeyError(name)
 
 
+def _known_project_codes() -> set:
+    """Canonical ProjectRecords codes for code detection (cached per worker, see code_detect)."""
+    def load():
+        PR = _projectrecords(db.engine)
+        with db.engine.connect() as conn:   # own connection: a failure never aborts the request session
+            return conn.execute(select(_col(PR, PR_COL_CODE))).scalars().all()
+    return known_codes(load)
+
+
 # ------------------------------------------------------------------------------
 # PQP Section side-table (by ProjectRecords.Code)
 # ------------------------------------------------------------------------------
@@ -751,10 +446,38 @@ def _ensure_sections_by_code(code: str, only_section: int | None = None) -> None
 # ------------------------------------------------------------------------------
 # Dashboard & legacy ID-based form (left intact)
 # ------------------------------------------------------------------------------
+def _dashboard_org():
+    """
+    (org_id, notice) for the HTML dashboard. Navbar links and redirects carry no
+    org_id, so in SaaS mode the last org this browser picked (kept in the
+    session) is used; with none, or an invalid one, the page asks for it.
+    """
+    if not _needs_org():
+        return None, None
+    given = request.args.get("org_id") or request.headers.get("X-Org-Id")
+    if not given:
+        org_id = session.get("pqp_org_id")
+        return (org_id, None) if org_id else (None, "Choose an organisation to see its projects.")
+    try:
+        org_id = str(uuid.UUID(str(given)))
+    except ValueError:
+        return None, "That organisation id is not valid (expected a UUID)."
+    session["pqp_org_id"] = org_id
+    return org_id, None
+
 @pqp_bp.route("/", methods=["GET"])
 def pqp_dashboard():
-    projects = Project.query.order_by(Project.id.desc()).all()
-    return render_template("pqp_dashboard.html", projects=projects)
+    """Summary tiles (one cached aggregate, see dashboard_stats.py) and one page of projects."""
+    org_id, notice = _dashboard_org()
+    if notice:
+        return render_template("pqp_dashboard.html", projects=[], page=None, stats={}, org_notice=notice)
+    gq = parse_grid_args(request.args)
+    stats = dashboard_stats(org_id)
+    total = stats.get("total_projects", 0)
+    page = {"page": gq["page"], "per_page": gq["per_page"], "total": total,
+            "pages": max(1, -(-total // gq["per_page"])), "org_id": org_id}
+    projects = project_page(org_id, gq["page"], gq["per_page"])
+    return render_template("pqp_dashboard.html", projects=projects, page=page, stats=stats)
 
 @pqp_bp.route("/projects/create", methods=["POST"])
 def create_project():
@@ -889,6 +612,12 @@ def pqp_form_select_by_code():
     query = select(*cols).order_by(_col(PR, PR_COL_CODE))
     if filter_code:
         query = query.where(_col(PR, PR_COL_CODE).ilike(f"%{filter_code}%"))
+    if summaries_available(db.session.connection()):
+        # completion / status / overdue from the maintained summary row, one join
+        S = ProjectSummary.__table__
+        query = (query.add_columns(S.c.status.label("summary_status"), S.c.completion_pct,
+                                   (S.c.next_due < func.current_date()).label("overdue"))
+                 .outerjoin_from(PR, S, S.c.project_code == _col(PR, PR_COL_CODE)))
 
     rows = db.session.execute(query.limit(200)).fetchall()
 
@@ -903,9 +632,12 @@ def pqp_form_select_by_code():
             "short":  (m.get("Short Description") or "").strip(),
             "client": (m.get("Client") or "").strip(),
             "pm":     (m.get("Project Manager") or "").strip(),
-            "status": (m.get("Status") or "").strip(),
+            "status": (m.get("Status") or "").strip() or m.get("summary_status")
+                      or infer_status(None, m.get("end_date")),
             "start":  _to_date_str(m.get("start_date")),
             "end":    _to_date_str(m.get("end_date")),
+            "completion": m.get("completion_pct"),
+            "overdue": bool(m.get("overdue")),   # an open checklist item past due today
         })
 
     return render_template("project_selector.html", project_options=options)
@@ -975,33 +707,27 @@ def pqp_section_import(code, section_idx):
 # ------------------------------------------------------------------------------
 # BULK IMPORT: preview + commit (for Import/Export tab)
 # ------------------------------------------------------------------------------
-def _read_csv_file(file_storage):
-    text = io.TextIOWrapper(file_storage.stream, encoding="utf-8", errors="replace")
-    reader = csv.reader(text)
-    rows = list(reader)
-    header = rows[0] if rows else []
-    body = rows[1:] if len(rows) > 1 else []
-    return header, body
+def _csv_too_large():
+    """413 response when the declared request size is already over the CSV limit."""
+    if request.content_length and request.content_length > MAX_CSV_BYTES + 64 * 1024:
+        return jsonify({"ok": False, "error": str(UploadTooLarge(MAX_CSV_BYTES))}), 413
+    return None
 
 @pqp_bp.post("/pqp/import/<code>/<int:section_idx>/preview")
 def pqp_import_preview(code, section_idx):
+    """Header check + first 100 rows + total count, streamed (flat memory)."""
+    too_large = _csv_too_large()
+    if too_large:
+        return too_large
     file = request.files.get("file")
     if not file or file.filename == "":
         return jsonify({"ok": False, "error": "No file uploaded"}), 400
 
     expected = get_section_columns(section_idx)
-    header, body = _read_csv_file(file)
-
-    missing = [c for c in expected if c not in header]
-    extra   = [c for c in header if c not in expected]
-
-    preview_rows = []
-    for r in body[:100]:
-        rec = {}
-        for ix, col in enumerate(header):
-            if col in expected:
-                rec[col] = r[ix] if ix < len(r) else ""
-        preview_rows.append(rec)
+    try:
+        pv = preview_csv(file.stream, expected)
+    except UploadTooLarge as e:
+        return jsonify({"ok": False, "error": str(e)}), 413
 
     return jsonify({
         "ok": True,
@@ -1009,11 +735,7 @@ def pqp_import_preview(code, section_idx):
         "section_idx": section_idx,
         "filename": file.filename,
         "expected_columns": expected,
-        "header": header,
-        "missing_columns": missing,
-        "extra_columns": extra,
-        "row_count": len(body),
-        "preview_rows": preview_rows
+        **pv,
     })
 
 
@@ -1030,7 +752,7 @@ def pqp_ai_import_preview():
     so rows actually show up in Preview and on the form after Commit.
     """
     from io import BytesIO
-    import re, json
+    import json
     try:
         import pandas as pd
     except Exception:
@@ -1040,26 +762,12 @@ def pqp_ai_import_preview():
     if not files:
         return jsonify({"ok": False, "error": "No files uploaded"}), 400
 
-    # --- robust project-id detection (keeps suffix like 'P700' if present) ---
-    def _detect_project_id(text: str) -> str:
-        """
-        Looks for '<3digits><2letters>' optionally followed by ' P<digits>'.
-        Examples:
-          '291RT P700' -> '291RT P700'
-          '322IN'      -> '322IN'
-        """
-        s = (text or "").upper().strip()
-        # First: full pattern with suffix
-        m = re.search(r"\b(\d{3}[A-Z]{2}\s+P\d+)\b", s)
-        if m:
-            return m.group(1).strip()
-        # Fallback: core code only
-        m = re.search(r"\b(\d{3}[A-Z]{2})\b", s)
-        return m.group(1).strip() if m else ""
+    # every preview adds a job; drop stale ones now and then (once/hour/worker)
+    maybe_purge(db.session)
 
     # --- pandas fallback so preview is never empty ----------------------------
     def _fallback_payload(xlsx_bytes: bytes, fname: str, project_id: str) -> dict:
-        payload = {"code": project_id or _detect_project_id(fname), "sections": []}
+        payload = {"code": project_id, "sections": []}
         if not pd:
             # fill 1..9 empty sections to keep UI stable
             for i in range(1, 10):
@@ -1107,38 +815,50 @@ def pqp_ai_import_preview():
                     rows.append(row)
             return cols, rows
 
-        put = False
+        # first sheet with a table goes to the section its headers match best
+        # (section 1 with the raw headers when nothing matches)
+        put = 0
         for sheet_name, df in all_sheets.items():
             cols, rows = _first_table(df)
             if rows:
+                idx, mapping, score = best_section(cols)
+                if score:
+                    names = {m["header"]: m["column"] for m in mapping if m["column"]}
+                    rows = [{names[c]: v for c, v in r.items() if c in names} for r in rows]
+                    cols = list(names.values())
+                else:
+                    idx, mapping = 1, []
                 payload["sections"].append({
-                    "index": 1, "title": str(sheet_name), "columns": cols, "rows": rows
+                    "index": idx, "title": str(sheet_name), "columns": cols, "rows": rows,
+                    "mapping": mapping,
                 })
-                put = True
+                put = idx
                 break
 
-        start = 2 if put else 1
-        for i in range(start, 10):
-            payload["sections"].append({"index": i, "columns": [], "rows": []})
+        for i in range(1, 10):
+            if i != put:
+                payload["sections"].append({"index": i, "columns": [], "rows": []})
         return payload
 
     results = []
     for f in files:
         raw_name = f.filename or ""
         override = (request.form.get("code") or "").strip()
-        project_id = (override or _detect_project_id(raw_name)).strip()
-
         xbytes = f.read()
 
-        # Primary parser – do NOT pass project_id here (old signatures accept
-        # (bytes) or (bytes, filename)). We try 2-arg then 1-arg.
-        payload = None
+        # filename, properties, defined names, sheet names and a bounded cell
+        # scan, checked against the existing codes (code_detect)
+        detection = None
+        if not override:
+            detection = detect_project_code(filename=raw_name, xlsx_bytes=xbytes, known=_known_project_codes())
+        project_id = override or detection.code
+
+        # Primary parser: headers matched per sheet (header_map), with the
+        # mappings earlier commits of the same sheet layout confirmed
+        payload, parse_issues = None, []
         try:
-            from app.pqp.ingest.ai_import import parse_workbook_to_payload
-            try:
-                payload = parse_workbook_to_payload(xbytes, raw_name)
-            except TypeError:
-                payload = parse_workbook_to_payload(xbytes)
+            payload, parse_issues, _ = parse_workbook_to_payload(
+                BytesIO(xbytes), project_id or None, learned=learned_lookup(db.session))
         except Exception as e:
             current_app.logger.warning(f"parse_workbook_to_payload failed for {raw_name}: {e}")
 
@@ -1155,16 +875,27 @@ def pqp_ai_import_preview():
             payload = _fallback_payload(xbytes, raw_name, project_id)
 
         # Finalize code (normalize by collapsing internal spaces)
-        final_code = (override or payload.get("code") or project_id or "").upper().strip()
+        final_code = (override or project_id or "").upper().strip()
         final_code = " ".join(final_code.split())  # e.g. "291RT   P700" -> "291RT P700"
         payload["code"] = final_code
 
+        # What commit would do against the rows the project has right now
+        diff = None
+        if final_code:
+            current = {s.section_number: s for s in PQPSection.query.filter_by(project_code=final_code)}
+            diff = diff_payload(
+                payload,
+                lambda n: _load_section_rows(current[n]) if n in current else [],
+                len(SECTION_DEFS),
+            )
+
         job = ImportJob(
             filename=raw_name,
             project_code=final_code,
             status="preview",
-            issues=[],
+            issues=parse_issues,
             payload=payload,
+            diff=diff,
         )
         db.session.add(job)
         db.session.flush()
@@ -1179,12 +910,24 @@ def pqp_ai_import_preview():
             "job_id": job.id,
             "filename": raw_name,
             "detected_code": final_code,
+            "code_candidates": detection.candidates if detection else [],
             "sections": sec_count,
+            "diff": diff and {
+                "totals": diff["totals"],
+                "sections": {d["index"]: d["counts"] for d in diff["sections"]},
+            },
+            # header -> column per section, with confidence and how it was matched
+            "mapping": {s["index"]: [{k: m[k] for k in ("header", "column", "confidence", "source")}
+                                     for m in s["mapping"] if m.get("header")]
+                        for s in (payload.get("sections") or []) if s.get("mapping")},
+            "issues": parse_issues,
             "status": "previewed"
         })
 
     db.session.commit()
-    return jsonify({"ok": True, "results": results})
+    # the Import Center posts one file per request and reads the job at top level
+    single = results[0] if len(results) == 1 else {}
+    return jsonify({"ok": True, "results": results, **single})
 # ==== END REPLACEMENT: /import/ai/preview ====================================
 
 
@@ -1223,9 +966,11 @@ def pqp_ai_import_commit():
     # Write via your ingest module (but don't hard-fail if it errors)
     ok = True
     write_issues = []
+    undo = []
+    t0 = time.perf_counter()
     try:
         from app.pqp.ingest.ai_import import commit_payload
-        res = commit_payload(job.payload, project_id, db.session)
+        res = commit_payload(job.payload, project_id, db.session, undo=undo)
         if isinstance(res, tuple) and len(res) == 2:
             ok, write_issues = res
         elif isinstance(res, bool):
@@ -1233,46 +978,25 @@ def pqp_ai_import_commit():
     except Exception as e:
         ok = False
         write_issues.append(f"commit_payload error: {e}")
+    if not ok:
+        db.session.rollback()   # no partial import; the job is marked failed below
 
-    # Mirror preview rows into PQPSection.rows_json (what the forms read)
-    def _rows_from_section(sec: dict):
-        if not isinstance(sec, dict):
-            return []
-        return (sec.get("rows") or sec.get("data") or sec.get("items") or sec.get("table") or [])
-
-    try:
-        sections = (job.payload or {}).get("sections") if isinstance(job.payload, dict) else None
-        if isinstance(sections, list):
-            for sec in sections:
-                try:
-                    idx = int(sec.get("index") or sec.get("section") or 0)
-                except Exception:
-                    idx = 0
-                if idx < 1 or idx > 9:
-                    continue
-
-                cols = (sec.get("columns") or sec.get("headers") or [])
-                rows = _rows_from_section(sec)
-
-                # Ensure the single section record exists, then upsert its rows/cols
-                try:
-                    _ensure_sections_by_code(project_id, idx)
-                except Exception as e:
-                    write_issues.append(f"_ensure_sections_by_code {idx} error: {e}")
-                try:
-                    _upsert_section_rows(project_id, idx, cols, rows)
-                except Exception as e:
-                    write_issues.append(f"_upsert_section_rows {idx} error: {e}")
-                    ok = False
-        else:
-            write_issues.append("No sections found in payload to mirror.")
-    except Exception as e:
-        write_issues.append(f"Mirror error: {e}")
-        ok = False
+    # commit_payload writes PQPSection.rows_json (what the forms read) directly,
+    # applying only the rows the diff marks as insert/update, so the old
+    # wholesale mirror of the preview rows is gone: it replaced each section
+    # with the workbook rows and dropped anything added on the form since.
+    # It only flushes: the sections, job.undo and the status below commit
+    # together, so an applied import always has its undo data.
 
     job.status = "committed" if ok else "failed"
     job.project_code = project_id
     job.issues = write_issues
+    if ok:
+        job.committed_at = datetime.utcnow()
+        job.undo = undo
+        remember_mappings(db.session, job.payload)   # same layout maps in one lookup next time
+        metrics.observe_import("ai", time.perf_counter() - t0,
+                               sum(len(d["remove"]) + len(d["restore"]) for d in undo), job.stored_bytes)
     db.session.add(job)
     db.session.commit()
 
@@ -1281,11 +1005,64 @@ def pqp_ai_import_commit():
         "job_id": job.id,
         "project_id": project_id,
         "issues": write_issues,
-        "status": job.status
+        "status": job.status,
+        "preview_diff": (job.diff or {}).get("totals"),
+        "rollback_url": url_for("pqp.pqp_import_job_rollback", job_id=job.id) if ok else None,
     })
 # ==== END REPLACEMENT: /import/ai/commit =====================================
 
 
+@pqp_bp.post("/import/jobs/<int:job_id>/rollback")
+def pqp_import_job_rollback(job_id):
+    """
+    Undo a committed AI import from its reverse delta (ImportJob.undo), all
+    sections in one transaction. Rows or fields edited since the import are
+    conflicts: nothing is written and 409 lists them, unless force=1.
+    """
+    from app.pqp.ingest.import_undo import rollback_section
+
+    force = (request.values.get("force") or "").lower() in ("1", "true", "yes")
+    job = db.session.get(ImportJob, job_id)
+    if not job:
+        return jsonify({"ok": False, "error": f"Job {job_id} not found"}), 404
+    if job.status != "committed" or job.undo is None:
+        return jsonify({"ok": False, "error": f"Job {job_id} is {job.status!r}, nothing to roll back"}), 409
+
+    code = job.project_code
+    t0 = time.perf_counter()
+    totals, conflicts = {"removed": 0, "restored": 0}, []
+    try:
+        for delta in sorted(job.undo, key=lambda d: int(d.get("index") or 0)):
+            n = int(delta.get("index") or 0)
+            lock_section(db.session, code, n)
+            sec = (PQPSection.query.filter_by(project_code=code, section_number=n)
+                   .populate_existing().first())
+            if not sec:
+                conflicts.append(f"section {n} no longer exists")
+                continue
+            rows = _load_section_rows(sec)
+            res = rollback_section(rows, delta, force=force)
+            conflicts += [f"section {n}: {c}" for c in res["conflicts"]]
+            totals["removed"] += res["removed"]
+            totals["restored"] += res["restored"]
+            sec.rows_json = _dump_section_rows(rows)
+    except SectionBusy as e:
+        return jsonify({"ok": False, "error": str(e)}), 503, {"Retry-After": "2"}
+
+    if conflicts and not force:
+        db.session.rollback()
+        return jsonify({"ok": False, "error": "Rows changed since the import; retry with force=1 to overwrite",
+                        "conflicts": conflicts[:MAX_REPORTED_ERRORS]}), 409
+
+    job.status = "rolled_back"
+    job.rolled_back_at = datetime.utcnow()
+    job.issues = (job.issues or []) + [
+        "Rolled back — rows removed: {removed}, rows restored: {restored}".format(**totals)]
+    db.session.commit()
+    return jsonify({"ok": True, "job_id": job.id, **totals, "conflicts": conflicts,
+                    "ms": round((time.perf_counter() - t0) * 1000, 1)})
+
+
 
 
 
@@ -1306,60 +1083,177 @@ def _load_section_rows(sec):
 
 def _dump_section_rows(rows): return json.dumps(rows, ensure_ascii=False)
 
+MAX_REPORTED_ERRORS = 1000
+
 @pqp_bp.post("/pqp/import/<code>/<int:section_idx>/commit")
 def pqp_import_commit(code, section_idx):
+    """
+    Merge a section CSV into the section's rows (upsert by id).
+    JSON summary by default, with at most MAX_REPORTED_ERRORS row errors. With
+    ?report=ndjson (or Accept: application/x-ndjson) every row error is
+    streamed as one JSON line while the import runs, then a final summary line.
+    """
+    too_large = _csv_too_large()
+    if too_large:
+        return too_large
     file = request.files.get("file")
     if not file or file.filename == "":
         return jsonify({"ok": False, "error": "No file uploaded"}), 400
 
     expected = get_section_columns(section_idx)
-    header, body = _read_csv_file(file)
-
-    missing = [c for c in expected if c not in header]
-    if missing:
-        return jsonify({"ok": False, "error": "Missing columns", "missing": missing}), 400
+    try:
+        imp = CsvSectionImport(file.stream, expected)
+    except UploadTooLarge as e:
+        return jsonify({"ok": False, "error": str(e)}), 413
+    if imp.missing:
+        return jsonify({"ok": False, "error": "Missing columns", "missing": imp.missing}), 400
 
     db_number = section_idx + 1
-    sec = PQPSection.query.filter_by(project_code=code, section_number=db_number).first()
+    try:
+        lock_section(db.session, code, db_number)
+    except SectionBusy as e:
+        return jsonify({"ok": False, "error": str(e)}), 503, {"Retry-After": "2"}
+    sec = (PQPSection.query.filter_by(project_code=code, section_number=db_number)
+           .populate_existing().first())
     if not sec:
         sec = PQPSection(project_code=code, section_number=db_number, title=f"Section {db_number}")
         db.session.add(sec)
         db.session.flush()
 
     rows = _load_section_rows(sec)
+    t0 = time.perf_counter()
 
-    results = {"ok": True, "created": 0, "updated": 0, "skipped": 0, "errors": []}
-    for row_ix, r in enumerate(body, start=2):
-        try:
-            row = {c: (r[header.index(c)] if c in header and header.index(c) < len(r) else "") for c in expected}
-            rid = str(row.get("id") or "")
-            if not rid:
-                row["id"] = str(int(time.time() * 1000))
-                rows.append(row)
-                results["created"] += 1
-            else:
-                updated = False
-                for rr in rows:
-                    if str(rr.get("id")) == rid:
-                        rr.update(row)
-                        updated = True
-                        break
-                if updated:
-                    results["updated"] += 1
-                else:
-                    rows.append(row)
-                    results["created"] += 1
-        except Exception as e:
-            results["skipped"] += 1
-            results["errors"].append({"row": row_ix, "reason": str(e)})
+    def _write():
+        if hasattr(sec, "rows_json"):
+            sec.rows_json = _dump_section_rows(rows)
+        else:
+            sec.content = _dump_section_rows(rows)
+        db.session.commit()
+        metrics.observe_import("csv", time.perf_counter() - t0,
+                               imp.stats["created"] + imp.stats["updated"], request.content_length)
 
-    if hasattr(sec, "rows_json"):
-        sec.rows_json = _dump_section_rows(rows)
-    else:
-        sec.content = _dump_section_rows(rows)
-    db.session.commit()
+    streamed = (request.args.get("report") == "ndjson"
+                or request.accept_mimetypes.best == "application/x-ndjson")
+    if streamed:
+        def _report():
+            try:
+                for err in imp.merge_into(rows):
+                    yield json.dumps(err) + "\n"
+            except UploadTooLarge as e:
+                db.session.rollback()
+                yield json.dumps({"ok": False, "summary": True, "error": str(e)}) + "\n"
+                return
+            _write()
+            yield json.dumps({"ok": True, "summary": True, **imp.stats}) + "\n"
+        return Response(stream_with_context(_report()), mimetype="application/x-ndjson")
+
+    errors = []
+    try:
+        for err in imp.merge_into(rows):
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append(err)
+    except UploadTooLarge as e:
+        db.session.rollback()
+        return jsonify({"ok": False, "error": str(e)}), 413
+    _write()
+    results = {"ok": True, **imp.stats, "errors": errors}
+    if imp.stats["skipped"] > len(errors):
+        results["errors_truncated"] = imp.stats["skipped"] - len(errors)
     return jsonify(results)
 
+@pqp_bp.post("/import/<code>/zip")
+def pqp_import_zip(code):
+    """
+    Import a whole "Export All Sections (CSV .zip)" bundle in one transaction.
+      file:  the .zip (section_N.csv members, any folder)
+      mode:  merge (default, upsert by id like the per-section import)
+             replace (section rows become exactly the CSV rows: restore/migrate)
+    Every header is checked before anything is written; any lock timeout or
+    size overrun rolls the whole bundle back. Reports rows and rows/s per section.
+    """
+    too_large = _csv_too_large()
+    if too_large:
+        return too_large
+    file = request.files.get("file")
+    if not file or file.filename == "":
+        return jsonify({"ok": False, "error": "No file uploaded"}), 400
+    mode = (request.form.get("mode") or request.args.get("mode") or "merge").lower()
+    if mode not in ("merge", "replace"):
+        return jsonify({"ok": False, "error": f"Unknown mode {mode!r}"}), 400
+
+    try:
+        zf = zipfile.ZipFile(file.stream)
+    except zipfile.BadZipFile:
+        return jsonify({"ok": False, "error": "Not a ZIP file"}), 400
+
+    t_start = time.perf_counter()
+    with zf:
+        members, notes = section_members(zf)
+        if not members:
+            return jsonify({"ok": False, "error": "No section_N.csv files in the ZIP", "notes": notes}), 400
+        bad = check_headers(zf, members)
+        if bad:
+            return jsonify({"ok": False, "error": "Missing columns",
+                            "missing": {f"section_{n}.csv": cols for n, cols in bad.items()},
+                            "notes": notes}), 400
+
+        report = []
+        try:
+            for n, info in sorted(members.items()):        # fixed lock order
+                t0 = time.perf_counter()
+                lock_section(db.session, code, n)
+                sec = (PQPSection.query.filter_by(project_code=code, section_number=n)
+                       .populate_existing().first())
+                if not sec:
+                    sec = PQPSection(project_code=code, section_number=n,
+                                     title=DEFAULT_SECTION_TITLES.get(n, f"Section {n}"))
+                    db.session.add(sec)
+                rows = [] if mode == "replace" else _load_section_rows(sec)
+
+                fh, imp = open_section(zf, n, info)
+                errors = []
+                with fh:
+                    for err in imp.merge_into(rows):
+                        if len(errors) < MAX_REPORTED_ERRORS:
+                            errors.append(err)
+                if hasattr(sec, "rows_json"):
+                    sec.rows_json = _dump_section_rows(rows)
+                else:
+                    sec.content = _dump_section_rows(rows)
+
+                secs = time.perf_counter() - t0
+                done = imp.stats["created"] + imp.stats["updated"]
+                report.append({
+                    "section": n,
+                    "file": info.filename,
+                    "bytes": info.file_size,
+                    **imp.stats,
+                    "rows": len(rows),
+                    "seconds": round(secs, 3),
+                    "rows_per_sec": round(done / secs) if secs else done,
+                    "errors": errors,
+                })
+            db.session.commit()
+        except SectionBusy as e:
+            return jsonify({"ok": False, "error": str(e)}), 503, {"Retry-After": "2"}
+        except UploadTooLarge as e:
+            db.session.rollback()
+            return jsonify({"ok": False, "error": str(e)}), 413
+
+    metrics.observe_import("zip", time.perf_counter() - t_start,
+                           sum(r["created"] + r["updated"] for r in report), request.content_length)
+    return jsonify({
+        "ok": True,
+        "code": code,
+        "mode": mode,
+        "sections": report,
+        "notes": notes,
+        "created": sum(r["created"] for r in report),
+        "updated": sum(r["updated"] for r in report),
+        "skipped": sum(r["skipped"] for r in report),
+        "seconds": round(time.perf_counter() - t_start, 3),
+    })
+
 # ------------------------------------------------------------------------------
 # Per‑section SAVE (used by Add/Edit modals)
 # ------------------------------------------------------------------------------
@@ -1369,28 +1263,28 @@ def pqp_section_save(code, section_idx):
     cols = get_section_columns(section_idx)
     form = request.form.to_dict(flat=True)
     data = {c: form.get(c, "") for c in cols if c != "id"}
+    wants_json = request.accept_mimetypes.best == "application/json"
 
-    sec = PQPSection.query.filter_by(project_code=code, section_number=db_number).first()
+    try:
+        lock_section(db.session, code, db_number)
+    except SectionBusy as e:
+        if wants_json:
+            return jsonify({"ok": False, "error": str(e)}), 503, {"Retry-After": "2"}
+        flash(str(e), "warning")
+        return redirect(url_for("pqp.pqp_form_by_code", code=code, tab=db_number))
+    sec = (PQPSection.query.filter_by(project_code=code, section_number=db_number)
+           .populate_existing().first())
     if not sec:
         sec = PQPSection(project_code=code, section_number=db_number, title=f"Section {db_number}")
         db.session.add(sec)
         db.session.flush()
 
     table = _load_section_rows(sec)
+    index = RowIndex(table)
+    index.repair_duplicates()
 
-    edit_id = form.get("id")
-    if edit_id:
-        replaced = False
-        for r in table:
-            if str(r.get("id") or "") == str(edit_id):
-                r.update(data)
-                replaced = True
-                break
-        if not replaced:
-            table.append({"id": edit_id, **data})
-    else:
-        new_id = str(int(time.time() * 1000))
-        table.append({"id": new_id, **data})
+    edit_id = form.get("id") or new_row_id()
+    index.upsert({"id": edit_id, **data})
 
     if hasattr(sec, "rows_json"):
         sec.rows_json = _dump_section_rows(table)
@@ -1398,8 +1292,10 @@ def pqp_section_save(code, section_idx):
         sec.content = _dump_section_rows(table)
 
     db.session.commit()
+    if wants_json:
+        return jsonify({"ok": True, "id": edit_id})
     flash("Saved.", "success")
-    return redirect(url_for("pqp.pqp_form_by_code", code=code))
+    return redirect(url_for("pqp.pqp_form_by_code", code=code, tab=db_number))
 
 # ------------------------------------------------------------------------------
 # Export & Reports
@@ -1420,9 +1316,12 @@ def pqp_export_zip_csv(code):
                 elif isinstance(r, (list, tuple)):
                     w.writerow([r[i] if i < len(r) else "" for i in range(len(cols))])
             zf.writestr(f"section_{idx+1}.csv", s.getvalue())
+    size = buf.getbuffer().nbytes
     buf.seek(0)
-    return send_file(buf, mimetype="application/zip",
+    resp = send_file(buf, mimetype="application/zip",
                      as_attachment=True, download_name=f"PQP_{code}_CSV.zip")
+    resp.content_length = size                 # counted by pqp_export_bytes_total
+    return resp
 
 @pqp_bp.get("/pqp/<code>/summary")
 def pqp_summary_html(code):
@@ -1667,6 +1566,7 @@ def project_update(code):
         .where(_col(PR, PR_COL_CODE) == code)
         .values(assigns)    # pass dict, NOT **kwargs
     )
+    refresh_summary_header(db.session, code)   # Status / end_date may have changed
     db.session.commit()
     return jsonify({"ok": True})
 
@@ -1828,21 +1728,42 @@ def pqp_import_bulk():
 # --- Debug: list recent AI jobs ---
 @pqp_bp.get("/debug/jobs")
 def pqp_debug_jobs():
-    jobs = (db.session.query(ImportJob)
+    # payload / diff / undo are deferred columns: only sizes are read here
+    limit = max(1, min(request.args.get("limit", 25, type=int), 500))
+    # has_undo is evaluated in SQL so the deferred undo column is never loaded;
+    # jobs committed before rollback existed have no undo (SQL or JSON null)
+    has_undo = and_(ImportJob.undo.isnot(None), cast(ImportJob.undo, Text) != "null")
+    jobs = (db.session.query(ImportJob, has_undo.label("has_undo"))
             .order_by(ImportJob.id.desc())
-            .limit(25)
+            .limit(limit)
             .all())
     out = []
-    for j in jobs:
+    for j, has_undo in jobs:
         out.append({
             "id": j.id,
             "filename": j.filename,
             "status": j.status,
             "project_code": (j.project_code or ""),
             "issues": j.issues,
+            "created_at": j.created_at.isoformat() if j.created_at else None,
+            "payload_bytes": j.payload_bytes,
+            "stored_bytes": j.stored_bytes,
+            "purged": j.purged_at is not None,
+            "can_rollback": j.status == "committed" and j.purged_at is None and has_undo,
         })
-    return jsonify(out)
+    count, raw, stored = db.session.query(
+        func.count(ImportJob.id),
+        func.coalesce(func.sum(ImportJob.payload_bytes), 0),
+        func.coalesce(func.sum(ImportJob.stored_bytes), 0),
+    ).one()
+    return jsonify({"jobs": out, "totals": {"jobs": count, "payload_bytes": int(raw), "stored_bytes": int(stored)}})
+
+
 
+# --- Debug: section write-lock waits (this worker only) ---
+@pqp_bp.get("/debug/locks")
+def pqp_debug_locks():
+    return jsonify(lock_stats())
 
 
 # --- Debug: DB info (engine URL, sqlite file path, quick counts) ---
@@ -1908,7 +1829,7 @@ def api_materialize_section(code, sec_no):
 
 
 def _needs_org():
-    return current_app.config.get("HAS_ORG_ID", False)
+    return has_org_id()
 
 def _get_org():
     # Require org_id only when SaaS columns exist
@@ -1921,6 +1842,10 @@ def _get_org():
     )
     if not org_id:
         return None, (jsonify(error="org_id is required (SaaS mode)"), 400)
+    try:
+        org_id = str(uuid.UUID(str(org_id)))
+    except ValueError:
+        return None, (jsonify(error="org_id must be a UUID"), 400)
     return org_id, None
 
 @pqp_api_bp.get("/projects")
@@ -2014,6 +1939,7 @@ def api_add_checklist(pid: int):
                 {"p": pid, "s": section, "i": item, "st": status, "d": due_date, "a": assigned_to}
             ).fetchone()
         out.append(dict(row._mapping))
+    checklist_changed(db.session, pid)
     db.session.commit()
     return jsonify(out), 201
 
@@ -2051,6 +1977,7 @@ def api_update_checklist(item_id: int):
     ).fetchone()
     if not row:
         return jsonify(error="Checklist item not found"), 404
+    checklist_changed(db.session, row._mapping["project_id"])
     db.session.commit()
     return jsonify(dict(row._mapping))
 
@@ -2061,9 +1988,11 @@ def api_delete_checklist(item_id: int):
     where = "id = :id" + (" and org_id = :o" if _needs_org() else "")
     params = {"id": item_id}
     if _needs_org(): params["o"] = org_id
-    row = db.session.execute(text(f"delete from checklist_item where {where} returning id"), params).fetchone()
+    row = db.session.execute(text(f"delete from checklist_item where {where} returning id, project_id"),
+                             params).fetchone()
     if not row:
         return jsonify(error="Checklist item not found"), 404
+    checklist_changed(db.session, row.project_id)
     db.session.commit()
     return jsonify(ok=True)
 # ===================== end JSON API (non-UI) ======================
@@ -2113,11 +2042,12 @@ def _filter_payload_for_table(qualified: str, code: str, form_or_json: dict):
     return data
 
 def _table_for_sub_required(sub_no: int) -> str:
-    spec = SUBSECTIONS.get(sub_no) or {}
-    qname = spec.get("table")
+    _parent, spec = _sub_spec(sub_no)
+    qname = (spec or {}).get("table")
     if not qname:
         # last resort: your guesser
-        qname = _guess_table_for_sub(sub_no)
+        with db.engine.connect() as conn:
+            qname = _guess_table_for_sub(conn, sub_no, "")
     if not qname:
         abort(404, f"No table mapping for subsection {sub_no}")
     return qname
@@ -2137,7 +2067,7 @@ def pqp_ui_add_row(code, sub_no):
     db.session.execute(sql, data)
     db.session.commit()
     flash("Row added.", "success")
-    return redirect(url_for("pqp.pqp_form_by_code", code=code) + f"#sub-{sub_no}")
+    return redirect(url_for("pqp.pqp_form_by_code", code=code, tab=_sub_spec(sub_no)[0]) + f"#sub-{sub_no}")
 
 @pqp_bp.post("/form/<code>/sub/<int:sub_no>/edit/<rid>")
 def pqp_ui_edit_row(code, sub_no, rid):
@@ -2154,7 +2084,7 @@ def pqp_ui_edit_row(code, sub_no, rid):
     db.session.execute(sql, data)
     db.session.commit()
     flash("Row updated.", "success")
-    return redirect(url_for("pqp.pqp_form_by_code", code=code) + f"#sub-{sub_no}")
+    return redirect(url_for("pqp.pqp_form_by_code", code=code, tab=_sub_spec(sub_no)[0]) + f"#sub-{sub_no}")
 
 @pqp_bp.post("/form/<code>/sub/<int:sub_no>/delete/<rid>")
 def pqp_ui_delete_row(code, sub_no, rid):
@@ -2163,7 +2093,7 @@ def pqp_ui_delete_row(code, sub_no, rid):
     db.session.execute(text(f"delete from {qname} where {pk}=:rid"), {"rid": rid})
     db.session.commit()
     flash("Row deleted.", "success")
-    return redirect(url_for("pqp.pqp_form_by_code", code=code) + f"#sub-{sub_no}")
+    return redirect(url_for("pqp.pqp_form_by_code", code=code, tab=_sub_spec(sub_no)[0]) + f"#sub-{sub_no}")
 
 # ---------- END: generic CRUD for subsection tables ----------
 
@@ -2258,19 +2188,21 @@ def _load_section3_from_unified(engine, project_code):
     return cols_by_part, data_by_part
 
 
-@pqp_bp.route("/form/code/<code>", methods=["GET"])
-def pqp_form_by_code(code):
-    """
-    Project form for a single project_code.
+# Tabs whose rows live in PQPSection JSON; the other tabs are built from SUBSECTIONS.
+JSON_PANEL_TABS = (1, 2, 8)
+FORM_TABS = (1, 2, 3, 4, 5, 6, 7, 8, 9, 10)
 
-    - Sections 1,2,4,5,6,7,8,9 use PQPSection JSON; if empty we hydrate once from tables.
-    - Composite sections (3.x, 4.x, 5.x, 6.x, 7.x, 9.x, 10/101) are rendered from their
-      own physical tables; even with 0 rows we still provide column headers so the
-      template always shows the panel and keeps your layout intact.
-    """
-    code = _norm_code(code)
 
-    # ---------- Project header ----------
+def _sub_spec(sub_no: int):
+    """Return (parent_no, spec) for a subsection number like 31 or 101, else (None, None)."""
+    p = registry.part(sub_no)
+    if p is None:
+        return None, None
+    return p.parent, SUBSECTIONS[p.parent][p.key]
+
+
+def _load_project_header(code: str):
+    """ProjectRecords header for the form (Code, Short Description, ...); None if unknown."""
     PR = _projectrecords(db.engine)
     cols = [
         _col(PR, PR_COL_CODE).label("Code"),
@@ -2287,101 +2219,177 @@ def pqp_form_by_code(code):
 
     row = db.session.execute(select(*cols).where(_col(PR, PR_COL_CODE) == code)).first()
     if not row:
-        flash("Project Code not found.", "danger")
-        return redirect(url_for("pqp.pqp_form_select_by_code"))
+        return None
     project = {k: _to_str(v) for k, v in row._mapping.items()}
     if not project.get("Status"):
-        # cheap inferred status
+        # same rule the project summaries store for the list views
+        project["Status"] = infer_status(None, row._mapping.get("end_date"))
+    return project
+
+
+def _json_panel_columns(sec_no: int) -> list:
+    return (SECTION_DEFS[sec_no - 1] if sec_no <= len(SECTION_DEFS) else []) or ["title", "description"]
+
+
+def _load_json_panel(code: str, sec_no: int):
+    """
+    Columns, rows and meta for a PQPSection-backed tab.
+    If the section has no JSON rows we hydrate once from its physical table.
+    """
+    cols = _json_panel_columns(sec_no)
+    sec = PQPSection.query.filter_by(project_code=code, section_number=sec_no).first()
+    rows = _normalize_rows(cols, _load_section_rows(sec)) if sec else []
+
+    meta = {}
+    if not rows:
         try:
-            end_dt = row._mapping.get("end_date")
-            if isinstance(end_dt, datetime):
-                project["Status"] = "Closed" if end_dt.date() < date.today() else "Active"
-            elif isinstance(end_dt, date):
-                project["Status"] = "Closed" if end_dt < date.today() else "Active"
-            else:
-                project["Status"] = "Active"
+            with db.engine.connect() as conn:
+                hydrated, meta = _hydrate_section_from_tables(conn, code, sec_no)
+            rows.extend(hydrated)
         except Exception:
-            project["Status"] = "Active"
+            meta = {}
+    return cols, rows, meta
 
-    # ---------- Ensure scaffolding ----------
-    _ensure_sections_by_code(code)
 
-    # ---------- Single-table panels (1,2,4,5,6,7,8,9) from PQPSection ----------
-    section_columns = list(SECTION_DEFS)
-    if len(section_columns) < 10:
-        section_columns += [[] for _ in range(10 - len(section_columns))]
-    section_count = len(section_columns)
-    section_data = [[] for _ in range(section_count)]
+def _load_sub_panel(conn, code: str, sub_no: int, spec: dict):
+    """Columns, rows and meta for one physical subsection table (31, 32, ... 101)."""
+    table = spec.get("table")
 
-    def _rows_of(sec):
-        payload = None
-        if getattr(sec, "rows_json", None):
-            try:
-                payload = json.loads(sec.rows_json)
-            except Exception:
-                payload = None
-        if payload is None and getattr(sec, "content", None):
-            try:
-                payload = json.loads(sec.content)
-            except Exception:
-                payload = None
-        if isinstance(payload, list):
-            return payload
-        if isinstance(payload, dict) and isinstance(payload.get("rows"), list):
-            return payload["rows"]
-        return []
+    # Always provide column headers so the panel renders even with 0 rows
+    labels = _introspect_columns_pretty(conn, table) if table else []
 
-    for sec in (PQPSection.query
-                .filter_by(project_code=code)
-                .order_by(PQPSection.section_number)
-                .all()):
-        snum = (sec.section_number or 1)
-        if snum in {3, 31, 32, 33, 41, 42, 51, 52, 61, 62, 63, 71, 72, 91, 92, 101}:
-            continue  # sub-panels handled separately
-        if 1 <= snum <= section_count:
-            cols_for_panel = section_columns[snum - 1] or ["title", "description"]
-            section_data[snum - 1].extend(_normalize_rows(cols_for_panel, _rows_of(sec)))
-
-    # If a single-table section has *no* JSON rows, try hydrating once from physical tables
-    try:
-        hydration_meta = _hydrate_from_tables_if_empty(code, section_columns, section_data)
-    except Exception:
-        hydration_meta = {}
+    # Data: try the declared table; if nothing, try a name-guess
+    raw = _fetch_table_rows(conn, table, code) if table else []
+    guessed = None
+    if not raw:
+        guessed = _guess_table_for_sub(conn, sub_no, spec.get("title", ""))
+        if guessed:
+            labels = _introspect_columns_pretty(conn, guessed) or labels
+            raw = _fetch_table_rows(conn, guessed, code)
+
+    rows = [_remap_db_row_to_labels(labels, r) for r in raw] if raw else []
+    meta = {
+        "hydrated": bool(rows),
+        "table": guessed or table or "(none)",
+        "rowcount": len(rows),
+        "guessed": bool(guessed and rows),
+    }
+    return labels, rows, meta
 
-    # ---------- Composite/multi-table panels (3.x,4.x,5.x,6.x,7.x,9.x,10/101) ----------
-    group_cols, group_data, group_meta = {}, {}, {}
+
+def _sub_actions(code: str, sub_no: int) -> dict:
+    """URLs the client needs to render add/edit/delete forms for a subsection panel."""
+    return {
+        "add": url_for("pqp.pqp_ui_add_row", code=code, sub_no=sub_no),
+        "edit": url_for("pqp.pqp_ui_edit_row", code=code, sub_no=sub_no, rid="__rid__"),
+        "delete": url_for("pqp.pqp_ui_delete_row", code=code, sub_no=sub_no, rid="__rid__"),
+        "patch": url_for("pqp_api.api_patch_section_row", code=code, sec_no=sub_no, row_id="__rid__"),
+    }
+
+
+def _load_form_panels(code: str, sec_no: int, with_rows: bool = True):
+    """
+    Everything one form tab needs, as a list of panels:
+      - tabs 1, 2, 8              -> one 'json' panel (PQPSection rows)
+      - tabs 3, 4, 5, 6, 7, 9, 10 -> one 'table' panel per subsection
+      - a subsection code (31..101) -> just that 'table' panel
+    With with_rows=False only columns are returned; the grid pages its rows
+    from grid_src. Returns None for an unknown section.
+    """
+    if sec_no in JSON_PANEL_TABS:
+        if with_rows:
+            cols, rows, meta = _load_json_panel(code, sec_no)
+        else:
+            cols, rows, meta = _json_panel_columns(sec_no), [], {}
+        return [{
+            "kind": "json",
+            "section": sec_no,
+            "title": DEFAULT_SECTION_TITLES.get(sec_no, f"Section {sec_no}"),
+            "columns": cols,
+            "rows": rows,
+            "meta": meta,
+            "actions": {
+                "edit": url_for("pqp.pqp_section_save", code=code, section_idx=sec_no - 1),
+                "patch": url_for("pqp_api.api_patch_section_row", code=code, sec_no=sec_no, row_id="__rid__"),
+            },
+            "grid_src": url_for("pqp_api.api_grid_page", code=code, sec_no=sec_no),
+        }]
+
+    if sec_no in SUBSECTIONS:
+        parts = list(SUBSECTIONS[sec_no].items())
+    else:
+        parent_no, spec = _sub_spec(sec_no)
+        if not spec:
+            return None
+        parts = [(str(sec_no), spec)]
+
+    panels = []
     with db.engine.connect() as conn:
-        for parent_no, parts in SUBSECTIONS.items():
-            for sub_code, spec in parts.items():
-                sub_no = int(sub_code)
+        for sub_code, spec in parts:
+            sub_no = int(sub_code)
+            if with_rows:
+                labels, rows, meta = _load_sub_panel(conn, code, sub_no, spec)
+            else:
                 table = spec.get("table")
-
-                # Always provide column headers so the panel renders even with 0 rows
                 labels = _introspect_columns_pretty(conn, table) if table else []
+                rows, meta = [], {"table": table or "(none)"}
+            panels.append({
+                "kind": "table",
+                "sub_no": sub_no,
+                "title": spec.get("title", f"Section {sub_no}"),
+                "columns": labels,
+                "rows": rows,
+                "meta": meta,
+                "actions": _sub_actions(code, sub_no),
+                "grid_src": url_for("pqp_api.api_grid_page", code=code, sec_no=sub_no),
+            })
+    return panels
 
-                # Data: try the declared table; if nothing, try a name-guess
-                raw = _fetch_table_rows(conn, table, code) if table else []
-                guessed = None
-                if not raw:
-                    guessed = _guess_table_for_sub(conn, sub_no, spec.get("title", ""))
-                    if guessed:
-                        labels = _introspect_columns_pretty(conn, guessed) or labels
-                        raw = _fetch_table_rows(conn, guessed, code)
-
-                rows = [_remap_db_row_to_labels(labels, r) for r in raw] if raw else []
-
-                # Store (even if rows == [] so Jinja shows the shell)
-                group_cols[sub_no] = labels
-                group_data[sub_no] = rows
-                group_meta[sub_no] = {
-                    "hydrated": bool(rows),
-                    "table": guessed or table or "(none)",
-                    "rowcount": len(rows),
-                    "guessed": bool(guessed and rows),
-                }
-    # Build tab titles 1..9 from your canonical titles dict
-    section_titles = [DEFAULT_SECTION_TITLES.get(i, f"Section {i}") for i in range(1, 10)]
 
+@pqp_bp.route("/form/code/<code>", methods=["GET"])
+def pqp_form_by_code(code):
+    """
+    Project form for a single project_code.
+
+    Only the active tab (?tab=N, default 1) is rendered on the server; every other
+    tab is a shell that the browser fills from /api/pqp/form/<code>/section/<n>
+    the first time it is opened.
+
+    - Tabs 1, 2, 8 use PQPSection JSON; if empty we hydrate once from tables.
+    - Composite tabs (3.x, 4.x, 5.x, 6.x, 7.x, 9.x, 10/101) are rendered from their
+      own physical tables; even with 0 rows we still provide column headers so the
+      template always shows the panel and keeps your layout intact.
+    """
+    code = _norm_code(code)
+
+    # ---------- Project header ----------
+    project = _load_project_header(code)
+    if not project:
+        flash("Project Code not found.", "danger")
+        return redirect(url_for("pqp.pqp_form_select_by_code"))
+
+    # ---------- Ensure scaffolding ----------
+    _ensure_sections_by_code(code)
+
+    active_tab = request.args.get("tab", type=int) or 1
+    if active_tab not in FORM_TABS:
+        active_tab = 1
+
+    section_columns = list(SECTION_DEFS)
+    if len(section_columns) < 10:
+        section_columns += [[] for _ in range(10 - len(section_columns))]
+    section_data = [[] for _ in range(len(section_columns))]
+    group_cols, group_data, group_meta = {}, {}, {}
+
+    # ---------- Active tab only (column shells; grids page their own rows) ----------
+    for panel in _load_form_panels(code, active_tab, with_rows=False) or []:
+        if panel["kind"] == "json":
+            section_columns[active_tab - 1] = panel["columns"]
+            section_data[active_tab - 1] = panel["rows"]
+        else:
+            group_cols[panel["sub_no"]] = panel["columns"]
+            group_data[panel["sub_no"]] = panel["rows"]
+            group_meta[panel["sub_no"]] = panel["meta"]
 
     # ---------- Render ----------
     return render_template(
@@ -2394,10 +2402,141 @@ def pqp_form_by_code(code):
         p_cols=group_cols,
         p_rows=group_data,
         p_meta=group_meta,            # make sure this name matches the dict you build above
+        active_tab=active_tab,
+        loaded_tabs=[active_tab],
         read_only=False               # only once
     )
 
 
+@pqp_api_bp.get("/form/<code>/section/<int:sec_no>")
+def api_form_section(code, sec_no):
+    """
+    Lazy tab loader for the PQP form: columns + rows for one section (1..10)
+    or one subsection (31, 32, ... 101).
+    """
+    code = _norm_code(code)
+    panels = _load_form_panels(code, sec_no, with_rows=request.args.get("rows") != "0")
+    if panels is None:
+        return jsonify({"ok": False, "error": f"Unknown section {sec_no}"}), 404
+    return jsonify({"ok": True, "code": code, "section": sec_no, "panels": panels})
+
+
+@pqp_api_bp.get("/grid/<code>/<int:sec_no>/range")
+@pqp_api_bp.get("/grid/<code>/<int:sec_no>")
+def api_grid_page(code, sec_no):
+    """
+    One page (or row range) of a section grid.
+      sec_no: 1, 2, 8 (PQPSection JSON) or a subsection 31..101 (physical table)
+      ?page=1&per_page=50&sort=<column>&dir=asc|desc&f.<column>=<text>
+      /range?start=0&end=100&...   row blocks for the virtual-scroll grid
+    Returns {columns, rows, total, start, page, per_page, sort, dir}.
+    """
+    code = _norm_code(code)
+    gq = parse_grid_args(request.args)
+
+    if sec_no in JSON_PANEL_TABS:
+        columns = _json_panel_columns(sec_no)
+        rows, total = page_json_section(db.session, code, sec_no, columns, gq)
+        versions = [row_version(r) for r in rows]
+        if not total and not gq["filters"]:
+            # nothing in JSON yet: page the one-off hydration from the physical table
+            with db.engine.connect() as conn:
+                hydrated, _meta = _hydrate_section_from_tables(conn, code, sec_no)
+            rows, total = page_rows(_normalize_rows(columns, hydrated), gq, columns)
+            versions = []                      # not stored yet, nothing to PATCH
+        rows = _normalize_rows(columns, rows)
+        for r, v in zip(rows, versions):
+            r["_v"] = v
+    else:
+        _parent, spec = _sub_spec(sec_no)
+        if not spec:
+            return jsonify({"ok": False, "error": f"Unknown section {sec_no}"}), 404
+        with db.engine.connect() as conn:
+            table = spec.get("table")
+            columns, rows, total = page_table(conn, table, code, gq) if table else ([], [], 0)
+            if not total and not gq["filters"]:
+                guessed = _guess_table_for_sub(conn, sec_no, spec.get("title", ""))
+                if guessed and guessed != table:
+                    g_cols, g_rows, g_total = page_table(conn, guessed, code, gq)
+                    if g_total:
+                        columns, rows, total = g_cols, g_rows, g_total
+
+    return jsonify({
+        "ok": True,
+        "code": code,
+        "section": sec_no,
+        "columns": columns,
+        "rows": rows,
+        "total": total,
+        "start": gq["offset"],
+        "page": gq["page"],
+        "per_page": gq["per_page"],
+        "sort": gq["sort"],
+        "dir": "desc" if gq["desc"] else "asc",
+    })
+
+
+@pqp_api_bp.patch("/section/<code>/<int:sec_no>/rows/<row_id>")
+def api_patch_section_row(code, sec_no, row_id):
+    """
+    Inline edit of one row.
+      body: {"fields": {<column>: <value>, ...}, "version": "<_v from the grid>"}
+            (the version may also come as an If-Match header)
+    Only the given fields are written. 409 with the current row and version
+    when the row changed since the editor loaded it.
+    """
+    code = _norm_code(code)
+    body = request.get_json(silent=True) or {}
+    fields = body.get("fields")
+    version = (body.get("version") or request.headers.get("If-Match") or "").strip('" ')
+    if not isinstance(fields, dict) or not fields:
+        return jsonify({"ok": False, "error": "fields must be a non-empty object"}), 400
+    if not version:
+        return jsonify({"ok": False, "error": "version is required"}), 400
+
+    _parent, spec = _sub_spec(sec_no)
+    if spec:
+        table = _table_for_sub_required(sec_no)
+        with db.engine.begin() as conn:
+            status, row, new_version = patch_table_row(conn, table, code, row_id, fields, version)
+    else:
+        if not 1 <= sec_no <= len(SECTION_DEFS):
+            return jsonify({"ok": False, "error": f"Unknown section {sec_no}"}), 404
+        columns = _json_panel_columns(sec_no)
+        try:
+            lock_section(db.session, code, sec_no)
+        except SectionBusy as e:
+            return jsonify({"ok": False, "error": str(e)}), 503, {"Retry-After": "2"}
+        sec = (PQPSection.query
+               .filter_by(project_code=code, section_number=sec_no)
+               .populate_existing()
+               .first())
+        rows = _load_section_rows(sec) if sec else []
+        status, row, new_version = patch_json_row(rows, row_id, fields, version, columns)
+        if status == "ok":
+            if hasattr(sec, "rows_json"):
+                sec.rows_json = _dump_section_rows(rows)
+            else:
+                sec.content = _dump_section_rows(rows)
+            db.session.commit()
+        else:
+            db.session.rollback()
+        if status in ("ok", "stale"):
+            row = _normalize_rows(columns, [row])[0]
+
+    if status == "invalid":
+        return jsonify({"ok": False, "error": "Unknown or read-only fields", **row}), 400
+    if status == "missing":
+        return jsonify({"ok": False, "error": f"Row {row_id} not found"}), 404
+    if status == "stale":
+        return jsonify({"ok": False, "error": "Row was changed by someone else",
+                        "row": row, "version": new_version}), 409
+
+    row["_v"] = new_version
+    resp = jsonify({"ok": True, "code": code, "section": sec_no, "row": row, "version": new_version})
+    resp.headers["ETag"] = f'"{new_version}"'
+    return resp
+
 
 
 
@@ -2496,17 +2635,19 @@ def _remap_db_row(section_no: int, raw: dict) -> dict:
        - ignores spaces, punctuation, accents
        - uses synonyms per label (e.g., 'Cell' ~ mobile/phone)
        - 'id' is taken from project_code or id
+    Label lists, the column map and normalised synonyms come precompiled
+    from the registry; only the row's own column names are normalised here.
     """
-    labels = SECTION_COLS.get(section_no, [])
+    sec = registry.section(section_no)
+    labels = sec.labels if sec else ()
     out = {lbl: "" for lbl in labels}
 
     if not isinstance(raw, dict) or not labels:
         return out
 
     # --- 1) exact mapping path (kept as-is) ---
-    mapping = DB_TO_UI_COLS.get(section_no, {})
     used_db_cols = set()
-    for db_key, ui_label in mapping.items():
+    for db_key, ui_label in sec.column_to_label.items():
         if ui_label in out and db_key in raw:
             val = raw.get(db_key)
             out[ui_label] = _to_str(val)
@@ -2522,107 +2663,15 @@ def _remap_db_row(section_no: int, raw: dict) -> dict:
         return out
 
     # --- 2) tolerant matcher (fallback) ---
-    import re, unicodedata
-
-    def norm(s: str) -> str:
-        s = unicodedata.normalize("NFKD", str(s or "")).encode("ascii", "ignore").decode()
-        return re.sub(r"[^a-z0-9]+", "", s.strip().lower())
-
-    db_cols = [c for c in raw.keys() if c not in used_db_cols]
-    norm_db = {c: norm(c) for c in db_cols}
-
-    # synonyms by UI label (expandable)
-    SYN = {
-        # Section 1
-        "Project Description": ["description", "projectdesc", "projdesc"],
-        "Location":            ["location", "loc"],
-        "Client Organisation": ["clientorganisation", "clientorganization", "clientorg", "client"],
-        "Primary Contact Name":["primarycontactname", "contactname", "representativename", "name"],
-        "VAT Number":          ["vat", "vatno", "vatnumber"],
-        "Designation":         ["designation", "title", "position"],
-        "Invoice Address":     ["invoiceaddress", "billingaddress"],
-        # Section 2
-        "Role":                ["role", "position"],
-        "Req'd":               ["reqd", "required", "mandatory", "needed"],
-        "Organisation":        ["organisation", "organization", "org", "company", "firm"],
-        "Representative Name": ["representativename", "repname", "contactname", "name"],
-        "Email":               ["email", "e_mail", "mail"],
-        "Cell":                ["cell", "mobile", "phone", "tel", "telephone", "contactnumber"],
-        "Subconsultant to HN?":      ["subconsultanttohn", "subconsultant", "tohn", "issubconsultant"],
-        "Subconsultant Agreement?":  ["subconsultantagreement", "subagreement", "hasagreement"],
-        "CPG Partner?":        ["cpgpartner", "iscpgpartner"],
-        "CPG %":               ["cpgpercent", "cpgpct", "cpgpercentage", "cpg"],
-        "Comments":            ["comments", "notes", "remarks", "comment"],
-        # Section 4
-        "Design Criteria/Requirements": ["designcriteria", "requirements", "designrequirements"],
-        "Planning & Design Risks":      ["planningdesignrisks", "designrisks", "risks"],
-        "Scope Register Location":      ["scoperegisterlocation", "scopelocation", "registerlocation"],
-        "Design Notes":                 ["designnotes", "notes"],
-        # Section 5
-        "Client Tender Doc Requirements": ["clienttenderdocrequirements", "tenderrequirements"],
-        "Form of Contract":              ["formofcontract", "contractform"],
-        "Standard Specs":                ["standardspecs", "specs", "specifications"],
-        "Client Template Date":          ["clienttemplatedate", "templatedate"],
-        "Documentation Risks":           ["documentationrisks", "docsrisks", "risks"],
-        "Tender Phase Notes":            ["tenderphasenotes", "notes"],
-        # Section 6 (subset; many columns – matcher will still align)
-        "Construction Description": ["constructiondescription", "description"],
-        "Contractor Organisation":  ["contractororganisation", "contractororganization", "contractor", "org"],
-        "Contract Number":          ["contractnumber", "contractno"],
-        "Award Value (incl VAT)":   ["awardvalueinclvat", "awardvalue", "value", "amount"],
-        "Award Date":               ["awarddate"],
-        "Original Order No":        ["originalorderno", "origorderno"],
-        "Original Date of Order":   ["originaldateoforder", "origorderdate"],
-        "Inception Meeting Date":   ["inceptionmeetingdate", "inceptiondate"],
-        "Final Payment Cert Date":  ["finalpaymentcertdate", "finalpaymentdate"],
-        "Final Value (incl VAT)":   ["finalvalueinclvat", "finalvalue"],
-        "Commencement of Works":    ["commencementofworks", "commencement"],
-        "Date of EA's Instruction": ["dateofeasinstruction", "eainstructiondate"],
-        "Where Instruction Recorded":["whereinstructionrecorded", "instructionlocation", "recordlocation"],
-        "Completion Date":          ["completiondate"],
-        "Final Approval Date":      ["finalapprovaldate"],
-        "Client Takeover Date":     ["clienttakeoverdate"],
-        "Commencement Instruction Date": ["commencementinstructiondate"],
-        "Commencement Instruction Location": ["commencementinstructionlocation"],
-        "Construction Phase Risks": ["constructionphaserisks", "risks"],
-        "Construction Phase Notes": ["constructionphasenotes", "notes"],
-        # Section 7
-        "Additional Services Done": ["additionalservicesdone", "additionalservices", "servicesdone"],
-        "Project-specific Risks":   ["projectspecificrisks", "risks"],
-        "Mitigating Measures":      ["mitigatingmeasures", "mitigation"],
-        "Record of Action Taken":   ["recordofactiontaken", "actiontaken", "actions"],
-        # Section 8
-        "Date CSQ Submitted":       ["datecsqsubmitted", "csqsubmitteddate"],
-        "Date CSQ Received":        ["datecsqreceived", "csqreceiveddate"],
-        "CSQ Rating":               ["csqrating", "rating"],
-        "Comments on Feedback":     ["commentsonfeedback", "feedbackcomments"],
-        "Actual Close-Out Date":    ["actualcloseoutdate", "closeoutdate"],
-        "General Remarks/Lessons Learned": ["generalremarkslessonslearned", "generalremarks", "lessonslearned"],
-        # Section 9
-        "Scope Item":               ["scopeitem", "item"],
-        "Category":                 ["category"],
-        "Owner":                    ["owner", "responsible"],
-        "Status":                   ["status", "state"],
-        "Due Date":                 ["duedate", "due"],
-        "Notes":                    ["notes", "comments", "remarks"],
-    }
+    norm_db = {c: norm_key(c) for c in raw.keys() if c not in used_db_cols}
 
     def find_best(ui_label: str):
-        targets = SYN.get(ui_label, [])
-        n_targets = [norm(t) for t in targets] + [norm(ui_label)]
-        # exact/contains preference
+        # exact/contains match against the label's synonyms, then the label itself
         for db_name, ndb in norm_db.items():
-            for nt in n_targets:
+            for nt in LABEL_KEYS.get(ui_label) or (norm_key(ui_label),):
                 if nt and (ndb == nt or nt in ndb or ndb in nt):
                     return db_name
-        # fallback: token overlap score
-        best, best_score = None, 0
-        toks = set(re.findall(r"[a-z0-9]+", n_targets[-1]))
-        for db_name, ndb in norm_db.items():
-            score = sum(1 for t in toks if t and t in ndb)
-            if score > best_score:
-                best, best_score = db_name, score
-        return best
+        return None
 
     for lbl in labels:
         if lbl == "id":
@@ -2635,6 +2684,48 @@ def _remap_db_row(section_no: int, raw: dict) -> dict:
 
     return out
 
+def _hydrate_section_from_tables(conn, project_code: str, sec_no: int):
+    """
+    Pull rows for one single-table section from its configured table; if that gives
+    no rows, guess a better table by name and use it. Returns (rows, meta).
+    """
+    configured = SECTION_TABLE.get(sec_no)
+    table_to_use = configured
+    rows = []
+
+    if configured:
+        rows = _fetch_table_rows(conn, configured, project_code)
+
+    # auto-guess if nothing came back
+    guessed = None
+    if not rows:
+        guessed = _guess_table_for_section(conn, sec_no, project_code)
+        if guessed and guessed != configured:
+            try:
+                rows = _fetch_table_rows(conn, guessed, project_code)
+                if rows:
+                    SECTION_TABLE[sec_no] = guessed  # cache for this process
+                    table_to_use = guessed
+            except Exception:
+                pass
+
+    labels = SECTION_COLS.get(sec_no, [])
+    if rows and labels:
+        hydrated = [_remap_db_row(sec_no, r) for r in rows]
+        hydrated = [r for r in hydrated if any(v for k, v in r.items() if k != "id")]
+        return hydrated, {
+            "hydrated": True,
+            "table": table_to_use or configured or "(auto)",
+            "rowcount": len(hydrated),
+            "guessed": (table_to_use == guessed and guessed is not None)
+        }
+    return [], {
+        "hydrated": False,
+        "table": table_to_use or configured or "(none)",
+        "rowcount": 0,
+        "guessed": False
+    }
+
 def _hydrate_from_tables_if_empty(project_code: str, section_columns, section_data):
     """
     If a section has no JSON rows, pull from a configured table; if that gives no rows,
@@ -2645,63 +2736,13 @@ def _hydrate_from_tables_if_empty(project_code: str, section_columns, section_da
         for sec_no in range(1, min(10, len(section_columns)) + 1):
             if sec_no in (3,):
                 continue
-
-            configured = SECTION_TABLE.get(sec_no)
-            table_to_use = configured
-            rows = []
-
-            if configured:
-                rows = _fetch_table_rows(conn, configured, project_code)
-
-            # auto-guess if nothing came back
-            guessed = None
-            if not rows:
-                guessed = _guess_table_for_section(conn, sec_no, project_code)
-                if guessed and guessed != configured:
-                    try:
-                        rows = _fetch_table_rows(conn, guessed, project_code)
-                        if rows:
-                            SECTION_TABLE[sec_no] = guessed  # cache for this process
-                            table_to_use = guessed
-                    except Exception:
-                        pass
-
-            labels = SECTION_COLS.get(sec_no, [])
-            if rows and labels:
-                hydrated = [_remap_db_row(sec_no, r) for r in rows]
-                hydrated = [r for r in hydrated if any(v for k, v in r.items() if k != "id")]
-                if hydrated and not section_data[sec_no - 1]:
-                    section_data[sec_no - 1].extend(hydrated)
-                meta[sec_no] = {
-                    "hydrated": True,
-                    "table": table_to_use or configured or "(auto)",
-                    "rowcount": len(hydrated),
-                    "guessed": (table_to_use == guessed and guessed is not None)
-                }
-            else:
-                meta[sec_no] = {
-                    "hydrated": False,
-                    "table": table_to_use or configured or "(none)",
-                    "rowcount": 0,
-                    "guessed": False
-                }
+            hydrated, meta[sec_no] = _hydrate_section_from_tables(conn, project_code, sec_no)
+            if hydrated and not section_data[sec_no - 1]:
+                section_data[sec_no - 1].extend(hydrated)
     return meta
 
 
 
-# Heuristics to spot tables by name if SECTION_TABLE is wrong/missing
-SECTION_KEYWORDS = {
-    1: ["overview", "project_overview", "section1"],
-    2: ["team", "project_team", "section2"],
-    4: ["planning", "design", "planning_design", "section4"],
-    5: ["documentation", "docs", "tender", "section5"],
-    6: ["works", "handover", "construction", "section6"],
-    7: ["additional", "services", "section7"],
-    8: ["close", "closeout", "feedback", "section8"],
-    9: ["scope", "register", "scope_register", "section9"],
-}
-
-
 # === BEGIN ADD: multi-table section helpers ================================
 
 def _ensure_id_in_row(d: dict) -> dict:
@@ -2832,6 +2873,7 @@ def _build_multipart(conn, project_code: str) -> dict:
     return result
 # ---------------------------------------------------------------------------
 def _fetch_all_dicts(conn, sql, params=()):
+    import psycopg2.extras  # raw-cursor path only; not needed at startup
     with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
         cur.execute(sql, params)
         return [dict(r) for r in cur.fetchall()]
@@ -2969,7 +3011,7 @@ def _count_rows_for_table(conn, table_qualified: str, project_code: str):
 
 def _guess_table_for_sub(conn, sub_no: int, title: str):
     """Pick the most name-relevant table for a sub-section (e.g. 31, 41, 101)."""
-    keywords = set(SECTION_KEYWORDS.get(sub_no, []))
+    keywords = set(registry.keywords(sub_no))
     keywords |= {str(sub_no)}
     keywords |= {w.lower() for w in (title or "").split()}
     best_tbl, best_score = None, -1
@@ -2987,15 +3029,11 @@ def _remap_db_row_to_labels(labels: list, raw: dict) -> dict:
     if "id" in out:
         out["id"] = _to_str(raw.get("project_code") or raw.get("id") or raw.get("project_id") or "")
     # tolerant name match
-    import re, unicodedata
-    def norm(s):
-        s = unicodedata.normalize("NFKD", str(s or "")).encode("ascii","ignore").decode()
-        return re.sub(r"[^a-z0-9]+","",s.strip().lower())
-    norm_db = {k: norm(k) for k in raw.keys()}
+    norm_db = {k: norm_key(k) for k in raw.keys()}
     for lbl in labels:
         if lbl == "id":
             continue
-        nl = norm(lbl)
+        nl = norm_key(lbl)
         match = None
         for k, nk in norm_db.items():
             if nk == nl or nl in nk or nk in nl:
@@ -3192,7 +3230,7 @@ def _guess_table_for_section(conn, sec_no: int, project_code: str):
       - requiring row count > 0 for this project
     Returns table name or None.
     """
-    cand_kw = [k.lower() for k in SECTION_KEYWORDS.get(sec_no, [])]
+    cand_kw = registry.keywords(sec_no)
     if not cand_kw:
         return None
 
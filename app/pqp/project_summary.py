@@ -0,0 +1,318 @@
+# app/pqp/project_summary.py
+"""
+Per-project summary rows (pqp.project_summaries), kept current on write.
+
+How far along a project is used to be nobody's job: the dashboard tiles had
+no numbers to show and the form inferred Active/Closed from end_date on every
+render. One ProjectSummary row per project_code now holds
+
+  sections          {"<n>": {"pct", "rows", "completed"}} for sections 1..9
+  completion_pct    mean section pct over all nine (missing sections count 0)
+  sections_done     sections marked completed
+  status, end_date  ProjectRecords Status, else inferred from end_date
+  checklist_open    open checklist items; overdue_count of those past due
+  next_due          earliest open due date (compare with today, never stale)
+  last_activity_at  last section or checklist write
+
+A section's pct is 100 once PQPSection.completed is set, otherwise the share
+of filled cells over its rows (capped at 99), 0 without rows.
+
+Section writes are picked up from the session: init_project_summary() hooks
+before_flush / after_flush, so every writer of PQPSection (form save, CSV /
+zip / AI import, rollback, inline edit) updates its own section entry in the
+same transaction. Entries are merged with jsonb ||, so writers of different
+sections of one project (separate advisory locks) never overwrite each
+other. The checklist routes write with raw SQL and call checklist_changed().
+
+status / end_date are refreshed when the project header is edited
+(refresh_header); overdue_count and an inferred status are as of the last
+write. rebuild() (and scripts/rebuild_project_summaries.py) recomputes every
+project from scratch for the backfill and, run nightly, for date drift.
+"""
+from __future__ import annotations
+
+import json
+import logging
+from datetime import date, datetime
+
+from sqlalchemy import event, func, inspect, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.pqp.ingest.ai_import import _load_section_rows
+from app.pqp.pqp_models import PQPSection, ProjectSummary
+from app.pqp.sections import SECTION_DEFS
+
+log = logging.getLogger(__name__)
+
+SECTION_COUNT = len(SECTION_DEFS)
+_PENDING = "pqp_summary_pending"
+_table_ready = None      # probed once per worker, see available()
+_checklist_linked = None  # does pqp.project carry project_code? see _linked()
+
+# a checklist item is done when it has completed_at or a finished status
+_DONE = ("(c.completed_at is not null "
+         "or lower(coalesce(c.status, '')) in ('done', 'complete', 'completed', 'closed'))")
+
+_CHECKLIST_SELECT = f"""
+    select p.project_code as code,
+           count(c.id) filter (where not {_DONE}) as open,
+           count(c.id) filter (where not {_DONE} and c.due_date < current_date) as overdue,
+           min(c.due_date) filter (where not {_DONE}) as next_due
+      from project p
+      left join checklist_item c on c.project_id = p.id
+"""
+_CHECKLIST_ONE = text(_CHECKLIST_SELECT + " where p.id = :pid group by p.project_code")
+_CHECKLIST_MANY = text(_CHECKLIST_SELECT + " where p.project_code = any(:codes) group by p.project_code")
+
+_MERGE_SECTIONS = text("""
+    insert into pqp.project_summaries (project_code, sections, last_activity_at, updated_at)
+    values (:code, cast(:sections as jsonb), now(), now())
+    on conflict (project_code) do update
+       set sections = project_summaries.sections || excluded.sections,
+           last_activity_at = now(), updated_at = now()
+    returning (xmax = 0) as inserted
+""")
+
+_ROLLUP = text("""
+    update pqp.project_summaries s
+       set completion_pct = coalesce((select round(sum((v->>'pct')::numeric) / :n)
+                                        from jsonb_each(s.sections) e(k, v)), 0),
+           sections_done  = (select count(*) from jsonb_each(s.sections) e(k, v)
+                              where (v->>'completed')::boolean)
+     where project_code = :code
+""")
+
+_SET_CHECKLIST = text("""
+    insert into pqp.project_summaries (project_code, checklist_open, overdue_count, next_due,
+                                       last_activity_at, updated_at)
+    values (:code, :open, :overdue, :next_due, now(), now())
+    on conflict (project_code) do update
+       set checklist_open = excluded.checklist_open, overdue_count = excluded.overdue_count,
+           next_due = excluded.next_due, last_activity_at = now(), updated_at = now()
+    returning (xmax = 0) as inserted
+""")
+
+_SET_HEADER = text("update pqp.project_summaries set status = :status, end_date = :end_date "
+                   "where project_code = :code")
+
+
+# ---------- pure helpers ----------
+
+def _as_date(v):
+    if isinstance(v, datetime):
+        return v.date()
+    return v if isinstance(v, date) else None
+
+
+def infer_status(status, end_date, today: date | None = None) -> str:
+    """Recorded status if any, else Closed past end_date, else Active."""
+    status = (str(status).strip() if status is not None else "")
+    if status:
+        return status
+    end = _as_date(end_date)
+    return "Closed" if end and end < (today or date.today()) else "Active"
+
+
+def section_stats(sec) -> dict:
+    """{"pct", "rows", "completed"} for one PQPSection."""
+    rows = [r for r in _load_section_rows(sec) if isinstance(r, dict)]
+    n = sec.section_number or 0
+    cols = [c for c in (SECTION_DEFS[n - 1] if 1 <= n <= SECTION_COUNT else []) if c != "id"]
+    cells = filled = 0
+    for r in rows:
+        keys = cols or [k for k in r if k != "id" and not str(k).startswith("_")]
+        cells += len(keys)
+        filled += sum(1 for k in keys if str(r.get(k) if r.get(k) is not None else "").strip())
+    completed = bool(sec.completed)
+    if completed:
+        pct = 100
+    elif cells:
+        pct = min(99, round(filled * 100 / cells))
+    else:
+        pct = 0
+    return {"pct": pct, "rows": len(rows), "completed": completed}
+
+
+def _rollup(sections: dict) -> tuple[int, int]:
+    """(completion_pct, sections_done) from a sections map."""
+    total = sum(int(s.get("pct") or 0) for s in sections.values())
+    return round(total / SECTION_COUNT), sum(1 for s in sections.values() if s.get("completed"))
+
+
+# ---------- database ----------
+
+def available(conn) -> bool:
+    """Does pqp.project_summaries exist? (checked once; writes never fail on a missing table)"""
+    global _table_ready
+    if _table_ready is None:
+        _table_ready = conn.execute(text("select to_regclass('pqp.project_summaries')")).scalar() is not None
+        if not _table_ready:
+            log.warning("pqp.project_summaries is missing; summaries are not maintained "
+                        "(run scripts/init_db.py, then scripts/rebuild_project_summaries.py)")
+    return _table_ready
+
+
+def _linked(conn) -> bool:
+    """Checklist items reach a summary through project.project_code; without it they can't."""
+    global _checklist_linked
+    if _checklist_linked is None:
+        _checklist_linked = bool(conn.execute(text(
+            "select exists (select 1 from information_schema.columns where table_schema = 'pqp' "
+            "and table_name = 'project' and column_name = 'project_code')")).scalar())
+    return _checklist_linked
+
+
+def _project_headers(conn, codes) -> dict:
+    """{code: (status, end_date)} from ProjectRecords, status inferred when blank."""
+    from app.extensions import db
+    from app.pqp.pqp_routes import PR_COL_CODE, PR_COL_STATUS, _col, _projectrecords
+    PR = _projectrecords(db.engine)
+    code_col = _col(PR, PR_COL_CODE)
+    cols = [code_col.label("code")]
+    for cname, lbl in (("end_date", "end_date"), (PR_COL_STATUS, "status")):
+        try:
+            cols.append(_col(PR, cname).label(lbl))
+        except KeyError:
+            pass
+    out = {}
+    for m in conn.execute(select(*cols).where(code_col.in_(list(codes)))).mappings():
+        out[m["code"]] = (infer_status(m.get("status"), m.get("end_date")), _as_date(m.get("end_date")))
+    return out
+
+
+def _fill_header(conn, code: str) -> None:
+    status, end = _project_headers(conn, [code]).get(code, (None, None))
+    conn.execute(_SET_HEADER, {"code": code, "status": status, "end_date": end})
+
+
+def apply_sections(conn, code: str, sections: dict) -> None:
+    """Merge {"<n>": stats} into the project's row and recompute its rollups."""
+    inserted = conn.execute(_MERGE_SECTIONS, {"code": code, "sections": json.dumps(sections)}).scalar()
+    conn.execute(_ROLLUP, {"code": code, "n": SECTION_COUNT})
+    if inserted:
+        _fill_header(conn, code)
+
+
+def refresh_header(session, code: str) -> None:
+    """Re-read status / end_date from ProjectRecords after it was edited; call before commit."""
+    conn = session.connection()
+    if available(conn):
+        _fill_header(conn, code)
+
+
+def checklist_changed(session, project_id: int) -> None:
+    """Recount open / overdue checklist items of one project; call before commit."""
+    conn = session.connection()
+    if not (available(conn) and _linked(conn)):
+        return
+    row = conn.execute(_CHECKLIST_ONE, {"pid": project_id}).mappings().first()
+    if not row or not row["code"]:
+        return   # no such project, or it isn't linked to a project_code
+    inserted = conn.execute(_SET_CHECKLIST, dict(row)).scalar()
+    if inserted:
+        _fill_header(conn, row["code"])
+
+
+# ---------- session hooks ----------
+
+def _section_changed(sec) -> bool:
+    state = inspect(sec)
+    if state.pending:
+        return True
+    return any(state.attrs[a].history.has_changes() for a in ("rows_json", "content", "completed"))
+
+
+def _before_flush(session, _flush_context, _instances):
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, PQPSection) or not obj.project_code:
+            continue
+        if 1 <= (obj.section_number or 0) <= SECTION_COUNT and _section_changed(obj):
+            pending = session.info.setdefault(_PENDING, {})
+            pending.setdefault(obj.project_code, {})[str(obj.section_number)] = section_stats(obj)
+
+
+def _after_flush(session, _flush_context):
+    pending = session.info.pop(_PENDING, None)
+    if not pending:
+        return
+    conn = session.connection()
+    if not available(conn):
+        return
+    for code, sections in pending.items():
+        apply_sections(conn, code, sections)
+
+
+def _discard(session, *_args):
+    session.info.pop(_PENDING, None)
+
+
+def init_project_summary(session) -> None:
+    """Maintain summaries from this (scoped) session's flushes."""
+    for name, fn in (("before_flush", _before_flush), ("after_flush", _after_flush),
+                     ("after_rollback", _discard)):
+        if not event.contains(session, name, fn):
+            event.listen(session, name, fn)
+
+
+# ---------- full rebuild ----------
+
+def rebuild(session, codes=None, batch: int = 50) -> dict:
+    """
+    Recompute summaries from scratch for `codes` (default: every ProjectRecords
+    code), `batch` projects per transaction. Each batch holds the section locks
+    of its projects while it reads and writes, so a save committing meanwhile
+    can't be overwritten by the older read; a batch whose locks time out is
+    skipped. Returns {"written": n, "skipped": [codes]}.
+    """
+    from app.extensions import db
+    from app.pqp.pqp_routes import PR_COL_CODE, _col, _projectrecords
+    from app.pqp.section_lock import SectionBusy, lock_projects
+
+    if codes is None:
+        PR = _projectrecords(db.engine)
+        codes = [c for c in session.execute(select(_col(PR, PR_COL_CODE))).scalars() if c]
+    codes = sorted(set(codes))
+    written, skipped = 0, []
+    for i in range(0, len(codes), batch):
+        chunk = codes[i:i + batch]
+        try:
+            lock_projects(session, chunk, range(1, SECTION_COUNT + 1))
+        except SectionBusy as e:
+            log.warning("summary rebuild skipped %d projects: %s", len(chunk), e)
+            skipped += chunk
+            continue
+        conn = session.connection()
+        sections, last = {c: {} for c in chunk}, {}
+        for sec in session.execute(select(PQPSection).where(PQPSection.project_code.in_(chunk))).scalars():
+            if 1 <= (sec.section_number or 0) <= SECTION_COUNT:
+                sections[sec.project_code][str(sec.section_number)] = section_stats(sec)
+                if sec.last_edited_on and (sec.project_code not in last or sec.last_edited_on > last[sec.project_code]):
+                    last[sec.project_code] = sec.last_edited_on
+        checklist = {}
+        if _linked(conn):
+            checklist = {m["code"]: m for m in conn.execute(_CHECKLIST_MANY, {"codes": chunk}).mappings()}
+        headers = _project_headers(conn, chunk)
+
+        rows = []
+        for code in chunk:
+            pct, done = _rollup(sections[code])
+            cl = checklist.get(code) or {}
+            status, end = headers.get(code, (None, None))
+            rows.append({"project_code": code, "sections": sections[code], "completion_pct": pct,
+                         "sections_done": done, "status": status, "end_date": end,
+                         "checklist_open": cl.get("open") or 0, "overdue_count": cl.get("overdue") or 0,
+                         "next_due": cl.get("next_due"), "last_activity_at": last.get(code)})
+        t = ProjectSummary.__table__
+        stmt = pg_insert(t)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["project_code"],
+            set_={**{k: stmt.excluded[k] for k in rows[0] if k not in ("project_code", "last_activity_at")},
+                  # greatest() skips nulls: keep a later write-time activity stamp
+                  "last_activity_at": func.greatest(t.c.last_activity_at, stmt.excluded.last_activity_at),
+                  "updated_at": func.now()},
+        )
+        session.execute(stmt, rows)
+        session.commit()   # releases the section locks
+        session.expunge_all()
+        written += len(rows)
+    return {"written": written, "skipped": skipped}
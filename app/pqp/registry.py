@@ -0,0 +1,606 @@
+# app/pqp/registry.py
+"""
+Section registry: every declaration of the form's sections in one place,
+compiled once at import into frozen lookup indexes.
+
+Declarations (edit these):
+  SECTION_TABLE           section -> physical table (single-table sections)
+  SECTION_COLS            section -> UI labels of the physical-table view
+  DB_TO_UI_COLS           section -> {db column: UI label}
+  SECTION_PART_TABLES     section -> {part: (title, table)}
+  SECTION_PART_COLS       section -> {part: [columns]}   (optional)
+  SUBSECTIONS             section -> {part: {title, table}}   (form sub-panels)
+  SUB_TABLE_MAP           subsection -> table name (schema pqp)
+  SECTION_KEYWORDS        section -> table-name hints for guessing
+  SUBSECTION_KEYWORDS     subsection -> table-name hints for guessing
+  SYNONYMS                UI label -> normalised alternative header/column names
+  SECTION_DEFS            (sections.py) columns of the PQPSection JSON grids
+
+Compiled indexes (read these; all immutable):
+  SECTIONS[n]             Section: table, labels, column_to_label, label_to_column, parts, keywords
+  PARTS[sub_no]           Part: parent, title, table, columns, keywords
+  TABLE_PARTS[table]      parts backed by a schema-qualified table
+  SYNONYM_LABELS[key]     normalised synonym or label -> labels it can mean
+  LABEL_KEYS[label]       normalised keys to try for a label (synonyms, then the label)
+
+validate() cross-checks the declarations; check() runs it once at boot
+(create_app) and raises RegistryError on a broken declaration, so a typo
+fails the deploy instead of every request that touches the section.
+"""
+from __future__ import annotations
+
+import re
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Tuple
+
+from app.pqp.sections import DEFAULT_SECTION_TITLES, SECTION_DEFS
+
+
+class RegistryError(ValueError):
+    """The section declarations contradict each other."""
+
+
+# ---------- declarations ----------
+
+# --- Harden section lookup: map codes -> table(s)
+SECTION_META = {
+    "section101":   {"tables": ["pqp.section101"], "title": "Section 101"},
+    "risk_concept": {"tables": ["pqp.risk_concept"], "title": "Concept & Design Development"},
+    "risk_docs":    {"tables": ["pqp.risk_docs"],    "title": "Documentation & Tender"},
+    "risk_works":   {"tables": ["pqp.risk_works"],   "title": "Implementation / Works"},
+    # Example for multi-table sections later:
+    # "section3": {"tables": ["pqp.section3_header", "pqp.section3_items"], "title": "Appointment & Milestones"}
+}
+# --- Section → DB table mapping (aligned with Supabase current schema) ---
+# NOTE: Section 3 is composite (31/32/33) and is handled by _load_section3_from_parts.
+#       Section 9 (Scope Register) may be composite (91/92); we keep it special-friendly.
+SECTION_TABLE = {
+    1: "pqp.section1",
+    2: "pqp.section2",
+    3: None,              # composite, handled separately
+    4: "pqp.section4",
+    5: "pqp.section5",
+    6: "pqp.section6",
+    7: "pqp.section7",
+    8: "pqp.section8",
+    9: "pqp.section9",    # if yours is split 91/92, leave this as None and load via its own helper
+    10: None,             # keep spare; your UI shows up to 10 panels
+}
+
+# --- UI column labels per panel (kept exactly as your templates expect) ---
+SECTION_COLS = {
+    1: ["id","Project Description","Location","Client Organisation","Primary Contact Name",
+        "VAT Number","Designation","Invoice Address"],
+    2: ["id","Role","Req'd","Organisation","Representative Name","Email","Cell",
+        "Subconsultant to HN?","Subconsultant Agreement?","CPG Partner?","CPG %","Comments"],
+    3: ["id","In Place","Date","Filing Location","Notes",
+        "Appointment Date","Expected Duration","Contract/Ref No","Comments"],
+    4: ["id","Design Criteria/Requirements","Planning & Design Risks",
+        "Scope Register Location","Design Notes"],
+    5: ["id","Client Tender Doc Requirements","Form of Contract","Standard Specs",
+        "Client Template Date","Documentation Risks","Tender Phase Notes"],
+    6: ["id","Construction Description","Contractor Organisation","Contract Number",
+        "Award Value (incl VAT)","Award Date","Original Order No","Original Date of Order",
+        "Inception Meeting Date","Final Payment Cert Date","Final Value (incl VAT)",
+        "Commencement of Works","Date of EA's Instruction","Where Instruction Recorded",
+        "Completion Date","Final Approval Date","Client Takeover Date",
+        "Commencement Instruction Date","Commencement Instruction Location",
+        "Construction Phase Risks","Construction Phase Notes"],
+    7: ["id","Additional Services Done","Project-specific Risks",
+        "Mitigating Measures","Record of Action Taken","Notes"],
+    8: ["id","Date CSQ Submitted","Date CSQ Received","CSQ Rating","Location",
+        "Comments on Feedback","Actual Close-Out Date","General Remarks/Lessons Learned"],
+    9: ["id","Scope Item","Category","Owner","Status","Due Date","Notes"],
+    10: ["id"],  # reserved; template will tolerate empty rows
+}
+
+# --- DB→UI column name mapping per section (non-destructive; best effort) ---
+# Left side: actual DB column names; right side: your UI label names in SECTION_COLS.
+# If a column is missing, it is silently ignored.
+DB_TO_UI_COLS = {
+    1: {
+        "project_code": "id",
+        "project_description": "Project Description",
+        "location": "Location",
+        "client_organisation": "Client Organisation",
+        "primary_contact_name": "Primary Contact Name",
+        "vat_number": "VAT Number",
+        "designation": "Designation",
+        "invoice_address": "Invoice Address",
+    },
+    2: {
+        "project_code": "id",
+        "role": "Role",
+        "required": "Req'd",
+        "organisation": "Organisation",
+        "representative_name": "Representative Name",
+        "email": "Email",
+        "cell": "Cell",
+        "is_subconsultant": "Subconsultant to HN?",
+        "has_subconsultant_agreement": "Subconsultant Agreement?",
+        "is_cpg_partner": "CPG Partner?",
+        "cpg_percent": "CPG %",
+        "comments": "Comments",
+    },
+    4: {
+        "project_code": "id",
+        "design_criteria": "Design Criteria/Requirements",
+        "planning_design_risks": "Planning & Design Risks",
+        "scope_register_location": "Scope Register Location",
+        "design_notes": "Design Notes",
+    },
+    5: {
+        "project_code": "id",
+        "client_tender_requirements": "Client Tender Doc Requirements",
+        "form_of_contract": "Form of Contract",
+        "standard_specs": "Standard Specs",
+        "client_template_date": "Client Template Date",
+        "documentation_risks": "Documentation Risks",
+        "tender_phase_notes": "Tender Phase Notes",
+    },
+    6: {
+        "project_code": "id",
+        "construction_description": "Construction Description",
+        "contractor_organisation": "Contractor Organisation",
+        "contract_number": "Contract Number",
+        "award_value_incl_vat": "Award Value (incl VAT)",
+        "award_date": "Award Date",
+        "original_order_no": "Original Order No",
+        "original_order_date": "Original Date of Order",
+        "inception_meeting_date": "Inception Meeting Date",
+        "final_payment_cert_date": "Final Payment Cert Date",
+        "final_value_incl_vat": "Final Value (incl VAT)",
+        "commencement_of_works": "Commencement of Works",
+        "ea_instruction_date": "Date of EA's Instruction",
+        "ea_instruction_location": "Where Instruction Recorded",
+        "completion_date": "Completion Date",
+        "final_approval_date": "Final Approval Date",
+        "client_takeover_date": "Client Takeover Date",
+        "commencement_instruction_date": "Commencement Instruction Date",
+        "commencement_instruction_location": "Commencement Instruction Location",
+        "construction_phase_risks": "Construction Phase Risks",
+        "construction_phase_notes": "Construction Phase Notes",
+    },
+    7: {
+        "project_code": "id",
+        "additional_services_done": "Additional Services Done",
+        "project_specific_risks": "Project-specific Risks",
+        "mitigating_measures": "Mitigating Measures",
+        "record_of_action": "Record of Action Taken",
+        "notes": "Notes",
+    },
+    8: {
+        "project_code": "id",
+        "date_csq_submitted": "Date CSQ Submitted",
+        "date_csq_received": "Date CSQ Received",
+        "csq_rating": "CSQ Rating",
+        "location": "Location",
+        "feedback_comments": "Comments on Feedback",
+        "actual_close_out_date": "Actual Close-Out Date",
+        "general_remarks": "General Remarks/Lessons Learned",
+    },
+    9: {
+        "project_code": "id",
+        "scope_item": "Scope Item",
+        "category": "Category",
+        "owner": "Owner",
+        "status": "Status",
+        "due_date": "Due Date",
+        "notes": "Notes",
+    },
+}
+
+# For sections that are composed of multiple physical tables (e.g., 3 = 31/32/33,
+# 4 = 41/42, etc). The UI will use these to render sub-panels, and the loader
+# will know which underlying tables to read from.
+SECTION_PART_TABLES = {
+    3:  {
+        "31": ("Appointment — Records/Storage",   "pqp.section31"),
+        "32": ("Appointment — Review",            "pqp.section32"),
+        "33": ("Appointment — Deliverables",      "pqp.section33"),
+    },
+    4:  {
+        "41": ("Planning & Design — Criteria",    "pqp.section41"),
+        "42": ("Planning & Design — Approvals",   "pqp.section42"),
+    },
+    5:  {
+        "51": ("Documentation — Requirements",    "pqp.section51"),
+        "52": ("Tender — Notes/Risks",            "pqp.section52"),
+    },
+    6:  {
+        "61": ("Works — Contract/Award",          "pqp.section61"),
+        "62": ("Works — Dates/Instructions",      "pqp.section62"),
+        "63": ("Works — Completion/Final",        "pqp.section63"),
+    },
+    7:  {
+        "71": ("Additional Services — Items",     "pqp.section71"),
+        "72": ("Additional Services — Actions",   "pqp.section72"),
+    },
+    9:  {
+        "91": ("Scope Register — Items",          "pqp.section91"),
+        "92": ("Scope Register — Tasks",          "pqp.section92"),
+    },
+    10: {
+        "101": ("Risk Register",                  "pqp.section101"),
+    },
+}
+
+# Optional: if you already know a part’s column order, declare it here so the UI
+# can label columns consistently. When not provided, we’ll derive from the table
+# itself (information_schema) and still display.
+SECTION_PART_COLS = {
+    # Section 3 already has a dedicated loader; you can leave it empty here or
+    # duplicate it for consistency. Example:
+    3: {
+        "31": ["id", "item", "in_place", "date_val", "filing_location", "notes"],
+        "32": ["id", "appointment_review_date", "appointment_reviewer", "review_comments",
+               "appointment_roles", "appointment_date", "expected_duration",
+               "original_end_date", "contract_ref_no", "general_comments"],
+        "33": ["id", "ecsa_project_stage", "date_completed", "description_of_deliverable",
+               "deliverable", "deliverable_accepted", "employer_approved", "comments"],
+    },
+    # Section 10 (Risk Register) — from your screenshot/notes
+    10: {
+        "101": [
+            "heading_id","id","risk_code","title","description","cause","consequence",
+            "category","likelihood","impact","treatment","owner","due_date","status",
+            "extra","date_created","date_modified","row_id"
+        ],
+    },
+}
+
+
+# --- Form sub-panels of the multi-table sections ---
+
+SUBSECTIONS = {
+    3: OrderedDict([
+        ("31", {"title": "3.1 Appointment",                  "table": "pqp.section31"}),
+        ("32", {"title": "3.2 Milestones",                   "table": "pqp.section32"}),
+        ("33", {"title": "3.3 Deliverables / Approvals",     "table": "pqp.section33"}),
+    ]),
+    4: OrderedDict([
+        ("41", {"title": "4.1 Planning & Design",            "table": "pqp.section41"}),
+        ("42", {"title": "4.2 Project-specific Risks",       "table": "pqp.section42"}),
+    ]),
+    5: OrderedDict([
+        ("51", {"title": "5.1 Documentation",                "table": "pqp.section51"}),
+        ("52", {"title": "5.2 Tender",                       "table": "pqp.section52"}),
+    ]),
+    6: OrderedDict([
+        ("61", {"title": "6.1 Contracts / Orders",           "table": "pqp.section61"}),
+        ("62", {"title": "6.2 Payments / Certificates",      "table": "pqp.section62"}),
+        ("63", {"title": "6.3 Instructions / Handover",      "table": "pqp.section63"}),
+    ]),
+    7: OrderedDict([
+        ("71", {"title": "7.1 Additional Services",          "table": "pqp.section71"}),
+        ("72", {"title": "7.2 Actions & Notes",              "table": "pqp.section72"}),
+    ]),
+    9: OrderedDict([
+        ("91", {"title": "9.1 Scope Items",                  "table": "pqp.section91"}),
+        ("92", {"title": "9.2 Scope Notes",                  "table": "pqp.section92"}),
+    ]),
+    10: OrderedDict([
+        ("101", {"title": "10 Risk Register",                "table": "pqp.section101"}),
+    ]),
+}
+
+# name-matching hints for auto-guessing when a subsection's table name differs
+SUBSECTION_KEYWORDS = {
+    31: ["section31","appoint","appointment"],
+    32: ["section32","milestone"],
+    33: ["section33","deliver","approval"],
+    41: ["section41","planning","design"],
+    42: ["section42","risk"],
+    51: ["section51","doc","documentation"],
+    52: ["section52","tender"],
+    61: ["section61","contract","order"],
+    62: ["section62","payment","certificate"],
+    63: ["section63","instruction","handover"],
+    71: ["section71","additional","service"],
+    72: ["section72","action","note"],
+    91: ["section91","scope","item"],
+    92: ["section92","scope","note"],
+    101:["section101","risk","register"],
+}
+
+# exact UI column set for 101 (Risk Register)
+COLS_101 = [
+    "id","risk_code","title","description","cause","consequence","category",
+    "likelihood","impact","treatment","owner","due_date","status",
+    "heading_id","extra","date_created","date_modified","row_id"
+]
+
+# ---- PQP SUBSECTION → TABLE MAP (schema 'pqp') ----
+SUB_TABLE_MAP = {
+    31: "section31", 32: "section32", 33: "section33",
+    41: "section41", 42: "section42",
+    51: "section51", 52: "section52",
+    61: "section61", 62: "section62", 63: "section63",
+    71: "section71", 72: "section72",
+    91: "section91", 92: "section92",       # Scope Register
+    101: "risk_register"                     # Risk Register
+}
+
+# Heuristics to spot tables by name if SECTION_TABLE is wrong/missing
+SECTION_KEYWORDS = {
+    1: ["overview", "project_overview", "section1"],
+    2: ["team", "project_team", "section2"],
+    4: ["planning", "design", "planning_design", "section4"],
+    5: ["documentation", "docs", "tender", "section5"],
+    6: ["works", "handover", "construction", "section6"],
+    7: ["additional", "services", "section7"],
+    8: ["close", "closeout", "feedback", "section8"],
+    9: ["scope", "register", "scope_register", "section9"],
+}
+
+
+# synonyms by UI label, as normalised keys (lowercase, no punctuation/spaces)
+SYNONYMS: Dict[str, List[str]] = {
+    # Section 1
+    "Project Description": ["description", "projectdesc", "projdesc"],
+    "Location":            ["location", "loc"],
+    "Client Organisation": ["clientorganisation", "clientorganization", "clientorg", "client"],
+    "Primary Contact Name":["primarycontactname", "contactname", "representativename", "name"],
+    "VAT Number":          ["vat", "vatno", "vatnumber"],
+    "Designation":         ["designation", "title", "position"],
+    "Invoice Address":     ["invoiceaddress", "billingaddress"],
+    # Section 2
+    "Role":                ["role", "position"],
+    "Req'd":               ["reqd", "required", "mandatory", "needed"],
+    "Organisation":        ["organisation", "organization", "org", "company", "firm"],
+    "Representative Name": ["representativename", "repname", "contactname", "name"],
+    "Email":               ["email", "e_mail", "mail"],
+    "Cell":                ["cell", "mobile", "phone", "tel", "telephone", "contactnumber"],
+    "Subconsultant to HN?":      ["subconsultanttohn", "subconsultant", "tohn", "issubconsultant"],
+    "Subconsultant Agreement?":  ["subconsultantagreement", "subagreement", "hasagreement"],
+    "CPG Partner?":        ["cpgpartner", "iscpgpartner"],
+    "CPG %":               ["cpgpercent", "cpgpct", "cpgpercentage", "cpg"],
+    "Comments":            ["comments", "notes", "remarks", "comment"],
+    # Section 4
+    "Design Criteria/Requirements": ["designcriteria", "requirements", "designrequirements"],
+    "Planning & Design Risks":      ["planningdesignrisks", "designrisks", "risks"],
+    "Scope Register Location":      ["scoperegisterlocation", "scopelocation", "registerlocation"],
+    "Design Notes":                 ["designnotes", "notes"],
+    # Section 5
+    "Client Tender Doc Requirements": ["clienttenderdocrequirements", "tenderrequirements"],
+    "Form of Contract":              ["formofcontract", "contractform"],
+    "Standard Specs":                ["standardspecs", "specs", "specifications"],
+    "Client Template Date":          ["clienttemplatedate", "templatedate"],
+    "Documentation Risks":           ["documentationrisks", "docsrisks", "risks"],
+    "Tender Phase Notes":            ["tenderphasenotes", "notes"],
+    # Section 6 (subset; many columns – matcher will still align)
+    "Construction Description": ["constructiondescription", "description"],
+    "Contractor Organisation":  ["contractororganisation", "contractororganization", "contractor", "org"],
+    "Contract Number":          ["contractnumber", "contractno"],
+    "Award Value (incl VAT)":   ["awardvalueinclvat", "awardvalue", "value", "amount"],
+    "Award Date":               ["awarddate"],
+    "Original Order No":        ["originalorderno", "origorderno"],
+    "Original Date of Order":   ["originaldateoforder", "origorderdate"],
+    "Inception Meeting Date":   ["inceptionmeetingdate", "inceptiondate"],
+    "Final Payment Cert Date":  ["finalpaymentcertdate", "finalpaymentdate"],
+    "Final Value (incl VAT)":   ["finalvalueinclvat", "finalvalue"],
+    "Commencement of Works":    ["commencementofworks", "commencement"],
+    "Date of EA's Instruction": ["dateofeasinstruction", "eainstructiondate"],
+    "Where Instruction Recorded":["whereinstructionrecorded", "instructionlocation", "recordlocation"],
+    "Completion Date":          ["completiondate"],
+    "Final Approval Date":      ["finalapprovaldate"],
+    "Client Takeover Date":     ["clienttakeoverdate"],
+    "Commencement Instruction Date": ["commencementinstructiondate"],
+    "Commencement Instruction Location": ["commencementinstructionlocation"],
+    "Construction Phase Risks": ["constructionphaserisks", "risks"],
+    "Construction Phase Notes": ["constructionphasenotes", "notes"],
+    # Section 7
+    "Additional Services Done": ["additionalservicesdone", "additionalservices", "servicesdone"],
+    "Project-specific Risks":   ["projectspecificrisks", "risks"],
+    "Mitigating Measures":      ["mitigatingmeasures", "mitigation"],
+    "Record of Action Taken":   ["recordofactiontaken", "actiontaken", "actions"],
+    # Section 8
+    "Date CSQ Submitted":       ["datecsqsubmitted", "csqsubmitteddate"],
+    "Date CSQ Received":        ["datecsqreceived", "csqreceiveddate"],
+    "CSQ Rating":               ["csqrating", "rating"],
+    "Comments on Feedback":     ["commentsonfeedback", "feedbackcomments"],
+    "Actual Close-Out Date":    ["actualcloseoutdate", "closeoutdate"],
+    "General Remarks/Lessons Learned": ["generalremarkslessonslearned", "generalremarks", "lessonslearned"],
+    # Section 9
+    "Scope Item":               ["scopeitem", "item"],
+    "Category":                 ["category"],
+    "Owner":                    ["owner", "responsible"],
+    "Status":                   ["status", "state"],
+    "Due Date":                 ["duedate", "due"],
+    "Notes":                    ["notes", "comments", "remarks"],
+}
+
+
+# ---------- compiled indexes ----------
+
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+
+
+@lru_cache(maxsize=8192)
+def norm_key(s) -> str:
+    """'Rep. Name ' -> 'repname': ASCII-folded, lowercase, letters and digits only."""
+    s = unicodedata.normalize("NFKD", str(s or "")).encode("ascii", "ignore").decode()
+    return _NON_ALNUM_RE.sub("", s.strip().lower())
+
+
+@dataclass(frozen=True)
+class Part:
+    number: int                      # 31
+    parent: int                      # 3
+    title: str                       # "3.1 Appointment"
+    table: Optional[str]             # "pqp.section31"
+    columns: Tuple[str, ...] = ()    # SECTION_PART_COLS, when declared
+    keywords: Tuple[str, ...] = ()
+
+    @property
+    def key(self) -> str:
+        return str(self.number)
+
+    def spec(self) -> dict:
+        """The SUBSECTIONS-style {title, table} dict the panel loaders take."""
+        return {"title": self.title, "table": self.table}
+
+
+@dataclass(frozen=True)
+class Section:
+    number: int
+    title: str
+    table: Optional[str]
+    labels: Tuple[str, ...]                          # SECTION_COLS
+    form_columns: Tuple[str, ...]                    # SECTION_DEFS (JSON grid)
+    column_to_label: Mapping[str, str] = field(default_factory=dict)
+    label_to_column: Mapping[str, str] = field(default_factory=dict)
+    parts: Tuple[Part, ...] = ()
+    keywords: Tuple[str, ...] = ()
+
+
+def _compile():
+    parts: Dict[int, Part] = {}
+    for parent, subs in SUBSECTIONS.items():
+        declared_cols = SECTION_PART_COLS.get(parent, {})
+        for key, spec in subs.items():
+            n = int(key)
+            parts[n] = Part(number=n, parent=parent, title=spec.get("title", ""),
+                            table=spec.get("table"), columns=tuple(declared_cols.get(key, ())),
+                            keywords=tuple(k.lower() for k in SUBSECTION_KEYWORDS.get(n, ())))
+
+    numbers = sorted(set(SECTION_TABLE) | set(SECTION_COLS) | set(SUBSECTIONS)
+                     | set(range(1, len(SECTION_DEFS) + 1)))
+    sections: Dict[int, Section] = {}
+    for n in numbers:
+        col_to_label = dict(DB_TO_UI_COLS.get(n, {}))
+        label_to_col: Dict[str, str] = {}
+        for col, label in col_to_label.items():
+            label_to_col.setdefault(label, col)      # first declared column wins ("id" <- project_code)
+        sections[n] = Section(
+            number=n,
+            title=DEFAULT_SECTION_TITLES.get(n, f"Section {n}"),
+            table=SECTION_TABLE.get(n),
+            labels=tuple(SECTION_COLS.get(n, ())),
+            form_columns=tuple(SECTION_DEFS[n - 1]) if 0 < n <= len(SECTION_DEFS) else (),
+            column_to_label=MappingProxyType(col_to_label),
+            label_to_column=MappingProxyType(label_to_col),
+            parts=tuple(p for p in parts.values() if p.parent == n),
+            keywords=tuple(k.lower() for k in SECTION_KEYWORDS.get(n, ())),
+        )
+
+    table_parts: Dict[str, List[Part]] = {}
+    for p in parts.values():
+        if p.table:
+            table_parts.setdefault(p.table, []).append(p)
+
+    labels = {lbl for sec in sections.values() for lbl in sec.labels + sec.form_columns} | set(SYNONYMS)
+    label_keys: Dict[str, Tuple[str, ...]] = {}
+    synonym_labels: Dict[str, set] = {}
+    for lbl in sorted(labels):
+        if lbl == "id":
+            continue
+        keys = tuple(dict.fromkeys([norm_key(t) for t in SYNONYMS.get(lbl, [])] + [norm_key(lbl)]))
+        label_keys[lbl] = keys
+        for k in keys:
+            synonym_labels.setdefault(k, set()).add(lbl)
+
+    return (MappingProxyType(sections), MappingProxyType(parts),
+            MappingProxyType({t: tuple(ps) for t, ps in table_parts.items()}),
+            MappingProxyType({k: frozenset(v) for k, v in synonym_labels.items()}),
+            MappingProxyType(label_keys))
+
+
+SECTIONS, PARTS, TABLE_PARTS, SYNONYM_LABELS, LABEL_KEYS = _compile()
+
+
+def section(n: int) -> Optional[Section]:
+    return SECTIONS.get(n)
+
+
+def part(sub_no: int) -> Optional[Part]:
+    return PARTS.get(sub_no)
+
+
+def keywords(n: int) -> Tuple[str, ...]:
+    """Table-name hints for a section (1..10) or a subsection (31..101)."""
+    if n in PARTS:
+        return PARTS[n].keywords
+    sec = SECTIONS.get(n)
+    return sec.keywords if sec else ()
+
+
+# ---------- validation ----------
+
+def validate() -> Tuple[List[str], List[str]]:
+    """(errors, warnings). Errors are declarations the loaders cannot work with."""
+    errors: List[str] = []
+    warnings: List[str] = []
+
+    for n, labels in SECTION_COLS.items():
+        if not labels or labels[0] != "id":
+            errors.append(f"SECTION_COLS[{n}] must start with 'id'")
+        dup = {lbl for lbl in labels if labels.count(lbl) > 1}
+        if dup:
+            errors.append(f"SECTION_COLS[{n}] repeats {sorted(dup)}")
+    for i, cols in enumerate(SECTION_DEFS, start=1):
+        if not cols or cols[0] != "id":
+            errors.append(f"SECTION_DEFS[{i - 1}] (section {i}) must start with 'id'")
+        dup = {c for c in cols if cols.count(c) > 1}
+        if dup:
+            errors.append(f"SECTION_DEFS section {i} repeats {sorted(dup)}")
+
+    for n, mapping in DB_TO_UI_COLS.items():
+        unknown = sorted(set(mapping.values()) - set(SECTION_COLS.get(n, ())))
+        if unknown:
+            errors.append(f"DB_TO_UI_COLS[{n}] maps to labels not in SECTION_COLS[{n}]: {unknown}")
+
+    for n, subs in SUBSECTIONS.items():
+        declared = SECTION_PART_TABLES.get(n, {})
+        for key, spec in subs.items():
+            if not key.isdigit():
+                errors.append(f"SUBSECTIONS[{n}] part key {key!r} is not a number")
+                continue
+            table = spec.get("table")
+            if table and "." not in table:
+                errors.append(f"SUBSECTIONS[{n}][{key!r}] table {table!r} is not schema-qualified")
+            if key in declared and declared[key][1] != table:
+                errors.append(f"SECTION_PART_TABLES[{n}][{key!r}] is {declared[key][1]!r}, "
+                              f"SUBSECTIONS says {table!r}")
+            mapped = SUB_TABLE_MAP.get(int(key))
+            if mapped is None:
+                warnings.append(f"subsection {key} has no SUB_TABLE_MAP entry")
+            elif table and table.split(".", 1)[1] != mapped:
+                warnings.append(f"subsection {key}: SUB_TABLE_MAP says {mapped!r}, SUBSECTIONS {table!r}")
+        missing = sorted(set(declared) - set(subs))
+        if missing:
+            errors.append(f"SECTION_PART_TABLES[{n}] parts {missing} are not in SUBSECTIONS[{n}]")
+    for n, cols in SECTION_PART_COLS.items():
+        unknown = sorted(set(cols) - set(SUBSECTIONS.get(n, {})))
+        if unknown:
+            errors.append(f"SECTION_PART_COLS[{n}] parts {unknown} are not in SUBSECTIONS[{n}]")
+
+    for n, table in SECTION_TABLE.items():
+        if table and "." not in table:
+            errors.append(f"SECTION_TABLE[{n}] {table!r} is not schema-qualified")
+    for n in SUBSECTION_KEYWORDS:
+        if n not in PARTS:
+            warnings.append(f"SUBSECTION_KEYWORDS[{n}] names no subsection")
+    for n in SECTION_KEYWORDS:
+        if n not in SECTIONS:
+            warnings.append(f"SECTION_KEYWORDS[{n}] names no section")
+
+    known = {lbl for sec in SECTIONS.values() for lbl in sec.labels + sec.form_columns}
+    stray = sorted(set(SYNONYMS) - known)
+    if stray:
+        warnings.append(f"SYNONYMS for labels no section uses: {stray}")
+    return errors, warnings
+
+
+def check(logger=None) -> None:
+    """Validate once at boot: raise RegistryError on errors, log warnings."""
+    errors, warnings = validate()
+    if logger is not None:
+        for w in warnings:
+            logger.warning("section registry: %s", w)
+    if errors:
+        raise RegistryError("section registry is inconsistent:\n  " + "\n  ".join(errors))
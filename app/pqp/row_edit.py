@@ -0,0 +1,111 @@
+# app/pqp/row_edit.py
+"""
+Single-row edits with optimistic concurrency.
+
+Every row the grid shows carries a version token ('_v'): a short hash of the
+row as stored. A PATCH sends the token it was rendered with plus only the
+fields that changed; if the stored row no longer hashes to that token someone
+else saved it first and the edit is refused (the caller answers 409 with the
+current row so the editor can retry on top of it).
+
+Two row sources, same contract:
+  - PQPSection.rows_json rows, addressed by their 'id'  -> patch_json_row()
+  - physical section tables, addressed by primary key   -> patch_table_row()
+
+Both return (status, row, version) with status one of
+  "ok" | "stale" | "missing" | "invalid".
+"""
+from __future__ import annotations
+
+from sqlalchemy import text
+
+from app.pqp.grid_data import cell, pretty_label, project_filter, row_version, table_columns, table_pk
+from app.pqp.row_ids import RowIndex
+
+# columns an editor never writes through the PATCH API
+READONLY_COLUMNS = {"id", "row_id", "tenant_id", "project_code", "created_at", "updated_at"}
+
+
+# -------------------------- PQPSection JSON rows --------------------------
+
+def patch_json_row(rows: list[dict], row_id: str, fields: dict, version: str,
+                   columns: list[str]):
+    """
+    Apply `fields` to the row with id == row_id inside `rows` (mutated in place).
+    Keys must be section columns; 'id' cannot be changed.
+    """
+    bad = [k for k in fields if k not in columns or k in READONLY_COLUMNS]
+    if bad:
+        return "invalid", {"unknown_fields": bad}, None
+
+    r = RowIndex(rows).get(row_id)
+    if r is None:
+        return "missing", None, None
+    current = row_version(r)
+    if version != current:
+        return "stale", r, current
+    for k, v in fields.items():
+        r[k] = "" if v is None else str(v)
+    return "ok", r, row_version(r)
+
+
+# -------------------------- physical section tables --------------------------
+
+def _table_row(m, label_to_col: dict) -> dict:
+    return {lbl: cell(m.get(col)) for lbl, col in label_to_col.items()}
+
+
+def patch_table_row(conn, table_qualified: str, project_code: str, rid: str,
+                    fields: dict, version: str):
+    """
+    Update one row of a section table inside the caller's transaction.
+    `fields` may use pretty labels ('Review Date') or raw column names.
+    The row is locked (FOR UPDATE) between the version check and the write.
+    """
+    col_types = table_columns(conn, table_qualified)
+    if not col_types:
+        return "missing", None, None
+    names = list(col_types)
+    if "id" in names:
+        names = ["id"] + [c for c in names if c != "id"]
+    label_to_col = {pretty_label(c): c for c in names}
+
+    data, bad = {}, []
+    for k, v in fields.items():
+        col = label_to_col.get(k) or (k if k in col_types else None)
+        if not col or col in READONLY_COLUMNS:
+            bad.append(k)
+        else:
+            data[col] = None if v in (None, "") else v
+    if bad:
+        return "invalid", {"unknown_fields": bad}, None
+
+    pk = table_pk(conn, table_qualified, col_types)
+    flt = project_filter(conn, col_types, project_code)
+    if not pk or flt is None:
+        return "missing", None, None
+    where_sql, params = flt[0], dict(flt[1])
+    params["_rid"] = rid
+
+    m = conn.execute(
+        text(f'select * from {table_qualified} where "{pk}"::text = :_rid and {where_sql} for update'),
+        params,
+    ).mappings().first()
+    if m is None:
+        return "missing", None, None
+
+    current_row = _table_row(m, label_to_col)
+    current = row_version(current_row)
+    if version != current:
+        return "stale", current_row, current
+
+    if data:
+        sets = ", ".join(f'"{c}" = :v_{i}' for i, c in enumerate(data))
+        vals = {f"v_{i}": v for i, v in enumerate(data.values())}
+        m = conn.execute(
+            text(f'update {table_qualified} set {sets} where "{pk}"::text = :_rid and {where_sql} returning *'),
+            {**params, **vals},
+        ).mappings().first()
+
+    row = _table_row(m, label_to_col)
+    return "ok", row, row_version(row)
@@ -0,0 +1,123 @@
+# app/pqp/row_ids.py
+"""
+Row ids for PQPSection rows.
+
+Ids used to be str(int(time.time() * 1000)); rows created in the same
+millisecond (any bulk import) shared an id and later edits landed on the
+wrong row. Ids are now ULIDs: 48-bit millisecond timestamp + 80 random bits,
+Crockford base32, 26 chars. Within a process they are strictly increasing
+(same-millisecond ids bump the random part), across workers they are unique
+and still sort by creation time.
+
+RowIndex maps id -> position over a loaded section's row list so updates
+during an import are a dict lookup instead of a scan per row.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+
+_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"   # Crockford base32
+_RAND_BITS = 80
+_RAND_MAX = (1 << _RAND_BITS) - 1
+
+_lock = threading.Lock()
+_last_ms = 0
+_last_rand = 0
+
+
+def _encode(value: int, length: int) -> str:
+    out = []
+    for _ in range(length):
+        value, r = divmod(value, 32)
+        out.append(_ALPHABET[r])
+    return "".join(reversed(out))
+
+
+def _next_locked(now_ms: int) -> tuple[int, int]:
+    global _last_ms, _last_rand
+    if now_ms > _last_ms:
+        _last_ms = now_ms
+        _last_rand = int.from_bytes(os.urandom(10), "big") >> 1   # headroom for increments
+    elif _last_rand < _RAND_MAX:
+        _last_rand += 1
+    else:                                    # 2^79 ids in one ms: borrow the next ms
+        _last_ms += 1
+        _last_rand = int.from_bytes(os.urandom(10), "big") >> 1
+    return _last_ms, _last_rand
+
+
+def new_row_ids(n: int) -> list[str]:
+    """Issue n monotonic ids under a single lock (batch for imports)."""
+    if n <= 0:
+        return []
+    now_ms = int(time.time() * 1000)
+    with _lock:
+        parts = [_next_locked(now_ms) for _ in range(n)]
+    return [_encode(ms, 10) + _encode(rnd, 16) for ms, rnd in parts]
+
+
+def new_row_id() -> str:
+    return new_row_ids(1)[0]
+
+
+def _key(rid) -> str:
+    return str(rid if rid is not None else "").strip()
+
+
+def _rid(row) -> str:
+    return _key(row.get("id") or "") if isinstance(row, dict) else ""
+
+
+class RowIndex:
+    """
+    id -> position index over a section row list (the list is shared, not
+    copied). The first row with a given id wins, matching the old linear scan.
+    """
+
+    def __init__(self, rows: list):
+        self.rows = rows
+        self._pos: dict[str, int] = {}
+        for i, r in enumerate(rows):
+            rid = _rid(r)
+            if rid and rid not in self._pos:
+                self._pos[rid] = i
+
+    def __contains__(self, rid) -> bool:
+        return _key(rid) in self._pos
+
+    def get(self, rid):
+        i = self._pos.get(_key(rid))
+        return None if i is None else self.rows[i]
+
+    def append(self, row: dict) -> None:
+        self.rows.append(row)
+        rid = _rid(row)
+        if rid and rid not in self._pos:
+            self._pos[rid] = len(self.rows) - 1
+
+    def upsert(self, row: dict) -> bool:
+        """Update the row with the same id in place, else append. True if updated."""
+        rid = _rid(row)
+        if rid:
+            row = {**row, "id": rid}   # a form-posted " id " must not replace the stored one
+        existing = self.get(rid) if rid else None
+        if existing is not None:
+            existing.update(row)
+            return True
+        self.append(row)
+        return False
+
+    def repair_duplicates(self) -> int:
+        """
+        Give fresh ids to rows that share an id with an earlier row (left over
+        from millisecond ids). Those rows were unreachable by id anyway.
+        Returns the number of rows re-keyed.
+        """
+        dupes = [i for i, r in enumerate(self.rows)
+                 if _rid(r) and self._pos.get(_rid(r)) != i]
+        for i, rid in zip(dupes, new_row_ids(len(dupes))):
+            self.rows[i]["id"] = rid
+            self._pos[rid] = i
+        return len(dupes)
@@ -0,0 +1,184 @@
+# app/pqp/section_lock.py
+"""
+Serialise writes to one PQP section.
+
+Every writer of PQPSection.rows_json does read-modify-write on the whole
+array, so two writers on the same (project_code, section_number) must not
+overlap or one of them silently loses rows. lock_section() takes a Postgres
+transaction-scoped advisory lock on that pair before the section is read:
+
+    wait_ms = lock_section(db.session, code, n)   # raises SectionBusy
+    sec = PQPSection.query...populate_existing().first()
+    ... modify, commit (commit/rollback releases the lock)
+
+Waits are bounded by lock_timeout (PQP_SECTION_LOCK_TIMEOUT_MS, default 5s)
+and every acquisition is recorded in lock_stats().
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app import metrics
+
+log = logging.getLogger(__name__)
+
+LOCK_TIMEOUT_MS = int(os.getenv("PQP_SECTION_LOCK_TIMEOUT_MS", "5000"))
+SLOW_WAIT_MS = int(os.getenv("PQP_SECTION_LOCK_SLOW_MS", "250"))
+WAIT_BUCKETS_MS = (1, 10, 50, 100, 250, 500, 1000, 2500, 5000)
+
+LOCK_NOT_AVAILABLE = "55P03"   # lock_timeout expired
+
+
+class SectionBusy(RuntimeError):
+    """
+    Another writer held the section for longer than the lock timeout.
+
+    lock_projects() waits on many sections at once and can't tell which one
+    was held: project_codes / section_numbers then list everything it asked
+    for, and project_code / section_number are the first of each.
+    """
+
+    def __init__(self, project_code: str, section_number: int, waited_ms: float,
+                 project_codes=None, section_numbers=None):
+        self.project_code = project_code
+        self.section_number = section_number
+        self.waited_ms = waited_ms
+        self.project_codes = tuple(project_codes or (project_code,))
+        self.section_numbers = tuple(section_numbers or (section_number,))
+        nums, codes = self.section_numbers, self.project_codes
+        what = (f"Section {section_number}" if len(nums) == 1 else f"Sections {nums[0]}-{nums[-1]}")
+        what += (f" of {project_code}" if len(codes) == 1
+                 else f" of {len(codes)} projects ({codes[0]} .. {codes[-1]})")
+        what += " is busy" if len(nums) == 1 and len(codes) == 1 else " are busy"
+        super().__init__(f"{what} (waited {waited_ms:.0f} ms); try again")
+
+
+# -------------------------- metrics (per worker process) --------------------------
+
+_stats_lock = threading.Lock()
+_stats = {
+    "acquired": 0,
+    "timeouts": 0,
+    "slow": 0,
+    "wait_ms_total": 0.0,
+    "wait_ms_max": 0.0,
+    "buckets": {b: 0 for b in WAIT_BUCKETS_MS},   # cumulative: waits <= b ms
+}
+
+
+def _record(waited_ms: float, timed_out: bool = False) -> None:
+    metrics.observe_lock_wait(waited_ms, timed_out)
+    with _stats_lock:
+        if timed_out:
+            _stats["timeouts"] += 1
+        else:
+            _stats["acquired"] += 1
+        _stats["wait_ms_total"] += waited_ms
+        _stats["wait_ms_max"] = max(_stats["wait_ms_max"], waited_ms)
+        if waited_ms >= SLOW_WAIT_MS:
+            _stats["slow"] += 1
+        for b in WAIT_BUCKETS_MS:
+            if waited_ms <= b:
+                _stats["buckets"][b] += 1
+
+
+def lock_stats() -> dict:
+    """Snapshot of lock-wait counters for this worker."""
+    with _stats_lock:
+        snap = dict(_stats)
+        snap["buckets"] = {str(b): n for b, n in _stats["buckets"].items()}
+    n = snap["acquired"] + snap["timeouts"]
+    snap["wait_ms_avg"] = round(snap["wait_ms_total"] / n, 2) if n else 0.0
+    snap["wait_ms_total"] = round(snap["wait_ms_total"], 2)
+    snap["wait_ms_max"] = round(snap["wait_ms_max"], 2)
+    snap["timeout_ms"] = LOCK_TIMEOUT_MS
+    snap["pid"] = os.getpid()
+    return snap
+
+
+# -------------------------- the lock --------------------------
+
+def _dialect_name(db_or_conn) -> str:
+    bind = db_or_conn.get_bind() if hasattr(db_or_conn, "get_bind") else db_or_conn
+    return bind.dialect.name
+
+
+def lock_section(db_or_conn, project_code: str, section_number: int,
+                 timeout_ms: int | None = None) -> float:
+    """
+    Block until this transaction owns (project_code, section_number), at most
+    timeout_ms. Works with a Session or a Connection. Returns the wait in ms.
+    On timeout the transaction is rolled back and SectionBusy is raised.
+    No-op on non-Postgres engines (sqlite dev databases).
+    """
+    if _dialect_name(db_or_conn) != "postgresql":
+        return 0.0
+    timeout_ms = LOCK_TIMEOUT_MS if timeout_ms is None else int(timeout_ms)
+
+    prev = db_or_conn.execute(text("select current_setting('lock_timeout')")).scalar()
+    db_or_conn.execute(text("select set_config('lock_timeout', :t, true)"), {"t": f"{timeout_ms}ms"})
+
+    t0 = time.perf_counter()
+    try:
+        db_or_conn.execute(
+            text("select pg_advisory_xact_lock(hashtext(:code), :n)"),
+            {"code": project_code, "n": int(section_number)},
+        )
+    except OperationalError as e:
+        waited = (time.perf_counter() - t0) * 1000
+        if getattr(e.orig, "pgcode", None) != LOCK_NOT_AVAILABLE:
+            raise
+        _record(waited, timed_out=True)
+        log.warning("section lock timeout: %s/%s after %.0f ms", project_code, section_number, waited)
+        db_or_conn.rollback()
+        raise SectionBusy(project_code, section_number, waited) from e
+
+    waited = (time.perf_counter() - t0) * 1000
+    db_or_conn.execute(text("select set_config('lock_timeout', :t, true)"), {"t": prev})
+    _record(waited)
+    if waited >= SLOW_WAIT_MS:
+        log.info("section lock wait: %s/%s %.0f ms", project_code, section_number, waited)
+    return waited
+
+
+def lock_projects(db_or_conn, project_codes, sections, timeout_ms: int | None = None) -> float:
+    """
+    lock_section() for every (code, section) pair in one round trip, taken in
+    (code, section) order like the single-section writers. Each pair is one
+    lock-table slot, so keep len(project_codes) * len(sections) in the
+    hundreds. Returns the wait in ms; raises SectionBusy on timeout.
+    """
+    codes, numbers = sorted(set(project_codes)), sorted({int(n) for n in sections})
+    if not codes or not numbers or _dialect_name(db_or_conn) != "postgresql":
+        return 0.0
+    timeout_ms = LOCK_TIMEOUT_MS if timeout_ms is None else int(timeout_ms)
+
+    prev = db_or_conn.execute(text("select current_setting('lock_timeout')")).scalar()
+    db_or_conn.execute(text("select set_config('lock_timeout', :t, true)"), {"t": f"{timeout_ms}ms"})
+
+    t0 = time.perf_counter()
+    try:
+        db_or_conn.execute(text("""
+            select pg_advisory_xact_lock(hashtext(c), n)
+              from unnest(cast(:codes as text[])) c, unnest(cast(:ns as int[])) n
+             order by c, n
+        """), {"codes": codes, "ns": numbers})
+    except OperationalError as e:
+        waited = (time.perf_counter() - t0) * 1000
+        if getattr(e.orig, "pgcode", None) != LOCK_NOT_AVAILABLE:
+            raise
+        _record(waited, timed_out=True)
+        log.warning("section lock timeout: %d projects after %.0f ms", len(codes), waited)
+        db_or_conn.rollback()
+        raise SectionBusy(codes[0], numbers[0], waited, project_codes=codes, section_numbers=numbers) from e
+
+    waited = (time.perf_counter() - t0) * 1000
+    db_or_conn.execute(text("select set_config('lock_timeout', :t, true)"), {"t": prev})
+    _record(waited)
+    return waited
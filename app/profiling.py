@@ -0,0 +1,191 @@
+# app/profiling.py
+"""
+On-demand profiling of single requests.
+
+Off unless PQP_PROFILING=1: when off, nothing is installed, so there is no
+per-request cost at all. When on, the WSGI middleware looks for the
+profile token on each request and profiles only the requests that carry it:
+
+    X-Profile: <PQP_PROFILE_TOKEN>            or  ?_profile=<token>
+    X-Profile-Mode: cprofile | sample         or  &_profile_mode=sample
+    X-Profile-Output: file | inline           or  &_profile_output=inline
+
+  cprofile  deterministic, exact call counts, slows the request down;
+            saved as .prof (snakeviz / `python -m pstats`), inline = top 60
+            functions by cumulative time
+  sample    a thread samples the request's stack every PQP_PROFILE_INTERVAL_MS
+            (default 5) - low overhead; saved as collapsed stacks
+            ("frame;frame;frame count" lines, flamegraph.pl / speedscope)
+
+Only one cprofile run can be active per process; a cprofile request that
+arrives while another one is running is sampled instead (X-Profile-Mode on
+the response says which ran). On Python 3.12+ cProfile hooks sys.monitoring,
+which is process-wide, so a cprofile run also records every other thread
+busy at the time (the worker's other gthreads), not just the request's.
+
+The whole WSGI call is profiled, including a streamed response body, which
+is buffered to measure it: a profiled request loses streaming (the NDJSON
+import report and the zip export arrive in one piece at the end). Files
+go to PQP_PROFILE_DIR (default /tmp/pqp-profiles); the response carries
+X-Profile-File with the path (file output), or is replaced by the profile
+text (inline output).
+"""
+from __future__ import annotations
+
+import cProfile
+import hmac
+import io
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from urllib.parse import parse_qs
+
+ENABLED = os.getenv("PQP_PROFILING", "0") in ("1", "true", "yes")
+TOKEN = os.getenv("PQP_PROFILE_TOKEN", "")
+PROFILE_DIR = os.getenv("PQP_PROFILE_DIR", "/tmp/pqp-profiles")
+INTERVAL_S = float(os.getenv("PQP_PROFILE_INTERVAL_MS", "5")) / 1000
+
+_SAFE_RE = re.compile(r"[^A-Za-z0-9_.-]+")
+
+# one cProfile run per process: from 3.12 it sits on sys.monitoring, which
+# takes a single profiler, and a second enable() raises ValueError
+_cprofile_lock = threading.Lock()
+
+
+class _Sampler:
+    """Collapsed-stack sampler for one thread."""
+
+    def __init__(self, thread_id: int, interval: float = INTERVAL_S):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._t = threading.Thread(target=self._run, name="pqp-profile-sampler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                co = frame.f_code
+                names.append(f"{co.co_name} ({os.path.basename(co.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if names:
+                self.stacks[";".join(reversed(names))] += 1
+
+    def start(self):
+        self._t.start()
+
+    def stop(self):
+        self._stop.set()
+        self._t.join()
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {n}\n" for stack, n in self.stacks.most_common())
+
+
+class ProfilerMiddleware:
+    """WSGI wrapper; install with install_profiler(app)."""
+
+    def __init__(self, wsgi_app, token: str = TOKEN, out_dir: str = PROFILE_DIR):
+        self.wsgi_app = wsgi_app
+        self.token = token
+        self.out_dir = out_dir
+
+    def _options(self, environ):
+        hdr = environ.get("HTTP_X_PROFILE")
+        qs = environ.get("QUERY_STRING", "")
+        if hdr is None and "_profile=" not in qs:
+            return None                                   # the common, free path
+        q = parse_qs(qs)
+        given = hdr if hdr is not None else (q.get("_profile") or [""])[0]
+        if not self.token or not hmac.compare_digest(given.encode("utf-8"), self.token.encode("utf-8")):
+            return None
+        mode = environ.get("HTTP_X_PROFILE_MODE") or (q.get("_profile_mode") or ["cprofile"])[0]
+        output = environ.get("HTTP_X_PROFILE_OUTPUT") or (q.get("_profile_output") or ["file"])[0]
+        return ("sample" if mode == "sample" else "cprofile"), ("inline" if output == "inline" else "file")
+
+    def __call__(self, environ, start_response):
+        opts = self._options(environ)
+        if opts is None:
+            return self.wsgi_app(environ, start_response)
+        return self._profiled(environ, start_response, *opts)
+
+    def _path(self, environ, ext: str) -> str:
+        os.makedirs(self.out_dir, exist_ok=True)
+        name = _SAFE_RE.sub("_", f"{environ.get('REQUEST_METHOD', '')}{environ.get('PATH_INFO', '')}")[:120]
+        return os.path.join(self.out_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{name}.{ext}")
+
+    def _profiled(self, environ, start_response, mode: str, output: str):
+        captured = {}
+
+        def _capture(status, headers, exc_info=None):
+            captured["status"], captured["headers"] = status, list(headers)
+            return lambda data: captured.setdefault("early", []).append(data)
+
+        if mode == "cprofile" and not _cprofile_lock.acquire(blocking=False):
+            mode = "sample"                               # another request holds cProfile
+        prof = sampler = None
+        t0 = time.perf_counter()
+        try:
+            if mode == "sample":
+                sampler = _Sampler(threading.get_ident())
+                sampler.start()
+            else:
+                prof = cProfile.Profile()
+                prof.enable()
+            result = self.wsgi_app(environ, _capture)
+            try:
+                body = captured.pop("early", []) + [chunk for chunk in result]
+            finally:
+                if hasattr(result, "close"):
+                    result.close()
+        finally:
+            if prof is not None:
+                prof.disable()
+            if mode == "cprofile":
+                _cprofile_lock.release()
+            if sampler is not None:
+                sampler.stop()
+        ms = (time.perf_counter() - t0) * 1000
+
+        if prof is not None:
+            path = self._path(environ, "prof")
+            prof.dump_stats(path)
+            if output == "inline":
+                buf = io.StringIO()
+                pstats.Stats(prof, stream=buf).sort_stats("cumulative").print_stats(60)
+                text = buf.getvalue()
+        else:
+            path = self._path(environ, "collapsed")
+            text = sampler.collapsed()
+            with open(path, "w", encoding="utf-8") as fh:
+                fh.write(text)
+
+        headers = captured.get("headers", [])
+        if output == "inline":
+            data = f"# {mode} {environ.get('PATH_INFO')} {ms:.1f} ms -> {path}\n{text}".encode("utf-8")
+            start_response("200 OK", [("Content-Type", "text/plain; charset=utf-8"),
+                                      ("Content-Length", str(len(data))), ("X-Profile-File", path)])
+            return [data]
+
+        headers = [(k, v) for k, v in headers if k.lower() != "content-length"]
+        headers += [("X-Profile-File", path), ("X-Profile-Mode", mode), ("X-Profile-Ms", f"{ms:.1f}"),
+                    ("Content-Length", str(sum(len(b) for b in body)))]
+        start_response(captured.get("status", "500 INTERNAL SERVER ERROR"), headers)
+        return body
+
+
+def install_profiler(app) -> None:
+    """Wrap app.wsgi_app when PQP_PROFILING=1 and a token is configured; otherwise do nothing."""
+    if not ENABLED:
+        return
+    if not TOKEN:
+        app.logger.warning("PQP_PROFILING=1 but PQP_PROFILE_TOKEN is empty; profiler not installed")
+        return
+    app.wsgi_app = ProfilerMiddleware(app.wsgi_app)
+    app.logger.info("request profiler installed (dir %s)", PROFILE_DIR)
@@ -0,0 +1,149 @@
+# app/sql_trace.py
+"""
+Per-request SQL instrumentation.
+
+before/after_cursor_execute listeners on the engine time every statement run
+inside a request and fold it into a RequestTrace on flask.g:
+
+  queries      statements executed
+  db_ms        time spent in the driver
+  slowest      the SLOWEST_KEPT slowest statements (shape + ms)
+  n_plus_one   statement shapes repeated >= N_PLUS_ONE_MIN times in the
+               request (literals and IN lists collapsed) - the usual sign
+               of a per-row query in a loop
+
+Each response gets a Server-Timing header (db;dur=..;desc="N queries",
+app;dur=..) and one JSON log line on the "app.sql" logger (WARNING when
+there are N+1 suspects or db time passes SLOW_REQUEST_DB_MS).
+Statements outside a request (startup, scripts) are not traced.
+
+    PQP_SQL_TRACE=0                 disable (no listeners registered)
+    PQP_SQL_TRACE_NPLUS1=5          repeats before a shape is flagged
+    PQP_SQL_TRACE_SLOW_MS=500       request db time logged as WARNING
+"""
+from __future__ import annotations
+
+import heapq
+import json
+import logging
+import os
+import re
+import time
+from functools import lru_cache
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+log = logging.getLogger("app.sql")
+
+ENABLED = os.getenv("PQP_SQL_TRACE", "1") not in ("0", "false", "no")
+N_PLUS_ONE_MIN = int(os.getenv("PQP_SQL_TRACE_NPLUS1", "5"))
+SLOW_REQUEST_DB_MS = float(os.getenv("PQP_SQL_TRACE_SLOW_MS", "500"))
+SLOWEST_KEPT = 5
+
+_WS_RE = re.compile(r"\s+")
+_STR_RE = re.compile(r"'(?:[^']|'')*'")
+_NUM_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_RE = re.compile(r"\bIN\s*\((?:\s*\?\s*,?)+\)", re.IGNORECASE)
+
+
+@lru_cache(maxsize=4096)
+def statement_shape(statement: str) -> str:
+    """SQL with whitespace collapsed and literals / IN lists replaced by '?'."""
+    s = _WS_RE.sub(" ", statement).strip()
+    s = _STR_RE.sub("?", s)
+    s = _NUM_RE.sub("?", s)
+    return _IN_RE.sub("IN (?)", s)
+
+
+class RequestTrace:
+    __slots__ = ("t0", "queries", "db_ms", "shapes", "slowest")
+
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.queries = 0
+        self.db_ms = 0.0
+        self.shapes: dict[str, list] = {}          # shape -> [count, total_ms]
+        self.slowest: list[tuple[float, str]] = []  # min-heap of (ms, shape)
+
+    def record(self, statement: str, ms: float) -> None:
+        shape = statement_shape(statement)
+        self.queries += 1
+        self.db_ms += ms
+        st = self.shapes.get(shape)
+        if st is None:
+            self.shapes[shape] = [1, ms]
+        else:
+            st[0] += 1
+            st[1] += ms
+        if len(self.slowest) < SLOWEST_KEPT:
+            heapq.heappush(self.slowest, (ms, shape))
+        elif ms > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, (ms, shape))
+
+    def n_plus_one(self) -> list[dict]:
+        return sorted(({"shape": shp[:300], "count": c, "ms": round(ms, 1)}
+                       for shp, (c, ms) in self.shapes.items()
+                       if c >= N_PLUS_ONE_MIN and shp[:6].upper() == "SELECT"),
+                      key=lambda d: d["count"], reverse=True)
+
+    def summary(self) -> dict:
+        return {
+            "queries": self.queries,
+            "db_ms": round(self.db_ms, 1),
+            "app_ms": round((time.perf_counter() - self.t0) * 1000, 1),
+            "slowest": [{"ms": round(ms, 1), "shape": shp[:300]}
+                        for ms, shp in sorted(self.slowest, reverse=True)],
+            "n_plus_one": self.n_plus_one(),
+        }
+
+
+def current_trace() -> RequestTrace | None:
+    return g.get("_sql_trace") if has_request_context() else None
+
+
+def init_sql_trace(app, engine) -> None:
+    """Register the engine listeners and request hooks (no-op when disabled)."""
+    if not ENABLED:
+        return
+
+    # the start time rides on the statement's execution context, which is
+    # discarded with it: a statement that raises (no after_cursor_execute)
+    # leaves nothing behind to skew the next one
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._sql_trace_t0 = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        t0 = getattr(context, "_sql_trace_t0", None)
+        if t0 is None:
+            return
+        ms = (time.perf_counter() - t0) * 1000
+        tr = current_trace()
+        if tr is not None:
+            tr.record(statement, ms)
+
+    @app.before_request
+    def _start_trace():
+        g._sql_trace = RequestTrace()
+
+    @app.after_request
+    def _finish_trace(response):
+        tr = g.pop("_sql_trace", None)
+        if tr is None:
+            return response
+        s = tr.summary()
+        timing = (f'db;dur={s["db_ms"]};desc="{s["queries"]} queries", '
+                  f'app;dur={s["app_ms"]}')
+        prev = response.headers.get("Server-Timing")
+        response.headers["Server-Timing"] = f"{prev}, {timing}" if prev else timing
+        if s["queries"]:
+            level = (logging.WARNING if s["n_plus_one"] or s["db_ms"] >= SLOW_REQUEST_DB_MS
+                     else logging.INFO)
+            log.log(level, json.dumps({
+                "method": request.method, "path": request.path, "endpoint": request.endpoint,
+                "status": response.status_code, **s,
+            }, default=str))
+        return response
@@ -225,8 +225,16 @@
       // show detected code (if any)
       detected.textContent = j.detected_code || (override ? override.value.trim() : '');
 
+      // what commit will do (diff against the project's current rows)
+      const t = j.diff && j.diff.totals;
+      issuesCell.textContent = t
+        ? `Will add ${t.insert}, update ${t.update}, leave ${t.unchanged} unchanged` +
+          (t.duplicate ? `, skip ${t.duplicate} duplicate(s)` : '')
+        : '';
+
       // show snapshot tables
       renderSnapshotUnderRow(issuesCell, j.snapshot);
+      renderMappingUnderRow(issuesCell, j.mapping);
 
       status.textContent = 'Previewed';
       log(`Previewed ${f.name}: code=${detected.textContent} sections=${Object.keys(j.snapshot || {}).length}`);
@@ -264,6 +272,7 @@
         status.textContent = 'Committed';
         issuesCell.textContent = (j.issues && j.issues.length) ? j.issues.join('; ') : '';
         log(`Committed job ${jobId}`);
+        if (j.rollback_url) addUndoButton(tr, j.rollback_url);
       } else {
         status.textContent = 'Commit failed';
         issuesCell.textContent = (j && (j.error || (j.issues || []).join('; '))) || 'Unknown error';
@@ -275,6 +284,79 @@
     }
   }
 
+  // -------- Undo a committed row (reverse delta on the job) ----------
+  function addUndoButton(tr, url) {
+    const cell = tr.querySelector('td:last-child');
+    if (!cell || cell.querySelector('[data-role="undo"]')) return;
+    const btn = makeEl('button', 'btn btn-outline-danger btn-sm ms-1', 'Undo');
+    btn.setAttribute('data-role', 'undo');
+    btn.addEventListener('click', () => rollbackRow(tr, url, btn));
+    cell.appendChild(btn);
+  }
+
+  async function rollbackRow(tr, url, btn, force) {
+    const status = tr.querySelector('.status');
+    const issuesCell = tr.querySelector('.issues');
+    status.textContent = 'Rolling back…';
+    const fd = new FormData();
+    if (force) fd.append('force', '1');
+    try {
+      const r = await fetch(url, { method: 'POST', body: fd });
+      const j = await r.json();
+      if (j && j.ok) {
+        status.textContent = 'Rolled back';
+        issuesCell.textContent = `Removed ${j.removed} row(s), restored ${j.restored} row(s)`;
+        btn.remove();
+        log(`Rolled back job ${tr.dataset.jobId}`);
+      } else if (r.status === 409 && j && j.conflicts) {
+        status.textContent = 'Committed';
+        issuesCell.textContent = j.conflicts.join('; ');
+        if (confirm(`${j.conflicts.length} row(s) were edited after this import. Roll back anyway?`)) {
+          return rollbackRow(tr, url, btn, true);
+        }
+      } else {
+        status.textContent = 'Rollback failed';
+        issuesCell.textContent = (j && j.error) || 'Unknown error';
+      }
+    } catch (e) {
+      console.error(e);
+      status.textContent = 'Rollback failed';
+      issuesCell.textContent = String(e);
+    }
+  }
+
+  // -------- Header mapping (workbook header -> column, confidence) ----------
+  function renderMappingUnderRow(containerCell, mapping) {
+    Array.from(containerCell.querySelectorAll('details[data-role="mapping"]')).forEach(n => n.remove());
+    const secs = Object.keys(mapping || {}).sort((a, b) => Number(a) - Number(b));
+    if (!secs.length) return;
+
+    const details = document.createElement('details');
+    details.setAttribute('data-role', 'mapping');
+    details.className = 'mt-2';
+    let weak = 0;
+    const table = makeEl('table', 'table table-sm table-bordered mb-0', '');
+    const tbody = document.createElement('tbody');
+    secs.forEach(sec => {
+      mapping[sec].forEach(m => {
+        const pct = Math.round((m.confidence || 0) * 100);
+        if (!m.column || pct < 80) weak++;
+        const tr = document.createElement('tr');
+        if (!m.column) tr.className = 'table-danger';
+        else if (pct < 80) tr.className = 'table-warning';
+        tr.appendChild(makeEl('td', '', `S${sec}`));
+        tr.appendChild(makeEl('td', '', m.header));
+        tr.appendChild(makeEl('td', '', m.column || '(ignored)'));
+        tr.appendChild(makeEl('td', 'text-end', m.column ? `${pct}% ${m.source}` : ''));
+        tbody.appendChild(tr);
+      });
+    });
+    table.appendChild(tbody);
+    details.appendChild(makeEl('summary', '', `Column mapping${weak ? ` (${weak} to check)` : ''}`));
+    details.appendChild(table);
+    containerCell.appendChild(details);
+  }
+
   // -------- Snapshot renderer (first 5 rows per section) ----------
   function renderSnapshotUnderRow(containerCell, snapshot) {
     // Clear previous snapshot (keep any text errors)
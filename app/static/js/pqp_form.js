@@ -0,0 +1,131 @@
+/* app/static/js/pqp_form.js
+   PQP Form – lazy tab loading
+   - Tabs not rendered by the server carry <div class="pqp-lazy" data-section-src="...">
+   - On first open we fetch /api/pqp/form/<code>/section/<n> and render its panels
+   - Responses are cached per URL, so switching back and forth never refetches
+   - Panels are column shells; their rows are streamed in by PQPGrid (pqp_grid.js, virtual mode)
+*/
+
+(function () {
+  const cache = new Map();   // url -> Promise<json>
+
+  // Same "noisy" columns the Jinja partials hide
+  const HIDE_GRID   = ['id', 'project_code', 'project code', 'tenant id', 'tenant_id', 'created at', 'updated at'];
+  const HIDE_SIMPLE = ['id', 'project_code', 'project code', 'tenant_id', 'tenant id'];
+
+  function makeEl(tag, cls, text) {
+    const el = document.createElement(tag);
+    if (cls) el.className = cls;
+    if (text != null) el.textContent = text;
+    return el;
+  }
+
+  function visibleCols(cols, hide) {
+    return (cols || []).filter(c => hide.indexOf(String(c).toLowerCase()) === -1);
+  }
+
+  function fetchSection(url) {
+    if (!cache.has(url)) {
+      cache.set(url, fetch(url, { headers: { 'Accept': 'application/json' } })
+        .then(r => r.json())
+        .catch(err => { cache.delete(url); throw err; }));
+    }
+    return cache.get(url);
+  }
+
+  function textInput(name, value, cls, placeholder) {
+    const inp = makeEl('input', cls);
+    inp.type = 'text';
+    inp.name = name;
+    if (value != null) inp.value = value;
+    if (placeholder) inp.placeholder = placeholder;
+    return inp;
+  }
+
+  // -------- 'json' panels (tabs 1, 2, 8) – mirrors _grid.html ----------
+  function renderGridPanel(panel) {
+    const card = makeEl('div', 'card pqp-panel mb-3 p-0');
+
+    const bar = makeEl('div', 'd-flex justify-content-between align-items-center px-2 py-1');
+    bar.appendChild(makeEl('div', 'small text-muted', 'Read-only'));
+    const toggle = makeEl('button', 'btn btn-sm btn-outline-secondary', 'Make Editable');
+    toggle.type = 'button';
+    toggle.addEventListener('click', () => window.togglePanelEditable && window.togglePanelEditable(toggle));
+    bar.appendChild(toggle);
+    card.appendChild(bar);
+
+    card.appendChild(PQPGrid.create({
+      src: panel.grid_src,
+      columns: panel.columns,
+      hide: HIDE_GRID,
+      style: 'json',
+      mode: 'virtual',
+      actions: panel.actions || {},
+      tableClass: 'table table-sm qp-table align-middle',
+    }));
+    return card;
+  }
+
+  // -------- 'table' panels (subsections) – mirrors _simple_table.html ----------
+  function renderSimplePanel(panel) {
+    const cols = visibleCols(panel.columns, HIDE_SIMPLE);
+    const act = panel.actions || {};
+    const box = makeEl('div', 'pqp-panel p-0');
+    box.id = 'sub-' + panel.sub_no;
+
+    const bar = makeEl('div', 'd-flex justify-content-between align-items-center px-2 py-1');
+    const title = makeEl('div', 'small text-muted');
+    title.appendChild(makeEl('strong', '', panel.title || ''));
+    bar.appendChild(title);
+
+    if (act.add) {
+      const add = makeEl('form', 'd-inline');
+      add.method = 'post';
+      add.action = act.add;
+      cols.forEach(c => add.appendChild(
+        textInput(c, '', 'form-control form-control-sm d-inline w-auto me-1', c)));
+      add.appendChild(makeEl('button', 'btn btn-sm btn-primary', 'Add'));
+      bar.appendChild(add);
+    }
+    box.appendChild(bar);
+
+    box.appendChild(PQPGrid.create({
+      src: panel.grid_src,
+      columns: panel.columns,
+      hide: HIDE_SIMPLE,
+      style: 'table',
+      mode: 'virtual',
+      actions: { edit: act.edit, delete: act.delete, patch: act.patch },
+      tableClass: 'table table-sm table-striped table-hover mb-0',
+    }));
+    return box;
+  }
+
+  function renderPanels(holder, data) {
+    const frag = document.createDocumentFragment();
+    (data.panels || []).forEach(p => {
+      frag.appendChild(p.kind === 'json' ? renderGridPanel(p) : renderSimplePanel(p));
+    });
+    holder.replaceWith(frag);
+  }
+
+  // -------- Public: load a tab pane the first time it is shown ----------
+  async function loadPane(pane) {
+    if (!pane) return;
+    const holder = pane.querySelector('.pqp-lazy[data-section-src]');
+    if (!holder || holder.dataset.state === 'loading') return;
+
+    holder.dataset.state = 'loading';
+    try {
+      const data = await fetchSection(holder.dataset.sectionSrc);
+      if (!data || data.ok !== true) throw new Error((data && data.error) || 'Load failed');
+      renderPanels(holder, data);
+    } catch (e) {
+      console.error(e);
+      holder.dataset.state = '';
+      holder.textContent = 'Could not load this section: ' + e.message;
+    }
+  }
+
+  window.PQPForm = { loadPane: loadPane };
+})();
@@ -0,0 +1,567 @@
+/* app/static/js/pqp_grid.js
+   PQP section grid – server-side sorting / filtering, paged or virtual-scroll rows
+   - Mounts on <div class="pqp-grid" data-grid-src="/api/pqp/grid/<code>/<n>" ...>
+       data-columns   JSON list of column labels (header shell; the API may refine it)
+       data-hide      JSON list of lower-cased labels never shown
+       data-style     'json' (tabs 1/2/8, _grid.html) or 'table' (subsections, _simple_table.html)
+       data-actions   JSON {edit, delete, patch} URLs; table style uses __rid__ templates,
+                      json style posts the whole row (with its id) to the section save URL.
+                      With 'patch' (PATCH /api/pqp/section/<code>/<n>/rows/__rid__) the modal
+                      saves inline: only changed fields + the row's version token '_v';
+                      a 409 means someone else saved first and the row is refreshed.
+       data-mode      'paged' (default) or 'virtual'
+   - paged:   one page of rows in the DOM, pager underneath
+   - virtual: one scrolling body; row blocks are fetched from <grid-src>/range as they
+              scroll into view and only the visible window (+ overscan) is rendered.
+              Rows have a fixed height so spacer rows stand in for everything else.
+   - Edit opens one shared modal per page, so row height never changes
+*/
+
+(function () {
+  const PER_PAGE_CHOICES = [25, 50, 100, 200];
+
+  // virtual mode
+  const BLOCK = 100;          // rows per /range request
+  const MAX_BLOCKS = 30;      // cached blocks per grid; the farthest from view are dropped
+  const OVERSCAN = 15;        // extra rows rendered above and below the viewport
+  const ROW_H = 33;           // initial row height guess, re-measured after first paint
+
+  function makeEl(tag, cls, text) {
+    const el = document.createElement(tag);
+    if (cls) el.className = cls;
+    if (text != null) el.textContent = text;
+    return el;
+  }
+
+  function parseJSON(s, fallback) {
+    try { return s ? JSON.parse(s) : fallback; } catch (e) { return fallback; }
+  }
+
+  function visibleCols(g) {
+    return (g.columns || []).filter(c => g.hide.indexOf(String(c).toLowerCase()) === -1);
+  }
+
+  function hasActions(g) {
+    return !!(g.actions && g.actions.edit);
+  }
+
+  function colCount(g) {
+    return visibleCols(g).length + (hasActions(g) ? 1 : 0);
+  }
+
+  function reload(g) {
+    if (g.mode === 'virtual') resetVirtual(g); else load(g);
+  }
+
+  // Query string shared by both modes (sort + filters)
+  function gridURL(g, path) {
+    const u = new URL(g.src, window.location.origin);
+    if (path) u.pathname = u.pathname.replace(/\/$/, '') + path;
+    if (g.sort) { u.searchParams.set('sort', g.sort); u.searchParams.set('dir', g.dir); }
+    Object.keys(g.filters).forEach(k => { if (g.filters[k]) u.searchParams.set('f.' + k, g.filters[k]); });
+    return u;
+  }
+
+  function adoptColumns(g, cols) {
+    if (JSON.stringify(cols || []) !== JSON.stringify(g.columns)) {
+      g.columns = cols || [];
+      buildHead(g);
+      return true;
+    }
+    return false;
+  }
+
+  // -------- Header: sortable labels + one filter input per column ----------
+  function buildHead(g) {
+    const cols = visibleCols(g);
+    g.thead.innerHTML = '';
+
+    const trh = makeEl('tr');
+    cols.forEach(c => {
+      const th = makeEl('th', 'text-nowrap');
+      th.style.cursor = 'pointer';
+      th.textContent = c + (g.sort === c ? (g.dir === 'desc' ? ' ▼' : ' ▲') : '');
+      th.addEventListener('click', () => {
+        g.dir = (g.sort === c && g.dir === 'asc') ? 'desc' : 'asc';
+        g.sort = c;
+        g.page = 1;
+        buildHead(g);
+        reload(g);
+      });
+      trh.appendChild(th);
+    });
+    if (hasActions(g)) {
+      const th = makeEl('th', g.style === 'table' ? 'text-end' : '', 'Actions');
+      if (g.style === 'json') th.style.width = '110px';
+      trh.appendChild(th);
+    }
+
+    const trf = makeEl('tr');
+    cols.forEach(c => {
+      const th = makeEl('th', 'p-1');
+      const inp = makeEl('input', 'form-control form-control-sm');
+      inp.type = 'search';
+      inp.placeholder = 'Filter';
+      inp.value = g.filters[c] || '';
+      inp.addEventListener('input', () => {
+        clearTimeout(g.filterTimer);
+        g.filterTimer = setTimeout(() => {
+          g.filters[c] = inp.value.trim();
+          g.page = 1;
+          reload(g);
+        }, 300);
+      });
+      th.appendChild(inp);
+      trf.appendChild(th);
+    });
+    if (hasActions(g)) trf.appendChild(makeEl('th'));
+
+    g.thead.appendChild(trh);
+    g.thead.appendChild(trf);
+  }
+
+  // -------- Shared edit modal (one per page) ----------
+  let modal = null;
+
+  function editModal() {
+    if (modal) return modal;
+    const root = makeEl('div', 'modal fade');
+    root.tabIndex = -1;
+    const dlg = makeEl('div', 'modal-dialog modal-lg modal-dialog-scrollable');
+    const content = makeEl('form', 'modal-content');
+    content.method = 'post';
+
+    const head = makeEl('div', 'modal-header');
+    const title = makeEl('h5', 'modal-title', 'Edit row');
+    const close = makeEl('button', 'btn-close');
+    close.type = 'button';
+    close.setAttribute('data-bs-dismiss', 'modal');
+    head.appendChild(title);
+    head.appendChild(close);
+
+    const body = makeEl('div', 'modal-body');
+
+    const alert = makeEl('div', 'alert d-none mb-2 py-1 small');
+
+    const foot = makeEl('div', 'modal-footer');
+    const cancel = makeEl('button', 'btn btn-sm btn-outline-secondary', 'Cancel');
+    cancel.type = 'button';
+    cancel.setAttribute('data-bs-dismiss', 'modal');
+    foot.appendChild(cancel);
+    const save = makeEl('button', 'btn btn-sm btn-primary', 'Save');
+    foot.appendChild(save);
+
+    content.appendChild(head);
+    content.appendChild(body);
+    content.appendChild(foot);
+    dlg.appendChild(content);
+    root.appendChild(dlg);
+    document.body.appendChild(root);
+
+    modal = { root: root, form: content, title: title, body: body, alert: alert, save: save, onSave: null };
+    // inline (PATCH) save when the grid supports it, plain form post otherwise
+    content.addEventListener('submit', e => {
+      if (modal.onSave) { e.preventDefault(); modal.onSave(); }
+    });
+    return modal;
+  }
+
+  function showAlert(m, kind, text) {
+    m.alert.className = `alert alert-${kind} mb-2 py-1 small`;
+    m.alert.textContent = text;
+  }
+
+  function hideModal(m) {
+    if (window.bootstrap && bootstrap.Modal) bootstrap.Modal.getOrCreateInstance(m.root).hide();
+    else { m.root.style.display = 'none'; m.root.classList.remove('show'); }
+  }
+
+  function refresh(g) {
+    if (g.mode === 'virtual') schedule(g); else renderBody(g, g.rows || []);
+  }
+
+  async function patchRow(g, r, cols) {
+    const m = modal;
+    const fields = {};
+    cols.forEach(c => {
+      const inp = m.form.elements.namedItem(c);
+      if (inp && inp.value !== String(r[c] ?? '')) fields[c] = inp.value;
+    });
+    if (!Object.keys(fields).length) { hideModal(m); return; }
+
+    const rid = r._rid || r.id || r.row_id || '';
+    m.save.disabled = true;
+    try {
+      const resp = await fetch(g.actions.patch.replace('__rid__', encodeURIComponent(rid)), {
+        method: 'PATCH',
+        headers: { 'Content-Type': 'application/json', 'Accept': 'application/json' },
+        body: JSON.stringify({ fields: fields, version: r._v }),
+      });
+      const j = await resp.json();
+      if (resp.status === 409) {
+        Object.assign(r, j.row || {}, { _v: j.version });
+        refresh(g);
+        showAlert(m, 'warning', 'Someone else changed this row. The grid now shows their version; Save again to apply your edits on top of it.');
+        return;
+      }
+      if (!j || j.ok !== true) throw new Error((j && j.error) || 'Save failed');
+      Object.assign(r, j.row);
+      refresh(g);
+      hideModal(m);
+    } catch (e) {
+      console.error(e);
+      showAlert(m, 'danger', 'Could not save: ' + e.message);
+    } finally {
+      m.save.disabled = false;
+    }
+  }
+
+  function openEdit(g, r, cols) {
+    const m = editModal();
+    const rid = r._rid || r.id || r.row_id || '';
+    m.form.action = g.style === 'json'
+      ? g.actions.edit
+      : g.actions.edit.replace('__rid__', encodeURIComponent(rid));
+    m.title.textContent = 'Edit row' + (rid ? ' ' + rid : '');
+    m.body.innerHTML = '';
+    m.alert.className = 'alert d-none';
+    m.body.appendChild(m.alert);
+    m.onSave = (g.actions.patch && r._v) ? () => patchRow(g, r, cols) : null;
+
+    if (g.style === 'json') {
+      const hid = makeEl('input');
+      hid.type = 'hidden';
+      hid.name = 'id';
+      hid.value = r.id ?? '';
+      m.body.appendChild(hid);
+    }
+    cols.forEach(c => {
+      const grp = makeEl('div', 'mb-2');
+      grp.appendChild(makeEl('label', 'form-label form-label-sm mb-0', c));
+      const inp = makeEl('input', 'form-control form-control-sm');
+      inp.type = 'text';
+      inp.name = c;
+      inp.value = r[c] ?? '';
+      grp.appendChild(inp);
+      m.body.appendChild(grp);
+    });
+
+    if (window.bootstrap && bootstrap.Modal) {
+      bootstrap.Modal.getOrCreateInstance(m.root).show();
+    } else {
+      m.root.style.display = 'block';
+      m.root.classList.add('show');
+    }
+  }
+
+  // -------- Row actions ----------
+  function postForm(action, cls, onsubmit) {
+    const f = makeEl('form', cls || '');
+    f.method = 'post';
+    f.action = action;
+    if (onsubmit) f.addEventListener('submit', onsubmit);
+    return f;
+  }
+
+  function rowActions(g, r, cols) {
+    const td = makeEl('td', g.style === 'table' ? 'text-end text-nowrap' : 'text-nowrap');
+    const edit = makeEl('button', g.style === 'json' ? 'btn btn-warning btn-sm' : 'btn btn-sm btn-outline-secondary me-1', 'Edit');
+    edit.type = 'button';
+    edit.addEventListener('click', () => openEdit(g, r, cols));
+    td.appendChild(edit);
+
+    if (g.style === 'table' && g.actions.delete) {
+      const rid = encodeURIComponent(r._rid || r.id || r.row_id || '');
+      const del = postForm(g.actions.delete.replace('__rid__', rid), 'd-inline', e => {
+        if (!confirm('Delete this row?')) e.preventDefault();
+      });
+      del.appendChild(makeEl('button', 'btn btn-sm btn-outline-danger', 'Delete'));
+      td.appendChild(del);
+    }
+    return td;
+  }
+
+  function rowEl(g, r, cols) {
+    const tr = makeEl('tr');
+    cols.forEach(c => {
+      const td = makeEl('td', '', r[c] ?? '');
+      td.dataset.k = c;
+      tr.appendChild(td);
+    });
+    if (hasActions(g)) tr.appendChild(rowActions(g, r, cols));
+    return tr;
+  }
+
+  function messageRow(g, text) {
+    const tr = makeEl('tr');
+    const td = makeEl('td', 'text-muted text-center', text);
+    td.colSpan = colCount(g);
+    tr.appendChild(td);
+    return tr;
+  }
+
+  // -------- paged mode: body + pager ----------
+  function renderBody(g, rows) {
+    const cols = visibleCols(g);
+    const frag = document.createDocumentFragment();
+    if (!rows.length) frag.appendChild(messageRow(g, 'No rows yet.'));
+    rows.forEach(r => frag.appendChild(rowEl(g, r, cols)));
+    g.tbody.replaceChildren(frag);
+  }
+
+  function renderPager(g) {
+    const pages = Math.max(1, Math.ceil(g.total / g.perPage));
+    const first = g.total ? (g.page - 1) * g.perPage + 1 : 0;
+    const last = Math.min(g.total, g.page * g.perPage);
+    g.pager.innerHTML = '';
+
+    g.pager.appendChild(makeEl('span', 'small text-muted me-auto', `Rows ${first}–${last} of ${g.total}`));
+
+    const size = makeEl('select', 'form-select form-select-sm w-auto');
+    PER_PAGE_CHOICES.forEach(n => {
+      const o = makeEl('option', '', `${n} / page`);
+      o.value = n;
+      o.selected = (n === g.perPage);
+      size.appendChild(o);
+    });
+    size.addEventListener('change', () => { g.perPage = parseInt(size.value, 10); g.page = 1; load(g); });
+    g.pager.appendChild(size);
+
+    const prev = makeEl('button', 'btn btn-sm btn-outline-secondary', '‹ Prev');
+    prev.type = 'button';
+    prev.disabled = g.page <= 1;
+    prev.addEventListener('click', () => { g.page -= 1; load(g); });
+    const next = makeEl('button', 'btn btn-sm btn-outline-secondary', 'Next ›');
+    next.type = 'button';
+    next.disabled = g.page >= pages;
+    next.addEventListener('click', () => { g.page += 1; load(g); });
+
+    g.pager.appendChild(prev);
+    g.pager.appendChild(makeEl('span', 'small', `${g.page} / ${pages}`));
+    g.pager.appendChild(next);
+  }
+
+  async function load(g) {
+    if (!g.src) { renderBody(g, []); return; }
+    const u = gridURL(g);
+    u.searchParams.set('page', g.page);
+    u.searchParams.set('per_page', g.perPage);
+
+    const seq = ++g.seq;
+    g.el.classList.add('opacity-50');
+    try {
+      const r = await fetch(u, { headers: { 'Accept': 'application/json' } });
+      const j = await r.json();
+      if (seq !== g.seq) return;               // a newer request superseded this one
+      if (!j || j.ok !== true) throw new Error((j && j.error) || 'Load failed');
+
+      adoptColumns(g, j.columns);
+      g.total = j.total || 0;
+      g.rows = j.rows || [];
+      renderBody(g, g.rows);
+      renderPager(g);
+    } catch (e) {
+      if (seq !== g.seq) return;
+      console.error(e);
+      g.pager.textContent = 'Could not load rows: ' + e.message;
+    } finally {
+      if (seq === g.seq) g.el.classList.remove('opacity-50');
+    }
+  }
+
+  // -------- virtual mode ----------
+  function spacer(g, px) {
+    const tr = makeEl('tr');
+    tr.setAttribute('aria-hidden', 'true');
+    const td = makeEl('td');
+    td.colSpan = colCount(g);
+    td.style.cssText = `height:${px}px;padding:0;border:0`;
+    tr.appendChild(td);
+    return tr;
+  }
+
+  function visibleRange(g) {
+    const vp = g.viewport;
+    const first = Math.max(0, Math.floor(vp.scrollTop / g.rowH) - OVERSCAN);
+    const count = Math.ceil(vp.clientHeight / g.rowH) + 2 * OVERSCAN;
+    return [first, Math.min(g.total, first + count)];
+  }
+
+  function renderWindow(g) {
+    g.frame = 0;
+    const cols = visibleCols(g);
+    const frag = document.createDocumentFragment();
+
+    if (g.loaded && !g.total) {
+      frag.appendChild(messageRow(g, 'No rows yet.'));
+      g.tbody.replaceChildren(frag);
+      g.pager.firstChild.textContent = '0 rows';
+      return;
+    }
+
+    const [first, last] = visibleRange(g);
+    for (let b = Math.floor(first / BLOCK); b * BLOCK < last; b++) fetchBlock(g, b);
+
+    if (first) frag.appendChild(spacer(g, first * g.rowH));
+    for (let i = first; i < last; i++) {
+      const block = g.blocks.get(Math.floor(i / BLOCK));
+      const r = block && block[i % BLOCK];
+      if (r) {
+        frag.appendChild(rowEl(g, r, cols));
+      } else {
+        const tr = messageRow(g, '…');
+        tr.style.height = g.rowH + 'px';
+        frag.appendChild(tr);
+      }
+    }
+    if (g.total > last) frag.appendChild(spacer(g, (g.total - last) * g.rowH));
+    g.tbody.replaceChildren(frag);
+
+    g.pager.firstChild.textContent = g.total
+      ? `Rows ${first + 1}–${last} of ${g.total}`
+      : (g.loaded ? '0 rows' : 'Loading…');
+
+    // Re-measure once real rows are on screen; spacers depend on it
+    if (!g.measured) {
+      const td = g.tbody.querySelector('td[data-k]');
+      const h = td ? Math.round(td.parentNode.getBoundingClientRect().height) : 0;
+      if (h) {                                 // 0 while the tab is still hidden
+        g.measured = true;
+        if (Math.abs(h - g.rowH) > 1) { g.rowH = h; schedule(g); }
+      }
+    }
+  }
+
+  function schedule(g) {
+    if (!g.frame) g.frame = requestAnimationFrame(() => renderWindow(g));
+  }
+
+  function evictBlocks(g) {
+    if (g.blocks.size <= MAX_BLOCKS) return;
+    const centre = Math.floor(g.viewport.scrollTop / g.rowH / BLOCK);
+    const keys = Array.from(g.blocks.keys())
+      .sort((a, b) => Math.abs(b - centre) - Math.abs(a - centre));
+    keys.slice(0, g.blocks.size - MAX_BLOCKS).forEach(k => g.blocks.delete(k));
+  }
+
+  async function fetchBlock(g, b) {
+    if (!g.src || g.blocks.has(b) || g.pending.has(b)) return;
+    g.pending.add(b);
+    const gen = g.gen;
+    const u = gridURL(g, '/range');
+    u.searchParams.set('start', b * BLOCK);
+    u.searchParams.set('end', (b + 1) * BLOCK);
+
+    try {
+      const r = await fetch(u, { headers: { 'Accept': 'application/json' } });
+      const j = await r.json();
+      if (gen !== g.gen) return;               // sort/filter changed meanwhile
+      if (!j || j.ok !== true) throw new Error((j && j.error) || 'Load failed');
+
+      adoptColumns(g, j.columns);
+      g.total = j.total || 0;
+      g.loaded = true;
+      g.blocks.set(b, j.rows || []);
+      evictBlocks(g);
+      g.el.classList.remove('opacity-50');
+      schedule(g);
+    } catch (e) {
+      if (gen !== g.gen) return;
+      console.error(e);
+      g.el.classList.remove('opacity-50');
+      g.pager.firstChild.textContent = 'Could not load rows: ' + e.message;
+    } finally {
+      if (gen === g.gen) g.pending.delete(b);
+    }
+  }
+
+  function resetVirtual(g) {
+    g.gen += 1;
+    g.blocks = new Map();
+    g.pending = new Set();
+    g.total = 0;
+    g.loaded = false;
+    g.viewport.scrollTop = 0;
+    if (!g.src) { g.loaded = true; renderWindow(g); return; }
+    g.el.classList.add('opacity-50');
+    fetchBlock(g, 0);
+    renderWindow(g);
+  }
+
+  // -------- Public ----------
+  function mount(el) {
+    if (!el || el.dataset.mounted === '1') return;
+    el.dataset.mounted = '1';
+
+    const g = {
+      el: el,
+      src: el.dataset.gridSrc || '',
+      columns: parseJSON(el.dataset.columns, []),
+      hide: parseJSON(el.dataset.hide, ['id']),
+      style: el.dataset.style || 'json',
+      actions: parseJSON(el.dataset.actions, {}),
+      mode: el.dataset.mode === 'virtual' ? 'virtual' : 'paged',
+      page: 1,
+      perPage: parseInt(el.dataset.perPage || '50', 10),
+      sort: '',
+      dir: 'asc',
+      filters: {},
+      total: 0,
+      seq: 0,
+      // virtual mode
+      gen: 0,
+      rowH: ROW_H,
+      measured: false,
+      frame: 0,
+    };
+
+    const wrap = makeEl('div', 'table-responsive');
+    const tbl = makeEl('table', el.dataset.tableClass || 'table table-sm');
+    g.thead = makeEl('thead', 'table-light');
+    g.tbody = makeEl('tbody');
+    tbl.appendChild(g.thead);
+    tbl.appendChild(g.tbody);
+    wrap.appendChild(tbl);
+    g.pager = makeEl('div', 'd-flex align-items-center gap-2 px-2 py-1 border-top');
+
+    el.replaceChildren(wrap, g.pager);
+    buildHead(g);
+
+    if (g.mode === 'virtual') {
+      g.viewport = wrap;
+      wrap.classList.add('pqp-grid-virtual');
+      wrap.style.maxHeight = el.dataset.height || '60vh';
+      wrap.style.overflowY = 'auto';
+      g.pager.appendChild(makeEl('span', 'small text-muted me-auto', 'Loading…'));
+      wrap.addEventListener('scroll', () => schedule(g), { passive: true });
+      // also fires when a hidden tab is first shown and the viewport gets a size
+      if (window.ResizeObserver) new ResizeObserver(() => schedule(g)).observe(wrap);
+      else window.addEventListener('resize', () => schedule(g));
+      resetVirtual(g);
+    } else {
+      load(g);
+    }
+  }
+
+  // Build + mount a grid element from a plain config (used by lazily loaded tabs)
+  function create(cfg) {
+    const el = makeEl('div', 'pqp-grid');
+    el.dataset.gridSrc = cfg.src || '';
+    el.dataset.columns = JSON.stringify(cfg.columns || []);
+    el.dataset.hide = JSON.stringify(cfg.hide || ['id']);
+    el.dataset.style = cfg.style || 'json';
+    el.dataset.actions = JSON.stringify(cfg.actions || {});
+    if (cfg.mode) el.dataset.mode = cfg.mode;
+    if (cfg.tableClass) el.dataset.tableClass = cfg.tableClass;
+    mount(el);
+    return el;
+  }
+
+  function mountAll(root) {
+    (root || document).querySelectorAll('.pqp-grid').forEach(mount);
+  }
+
+  document.addEventListener('DOMContentLoaded', () => mountAll());
+
+  window.PQPGrid = { mount: mount, mountAll: mountAll, create: create };
+})();
@@ -0,0 +1,141 @@
+# app/warmup.py
+"""
+Worker warm-up: pay the first-request costs at boot instead.
+
+Without it the first user on each fresh worker waits for ProjectRecords
+reflection, the information_schema scans of every section table, Jinja
+compiling the form templates and (for imports) pandas/openpyxl imports.
+warm_up() runs those steps at the end of create_app() and logs each one's
+time on the "app.warmup" logger:
+
+  reflect         ProjectRecords into the routes' MetaData
+  schema          columns + primary key of every section / risk table (grid_data cache)
+  org_id          the SaaS org_id column probe (has_org_id)
+  project_codes   known-code index used by import code detection
+  header_maps     HeaderMatcher per section (AI import column matching)
+  templates       compile every template into the Jinja cache
+  heavy_imports   pandas, openpyxl (only with PQP_WARMUP_IMPORTS=1)
+
+A failing step is logged and skipped; warm-up never stops the app booting.
+
+    PQP_WARMUP=1            run it (gunicorn.conf.py sets this; off for scripts/flask run)
+    PQP_WARMUP_IMPORTS=1    also import pandas and openpyxl up front
+
+With `gunicorn --preload` create_app() (and so the warm-up) runs once in the
+master and the workers inherit the result. The master's pooled connections
+must not be shared across the fork, so gunicorn.conf.py calls after_fork()
+in post_fork, which drops them without closing the parent's sockets.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import time
+
+log = logging.getLogger("app.warmup")
+
+ENABLED = os.getenv("PQP_WARMUP", "0") in ("1", "true", "yes")
+HEAVY_IMPORTS = os.getenv("PQP_WARMUP_IMPORTS", "0") in ("1", "true", "yes")
+
+_engines = []
+
+
+def _reflect():
+    from app.extensions import db
+    from app.pqp.pqp_routes import _projectrecords
+    return f"{len(_projectrecords(db.engine).c)} columns"
+
+
+def _schema():
+    from app.extensions import db
+    from app.pqp.grid_data import table_columns, table_pk
+    from app.pqp.registry import SECTION_META, SECTION_TABLE, SUB_TABLE_MAP
+    tables = {t for t in SECTION_TABLE.values() if t}
+    tables |= {f"pqp.{t}" for t in SUB_TABLE_MAP.values()}
+    tables |= {t for meta in SECTION_META.values() for t in meta["tables"]}
+    found = 0
+    with db.engine.connect() as conn:
+        for tq in sorted(tables):
+            cols = table_columns(conn, tq)
+            if cols:
+                table_pk(conn, tq, cols)
+                found += 1
+    return f"{found}/{len(tables)} tables"
+
+
+def _org_id():
+    from app import has_org_id
+    return "present" if has_org_id() else "absent"
+
+
+def _project_codes():
+    from app.pqp.pqp_routes import _known_project_codes
+    return f"{len(_known_project_codes())} codes"
+
+
+def _header_maps():
+    from app.pqp.ingest.header_map import HeaderMatcher
+    from app.pqp.sections import SECTION_DEFS
+    for idx in range(1, len(SECTION_DEFS) + 1):
+        HeaderMatcher.for_section(idx)
+    return f"{len(SECTION_DEFS)} sections"
+
+
+def _templates(app):
+    env = app.jinja_env
+    names = [n for n in env.list_templates() if n.endswith((".html", ".txt", ".csv"))]
+    failed = 0
+    for name in names:
+        try:
+            env.get_template(name)
+        except Exception:
+            failed += 1
+            log.debug("template %s did not compile", name, exc_info=True)
+    return f"{len(names) - failed} compiled" + (f", {failed} failed" if failed else "")
+
+
+def _heavy_imports():
+    import openpyxl  # noqa: F401
+    import pandas  # noqa: F401
+    return "pandas, openpyxl"
+
+
+def warm_up(app) -> dict:
+    """Run every step inside an app context; returns {step: ms}."""
+    from app.extensions import db
+
+    steps = [("reflect", _reflect), ("schema", _schema), ("org_id", _org_id),
+             ("project_codes", _project_codes), ("header_maps", _header_maps),
+             ("templates", lambda: _templates(app))]
+    if HEAVY_IMPORTS:
+        steps.append(("heavy_imports", _heavy_imports))
+
+    timings = {}
+    t_all = time.perf_counter()
+    with app.app_context():
+        for name, step in steps:
+            t0 = time.perf_counter()
+            try:
+                detail = step()
+            except Exception as e:
+                detail = f"failed: {e.__class__.__name__}: {e}"
+                db.session.rollback()
+            timings[name] = round((time.perf_counter() - t0) * 1000, 1)
+            log.info("warm-up %-14s %8.1f ms  %s", name, timings[name], detail)
+        db.session.remove()
+    timings["total"] = round((time.perf_counter() - t_all) * 1000, 1)
+    log.info("warm-up done in %.1f ms (pid %s)", timings["total"], os.getpid())
+    return timings
+
+
+def init_warmup(app, engine) -> None:
+    """Remember the engine for after_fork(); warm up when PQP_WARMUP=1."""
+    _engines.append(engine)
+    if ENABLED:
+        warm_up(app)
+
+
+def after_fork() -> None:
+    """In a forked worker: forget the parent's pooled connections (keep its sockets open)."""
+    for engine in _engines:
+        engine.dispose(close=False)
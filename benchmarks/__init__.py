@@ -0,0 +1,13 @@
+"""
+Benchmarks against a local Postgres loaded with a synthetic portfolio.
+
+    python -m benchmarks.generate --projects 10000          # BENCH-00001 ... rows everywhere
+    python -m benchmarks.run --json before.json             # all benchmarks
+    python -m benchmarks.run --only form,zip_export --compare before.json
+    python -m benchmarks.loadtest --users 50 --think 1      # HTTP journeys vs a running server
+    python -m benchmarks.importtime --json startup.json     # -X importtime + create_app() time
+    python -m benchmarks.generate --drop                    # remove the BENCH-* data
+
+generate and run read DATABASE_URL (.env) like the app. Never point them at production:
+generate writes tens of thousands of rows per 1k projects.
+"""
@@ -0,0 +1,219 @@
+"""
+Synthetic portfolio generator.
+
+Creates N projects with code BENCH-00001.. in every table the PQP form reads:
+  public."ProjectRecords"           one row per project
+  pqp.pqp_sections                  sections 1..9, rows_json with SECTION_DEFS columns
+  pqp.section1..9, section31..92    the physical section tables that exist here
+  pqp.section101, risk_*            risk register and risk checklists
+
+Physical tables are reflected, so values are generated per column type and
+the project column is found by name (project_code, then a text "id"). Row
+counts per table are drawn from a skewed distribution (most projects small,
+a few large) with --rows as the mean. --seed makes runs repeatable.
+
+    python -m benchmarks.generate --projects 10000 --rows 8
+    python -m benchmarks.generate --drop
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import MetaData, Table, delete, insert, inspect
+from sqlalchemy import types as sat
+
+CODE_PREFIX = "BENCH-"
+BATCH = 2000
+
+WORDS = ("road drainage bridge culvert survey design tender contract approval site client "
+         "engineer planner review milestone deliverable handover risk mitigation budget "
+         "inspection stormwater pavement retaining wall concrete steel municipal provincial").split()
+STATUSES = ("Active", "Active", "Active", "Closed", "On Hold")
+RISK_TABLES = ("section101", "risk_concept", "risk_docs", "risk_works", "risk_register")
+
+
+def bench_code(i: int) -> str:
+    return f"{CODE_PREFIX}{i:05d}"
+
+
+def _words(rng, lo=2, hi=8) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(lo, hi))).capitalize()
+
+
+def _row_count(rng, mean: int) -> int:
+    # geometric-ish: many small sections, a long tail of big ones
+    return min(int(rng.expovariate(1 / max(mean, 1))), mean * 10)
+
+
+def _value(rng, col):
+    t = col.type
+    if isinstance(t, sat.Boolean):
+        return rng.random() < 0.5
+    if isinstance(t, (sat.Date,)):
+        return date(2020, 1, 1) + timedelta(days=rng.randint(0, 2500))
+    if isinstance(t, (sat.DateTime,)):
+        return datetime(2020, 1, 1) + timedelta(minutes=rng.randint(0, 3_600_000))
+    if isinstance(t, (sat.Integer, sat.BigInteger, sat.SmallInteger)):
+        return rng.randint(0, 1000)
+    if isinstance(t, (sat.Numeric, sat.Float)):
+        return round(rng.uniform(1_000, 5_000_000), 2)
+    if isinstance(t, sat.JSON) or t.__class__.__name__ in ("JSONB", "JSON"):
+        return {}
+    if isinstance(t, sat.String) and getattr(t, "length", None):
+        return _words(rng, 1, 3)[: t.length]
+    return _words(rng)
+
+
+def _project_column(table: Table):
+    for name in ("project_code", "Code"):
+        if name in table.c:
+            return table.c[name]
+    if "id" in table.c and isinstance(table.c["id"].type, sat.String):
+        return table.c["id"]
+    return None
+
+
+def _fillable(table: Table, code_col):
+    """Columns to generate: not the project column, not serial/identity primary keys."""
+    out = []
+    for c in table.c:
+        if c is code_col:
+            continue
+        if c.primary_key and isinstance(c.type, (sat.Integer, sat.BigInteger)):
+            continue
+        if c.server_default is not None and c.nullable:
+            continue
+        out.append(c)
+    return out
+
+
+def _reflect(engine, schema: str, names):
+    insp = inspect(engine)
+    have = set(insp.get_table_names(schema=schema))
+    md = MetaData()
+    return [Table(n, md, schema=schema, autoload_with=engine) for n in names if n in have]
+
+
+def physical_tables(engine):
+    from app.pqp.registry import SECTION_TABLE, SUB_TABLE_MAP
+    names = {t.split(".")[-1] for t in SECTION_TABLE.values() if t}
+    names |= set(SUB_TABLE_MAP.values()) | set(RISK_TABLES)
+    return [t for t in _reflect(engine, "pqp", sorted(names)) if _project_column(t) is not None]
+
+
+def _flush(conn, table, batch):
+    if batch:
+        conn.execute(insert(table), batch)
+        batch.clear()
+
+
+def generate(engine, n_projects: int, mean_rows: int, seed: int, start: int = 1) -> dict:
+    from app.pqp.pqp_routes import PR_SCHEMA, PR_TABLE
+    from app.pqp.sections import DEFAULT_SECTION_TITLES, SECTION_DEFS
+    from app.pqp.row_ids import new_row_ids
+
+    rng = random.Random(seed)
+    counts = {}
+    codes = [bench_code(i) for i in range(start, start + n_projects)]
+
+    pr = _reflect(engine, PR_SCHEMA, [PR_TABLE])
+    sections = _reflect(engine, "pqp", ["pqp_sections"])
+    phys = physical_tables(engine)
+
+    with engine.begin() as conn:
+        if pr:
+            t = pr[0]
+            code_col = _project_column(t)
+            cols = _fillable(t, code_col)
+            batch = []
+            for code in codes:
+                row = {c.name: _value(rng, c) for c in cols}
+                row[code_col.name] = code
+                for name, val in (("Status", rng.choice(STATUSES)), ("Short Description", _words(rng, 3, 6)),
+                                  ("Client", f"{_words(rng, 1, 2)} Municipality")):
+                    if name in t.c:
+                        row[name] = val
+                batch.append(row)
+                if len(batch) >= BATCH:
+                    _flush(conn, t, batch)
+            _flush(conn, t, batch)
+            counts[PR_TABLE] = len(codes)
+
+        if sections:
+            t = sections[0]
+            batch, n = [], 0
+            for code in codes:
+                for idx, cols in enumerate(SECTION_DEFS, start=1):
+                    k = _row_count(rng, mean_rows)
+                    ids = new_row_ids(k)
+                    rows = [{c: (ids[j] if c == "id" else _words(rng, 1, 5)) for c in cols} for j in range(k)]
+                    batch.append({"project_code": code, "section_number": idx,
+                                  "title": DEFAULT_SECTION_TITLES.get(idx, f"Section {idx}"),
+                                  "rows_json": json.dumps(rows), "completed": rng.random() < 0.3})
+                    n += 1
+                    if len(batch) >= BATCH // 4:
+                        _flush(conn, t, batch)
+            _flush(conn, t, batch)
+            counts["pqp_sections"] = n
+
+        for t in phys:
+            code_col = _project_column(t)
+            cols = _fillable(t, code_col)
+            batch, n = [], 0
+            for code in codes:
+                for _ in range(_row_count(rng, mean_rows)):
+                    row = {c.name: _value(rng, c) for c in cols}
+                    row[code_col.name] = code
+                    batch.append(row)
+                    n += 1
+                    if len(batch) >= BATCH:
+                        _flush(conn, t, batch)
+            _flush(conn, t, batch)
+            counts[t.name] = n
+    return counts
+
+
+def drop(engine) -> dict:
+    from app.pqp.pqp_routes import PR_SCHEMA, PR_TABLE
+    counts = {}
+    tables = _reflect(engine, PR_SCHEMA, [PR_TABLE]) + _reflect(engine, "pqp", ["pqp_sections"]) \
+        + physical_tables(engine)
+    with engine.begin() as conn:
+        for t in tables:
+            col = _project_column(t)
+            if col is not None:
+                counts[t.name] = conn.execute(delete(t).where(col.like(f"{CODE_PREFIX}%"))).rowcount
+    return counts
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--projects", type=int, default=1000)
+    ap.add_argument("--rows", type=int, default=8, help="mean rows per section/table")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--start", type=int, default=1, help="first project number (to append)")
+    ap.add_argument("--drop", action="store_true", help="delete all BENCH-* rows and exit")
+    args = ap.parse_args(argv)
+
+    from dotenv import load_dotenv
+    from app import create_app, db
+    load_dotenv()
+    app = create_app()
+    with app.app_context():
+        t0 = time.perf_counter()
+        if args.drop:
+            counts = drop(db.engine)
+        else:
+            counts = generate(db.engine, args.projects, args.rows, args.seed, args.start)
+        for name, n in counts.items():
+            print(f"{name:24s} {n:>10,d}")
+        print(f"{'drop' if args.drop else 'generate'} took {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
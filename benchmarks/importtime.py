@@ -0,0 +1,121 @@
+"""
+Startup cost: `python -X importtime` over importing the app and create_app().
+
+Runs a fresh interpreter (so nothing is already in sys.modules) that imports
+`app`, calls create_app() and exits, with warm-up off unless --warmup. The
+stderr importtime lines are parsed into per-module self / cumulative times.
+
+    python -m benchmarks.importtime                     # top 25 by cumulative time
+    python -m benchmarks.importtime --top 40 --json startup.json
+    python -m benchmarks.importtime --compare startup.json --runs 5
+
+Reported: wall time of the child (median of --runs), total import time,
+create_app() time, the heaviest top-level packages (first dotted component,
+self times summed) and the heaviest single imports by cumulative time.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+CHILD = """
+import time
+t0 = time.perf_counter()
+import app
+t1 = time.perf_counter()
+app.create_app()
+t2 = time.perf_counter()
+print("BOOT", (t1 - t0) * 1000, (t2 - t1) * 1000)
+"""
+
+
+def parse_importtime(stderr: str):
+    """[(module, self_us, cumulative_us, depth)] from -X importtime output."""
+    out = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, cum_us, name = line[len("import time:"):].split("|", 2)
+        except ValueError:
+            continue
+        depth = (len(name) - len(name.lstrip(" "))) // 2
+        out.append((name.strip(), int(self_us), int(cum_us), depth))
+    return out
+
+
+def run_child(warmup: bool) -> dict:
+    env = dict(os.environ, PQP_WARMUP="1" if warmup else "0")
+    t0 = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", CHILD], env=env,
+                          capture_output=True, text=True,
+                          cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    wall = (time.perf_counter() - t0) * 1000
+    boot = [ln for ln in proc.stdout.splitlines() if ln.startswith("BOOT ")]
+    if proc.returncode != 0 or not boot:
+        tail = "\n".join(ln for ln in proc.stderr.splitlines() if not ln.startswith("import time:"))
+        raise SystemExit(f"child failed (exit {proc.returncode}):\n{tail[-2000:]}")
+    _, import_ms, create_ms = boot[0].split()
+    return {"wall_ms": wall, "import_ms": float(import_ms), "create_app_ms": float(create_ms),
+            "modules": parse_importtime(proc.stderr)}
+
+
+def summarize(modules, top: int) -> dict:
+    by_package = defaultdict(int)
+    for name, self_us, _cum, _depth in modules:
+        by_package[name.split(".")[0]] += self_us
+    heaviest = sorted(modules, key=lambda m: m[2], reverse=True)[:top]
+    return {
+        "modules": len(modules),
+        "packages": dict(sorted(by_package.items(), key=lambda kv: kv[1], reverse=True)[:top]),
+        "top_cumulative": [{"module": n, "self_us": s, "cumulative_us": c} for n, s, c, _ in heaviest],
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--runs", type=int, default=3, help="child runs; the median is reported")
+    ap.add_argument("--top", type=int, default=25)
+    ap.add_argument("--warmup", action="store_true", help="include the PQP_WARMUP steps in create_app")
+    ap.add_argument("--json", help="write results to this file")
+    ap.add_argument("--compare", help="earlier --json results to diff against")
+    args = ap.parse_args(argv)
+
+    runs = [run_child(args.warmup) for _ in range(max(args.runs, 1))]
+    med = {k: statistics.median(r[k] for r in runs) for k in ("wall_ms", "import_ms", "create_app_ms")}
+    # module table from the run closest to the median wall time
+    rep = min(runs, key=lambda r: abs(r["wall_ms"] - med["wall_ms"]))
+    summary = summarize(rep["modules"], args.top)
+    base = {}
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as fh:
+            base = json.load(fh)
+
+    def delta(key):
+        b = base.get(key)
+        return f"  ({(med[key] / b - 1) * 100:+.1f}% vs {b:.0f})" if b else ""
+
+    print(f"process wall    {med['wall_ms']:8.0f} ms{delta('wall_ms')}")
+    print(f"import app      {med['import_ms']:8.0f} ms{delta('import_ms')}")
+    print(f"create_app()    {med['create_app_ms']:8.0f} ms{delta('create_app_ms')}")
+    print(f"modules loaded  {summary['modules']:8d}\n")
+    print(f"{'package (self time)':40s} {'ms':>8s}")
+    for pkg, us in summary["packages"].items():
+        print(f"{pkg:40s} {us / 1000:8.1f}")
+    print(f"\n{'import (cumulative)':56s} {'self ms':>8s} {'cum ms':>8s}")
+    for m in summary["top_cumulative"]:
+        print(f"{m['module'][:56]:56s} {m['self_us'] / 1000:8.1f} {m['cumulative_us'] / 1000:8.1f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump({**med, "python": sys.version.split()[0], "warmup": args.warmup, **summary}, fh, indent=2)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
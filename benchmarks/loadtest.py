@@ -0,0 +1,333 @@
+"""
+HTTP load test for the main user journeys, against a running server.
+
+Each virtual user is an asyncio task with its own keep-alive connection. It
+picks a journey by weight from the profile, runs it, then sleeps a think
+time drawn from an exponential distribution around --think seconds. Users
+start evenly over --ramp seconds and stop after --duration.
+
+  search        GET  /pqp/form?code=<prefix>               selector filter
+  form          GET  /pqp/form/code/<code>                 open a project form
+  save          POST /pqp/pqp/<code>/section/<i>/save      add one row (JSON reply)
+  import        POST /pqp/pqp/import/<code>/<i>/preview    then .../commit, 20-row CSV
+  export        GET  /pqp/pqp/<code>/export/zip-csv
+
+Profiles (journey weights):
+  browse    search 5, form 5
+  edit      form 4, save 6
+  import    form 2, import 8
+  mixed     search 3, form 4, save 2, import 0.5, export 0.5   (default)
+
+    gunicorn -c gunicorn.conf.py --workers 2 --threads 4 "app:create_app()"   # as render.yaml
+    python -m benchmarks.loadtest --users 50 --think 1 --duration 120
+    python -m benchmarks.loadtest --profile import --users 10 --json import.json
+
+Projects are BENCH-00001.. (--projects should match benchmarks.generate);
+save and import write real rows into them. A 503 with Retry-After (section
+lock busy) is reported as "busy", separately from errors. Pure standard
+library: no locust/aiohttp needed on the load-generating machine.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import csv
+import io
+import json
+import random
+import statistics
+import sys
+import time
+import uuid
+from collections import defaultdict
+from urllib.parse import urlencode, urlsplit
+
+PROFILES = {
+    "browse": {"search": 5, "form": 5},
+    "edit": {"form": 4, "save": 6},
+    "import": {"form": 2, "import": 8},
+    "mixed": {"search": 3, "form": 4, "save": 2, "import": 0.5, "export": 0.5},
+}
+CODE_PREFIX = "BENCH-"
+SECTION = 1            # zero-based: Project Team (many columns, typical rows)
+IMPORT_ROWS = 20
+
+
+class HttpError(Exception):
+    pass
+
+
+# -------------------------- minimal HTTP/1.1 client --------------------------
+
+class Connection:
+    """One keep-alive HTTP/1.1 connection; reconnects when the server closes it."""
+
+    def __init__(self, host: str, port: int, timeout: float):
+        self.host, self.port, self.timeout = host, port, timeout
+        self.reader = self.writer = None
+
+    async def _open(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except OSError:
+                pass
+        self.reader = self.writer = None
+
+    async def request(self, method: str, path: str, body: bytes = b"", headers=None):
+        for attempt in (0, 1):                   # retry once on a stale keep-alive socket
+            if self.writer is None:
+                await self._open()
+            try:
+                return await asyncio.wait_for(self._roundtrip(method, path, body, headers or {}),
+                                              self.timeout)
+            except (ConnectionError, asyncio.IncompleteReadError) as e:
+                await self.close()
+                if attempt:
+                    raise HttpError(f"connection: {e}") from e
+            except asyncio.TimeoutError as e:
+                await self.close()
+                raise HttpError("timeout") from e
+
+    async def _roundtrip(self, method, path, body, headers):
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {self.host}:{self.port}",
+                 f"Content-Length: {len(body)}", "Connection: keep-alive"]
+        lines += [f"{k}: {v}" for k, v in headers.items()]
+        self.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+        await self.writer.drain()
+
+        status_line = await self.reader.readuntil(b"\r\n")
+        if not status_line:
+            raise ConnectionError("closed")
+        status = int(status_line.split()[1])
+        resp_headers = {}
+        while True:
+            line = await self.reader.readuntil(b"\r\n")
+            if line == b"\r\n":
+                break
+            k, _, v = line.decode("latin-1").partition(":")
+            resp_headers[k.strip().lower()] = v.strip()
+
+        if resp_headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await self.reader.readuntil(b"\r\n")).split(b";")[0], 16)
+                if size == 0:
+                    await self.reader.readuntil(b"\r\n")
+                    break
+                chunks.append(await self.reader.readexactly(size))
+                await self.reader.readexactly(2)
+            data = b"".join(chunks)
+        elif "content-length" in resp_headers:
+            data = await self.reader.readexactly(int(resp_headers["content-length"]))
+        else:
+            data = await self.reader.read()
+            await self.close()
+        if resp_headers.get("connection", "").lower() == "close":
+            await self.close()
+        return status, resp_headers, data
+
+
+def multipart(fields: dict, filename: str, content: bytes):
+    boundary = uuid.uuid4().hex
+    parts = [f"--{boundary}\r\nContent-Disposition: form-data; name=\"{k}\"\r\n\r\n{v}\r\n".encode()
+             for k, v in fields.items()]
+    parts.append(f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"{filename}\"\r\n"
+                 f"Content-Type: text/csv\r\n\r\n".encode() + content + b"\r\n")
+    parts.append(f"--{boundary}--\r\n".encode())
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+# -------------------------- journeys --------------------------
+
+class Stats:
+    def __init__(self):
+        self.lat = defaultdict(list)             # name -> [ms] (successful)
+        self.errors = defaultdict(int)
+        self.busy = defaultdict(int)
+        self.codes = defaultdict(lambda: defaultdict(int))
+
+    def record(self, name, ms, status=None, error=None):
+        if error is not None:
+            self.errors[name] += 1
+            self.codes[name][error[:40]] += 1
+            return
+        self.codes[name][status] += 1
+        if status == 503:
+            self.busy[name] += 1
+        elif status >= 400:
+            self.errors[name] += 1
+        else:
+            self.lat[name].append(ms)
+
+
+class User:
+    def __init__(self, uid, conn: Connection, stats: Stats, args, columns, rng):
+        self.uid, self.conn, self.stats, self.args = uid, conn, stats, args
+        self.columns, self.rng = columns, rng
+
+    def _code(self):
+        return f"{CODE_PREFIX}{self.rng.randint(1, self.args.projects):05d}"
+
+    async def _timed(self, name, method, path, body=b"", headers=None, ok=None):
+        t0 = time.perf_counter()
+        try:
+            status, hdrs, data = await self.conn.request(method, path, body, headers)
+        except HttpError as e:
+            self.stats.record(name, 0, error=str(e))
+            return None
+        ms = (time.perf_counter() - t0) * 1000
+        if ok is not None and status < 400 and not ok(data):
+            status = 599                          # 200 with {"ok": false}
+        self.stats.record(name, ms, status)
+        return status, data
+
+    async def search(self):
+        prefix = f"{CODE_PREFIX}{self.rng.randint(0, self.args.projects // 100):03d}"
+        await self._timed("search", "GET", "/pqp/form?" + urlencode({"code": prefix}))
+
+    async def form(self):
+        await self._timed("form", "GET", f"/pqp/form/code/{self._code()}")
+
+    async def save(self):
+        fields = {c: f"load u{self.uid} {uuid.uuid4().hex[:8]}" for c in self.columns if c != "id"}
+        await self._timed("save", "POST", f"/pqp/pqp/{self._code()}/section/{SECTION}/save",
+                          urlencode(fields).encode(),
+                          {"Content-Type": "application/x-www-form-urlencoded",
+                           "Accept": "application/json"},
+                          ok=_json_ok)
+
+    async def import_(self):
+        code = self._code()
+        buf = io.StringIO(newline="")
+        w = csv.writer(buf)
+        w.writerow(self.columns)
+        tag = uuid.uuid4().hex[:8]
+        for i in range(IMPORT_ROWS):
+            w.writerow(["" if c == "id" else f"import {tag} {i}" for c in self.columns])
+        content = buf.getvalue().encode()
+        for step in ("preview", "commit"):
+            body, ctype = multipart({}, f"load-{tag}.csv", content)
+            r = await self._timed(f"import_{step}", "POST", f"/pqp/pqp/import/{code}/{SECTION}/{step}",
+                                  body, {"Content-Type": ctype, "Accept": "application/json"}, ok=_json_ok)
+            if r is None or r[0] >= 400:
+                return
+
+    async def export(self):
+        await self._timed("export", "GET", f"/pqp/pqp/{self._code()}/export/zip-csv")
+
+    async def run(self, weights: dict, deadline: float):
+        names = list(weights)
+        w = [weights[n] for n in names]
+        while time.monotonic() < deadline:
+            journey = self.rng.choices(names, w)[0]
+            await getattr(self, "import_" if journey == "import" else journey)()
+            if self.args.think > 0:
+                await asyncio.sleep(min(self.rng.expovariate(1 / self.args.think), self.args.think * 5))
+        await self.conn.close()
+
+
+def _json_ok(data: bytes) -> bool:
+    try:
+        return bool(json.loads(data.decode("utf-8").splitlines()[-1]).get("ok", True))
+    except (ValueError, IndexError, AttributeError):
+        return True
+
+
+# -------------------------- report --------------------------
+
+def _pct(sorted_vals, p):
+    if not sorted_vals:
+        return 0.0
+    return sorted_vals[min(len(sorted_vals) - 1, int(round(p / 100 * (len(sorted_vals) - 1))))]
+
+
+def report(stats: Stats, elapsed: float) -> dict:
+    out = {}
+    names = sorted(set(stats.lat) | set(stats.errors) | set(stats.busy))
+    print(f"{'journey':16s} {'ok':>7s} {'err':>5s} {'busy':>5s} {'req/s':>7s} "
+          f"{'p50':>8s} {'p90':>8s} {'p95':>8s} {'p99':>8s} {'max':>8s}")
+    total_ok = total_err = total_busy = 0
+    for n in names:
+        lat = sorted(stats.lat[n])
+        ok, err, busy = len(lat), stats.errors[n], stats.busy[n]
+        total_ok, total_err, total_busy = total_ok + ok, total_err + err, total_busy + busy
+        row = {"ok": ok, "errors": err, "busy": busy, "rps": (ok + err + busy) / elapsed,
+               "error_rate": err / max(ok + err + busy, 1),
+               "mean_ms": statistics.fmean(lat) if lat else 0.0,
+               **{f"p{p}_ms": _pct(lat, p) for p in (50, 90, 95, 99)},
+               "max_ms": lat[-1] if lat else 0.0,
+               "status": {str(k): v for k, v in stats.codes[n].items()}}
+        out[n] = row
+        print(f"{n:16s} {ok:7d} {err:5d} {busy:5d} {row['rps']:7.1f} {row['p50_ms']:8.1f} "
+              f"{row['p90_ms']:8.1f} {row['p95_ms']:8.1f} {row['p99_ms']:8.1f} {row['max_ms']:8.1f}")
+    total = total_ok + total_err + total_busy
+    print(f"\n{total} requests in {elapsed:.1f}s = {total / elapsed:.1f} req/s, "
+          f"errors {total_err / max(total, 1):.2%}, busy {total_busy / max(total, 1):.2%}")
+    return out
+
+
+# -------------------------- main --------------------------
+
+async def _fetch_columns(host, port, timeout):
+    conn = Connection(host, port, timeout)
+    try:
+        status, _, data = await conn.request("GET", f"/pqp/template/csv/{SECTION}")
+    finally:
+        await conn.close()
+    if status != 200:
+        raise SystemExit(f"GET /pqp/template/csv/{SECTION} -> {status}; is the app running?")
+    return next(csv.reader(io.StringIO(data.decode("utf-8-sig"))))
+
+
+async def run(args) -> dict:
+    u = urlsplit(args.base_url)
+    host, port = u.hostname, u.port or 80
+    columns = await _fetch_columns(host, port, args.timeout)
+    stats = Stats()
+    rng = random.Random(args.seed)
+    start = time.monotonic()
+    deadline = start + args.duration
+
+    async def one(i):
+        await asyncio.sleep(args.ramp * i / max(args.users, 1))
+        user = User(i, Connection(host, port, args.timeout), stats, args, columns,
+                    random.Random(rng.random()))
+        await user.run(PROFILES[args.profile], deadline)
+
+    print(f"profile={args.profile} users={args.users} think={args.think}s duration={args.duration}s\n")
+    await asyncio.gather(*(one(i) for i in range(args.users)))
+    elapsed = time.monotonic() - start
+    return {"profile": args.profile, "users": args.users, "think": args.think,
+            "duration": elapsed, "journeys": report(stats, elapsed)}
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--base-url", default="http://127.0.0.1:5000")
+    ap.add_argument("--profile", choices=sorted(PROFILES), default="mixed")
+    ap.add_argument("--users", type=int, default=20)
+    ap.add_argument("--think", type=float, default=1.0, help="mean think time between journeys (s)")
+    ap.add_argument("--duration", type=float, default=60.0, help="seconds")
+    ap.add_argument("--ramp", type=float, default=10.0, help="seconds to start all users")
+    ap.add_argument("--projects", type=int, default=1000, help="BENCH-* projects to spread over")
+    ap.add_argument("--timeout", type=float, default=60.0, help="per-request timeout (s)")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--json", help="write the report to this file")
+    args = ap.parse_args(argv)
+    if urlsplit(args.base_url).scheme != "http":
+        ap.error("only plain http:// base URLs are supported (run against a local server)")
+
+    result = asyncio.run(run(args))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(result, fh, indent=2)
+    return 1 if any(j["error_rate"] > 0.01 for j in result["journeys"].values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,245 @@
+"""
+Benchmark runner.
+
+Each benchmark is a setup function that returns the callable to time. The
+runner calls it --warmup times untimed, then --repeat times, and reports
+min / median / p95 / max in ms (plus rows/s where a benchmark knows its row
+count). --json writes the results; --compare reads an earlier --json file
+and prints the change in median per benchmark.
+
+    python -m benchmarks.run                              # everything
+    python -m benchmarks.run --only form,remap --repeat 50
+    python -m benchmarks.run --json after.json --compare before.json
+
+The database benchmarks (form, zip_export) pick projects from the BENCH-*
+portfolio written by benchmarks.generate and rotate through them so the
+row cache doesn't turn every run into the same hot lookup.
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import io
+import json
+import random
+import statistics
+import sys
+import time
+
+BENCHMARKS = {}
+
+
+def benchmark(name: str):
+    def deco(fn):
+        BENCHMARKS[name] = fn
+        return fn
+    return deco
+
+
+def _pct(sorted_vals, p):
+    if not sorted_vals:
+        return 0.0
+    k = min(len(sorted_vals) - 1, int(round(p / 100 * (len(sorted_vals) - 1))))
+    return sorted_vals[k]
+
+
+def _bench_codes(limit: int = 200):
+    from sqlalchemy import select
+    from app.extensions import db
+    from app.pqp.pqp_models import PQPSection
+    from benchmarks.generate import CODE_PREFIX
+    codes = db.session.execute(
+        select(PQPSection.project_code).where(PQPSection.project_code.like(f"{CODE_PREFIX}%"))
+        .distinct().order_by(PQPSection.project_code).limit(limit)).scalars().all()
+    if not codes:
+        raise SystemExit("no BENCH-* projects; run `python -m benchmarks.generate` first")
+    return codes
+
+
+def _synthetic_rows(cols, n, rng):
+    from benchmarks.generate import _words
+    from app.pqp.row_ids import new_row_ids
+    ids = new_row_ids(n)
+    return [{c: (ids[i] if c == "id" else _words(rng, 1, 5)) for c in cols} for i in range(n)]
+
+
+# -------------------------- benchmarks --------------------------
+
+@benchmark("form")
+def bench_form(ctx):
+    """GET /pqp/form/code/<code> (server-rendered active tab) through the test client."""
+    from flask import url_for
+    client = ctx["app"].test_client()
+    with ctx["app"].test_request_context():
+        urls = [url_for("pqp.pqp_form_by_code", code=c) for c in _bench_codes()]
+    it = iter(range(10 ** 9))
+
+    def run():
+        r = client.get(urls[next(it) % len(urls)])
+        assert r.status_code == 200, r.status_code
+    return run, None
+
+
+@benchmark("zip_export")
+def bench_zip_export(ctx):
+    """GET /pqp/pqp/<code>/export/zip-csv (all sections, deflated)."""
+    from flask import url_for
+    client = ctx["app"].test_client()
+    with ctx["app"].test_request_context():
+        urls = [url_for("pqp.pqp_export_zip_csv", code=c) for c in _bench_codes()]
+    it = iter(range(10 ** 9))
+
+    def run():
+        r = client.get(urls[next(it) % len(urls)])
+        assert r.status_code == 200, r.status_code
+        r.get_data()
+    return run, None
+
+
+@benchmark("remap")
+def bench_remap(ctx):
+    """_remap_db_row over 10k physical rows: half exact DB_TO_UI_COLS keys, half fuzzy."""
+    from app.pqp.pqp_routes import _remap_db_row
+    from app.pqp.registry import DB_TO_UI_COLS, SECTION_COLS
+    rng = ctx["rng"]
+    raws = []
+    for sec, labels in SECTION_COLS.items():
+        exact = list(DB_TO_UI_COLS.get(sec, {}))
+        fuzzy = [lbl.upper().replace(" ", "_") for lbl in labels if lbl != "id"]
+        for i in range(10_000 // len(SECTION_COLS)):
+            keys = exact if (i % 2 == 0 and exact) else fuzzy
+            raw = {k: f"v{rng.randint(0, 999)}" for k in keys}
+            raw["project_code"] = "BENCH-00001"
+            raws.append((sec, raw))
+
+    def run():
+        for sec, raw in raws:
+            _remap_db_row(sec, raw)
+    return run, len(raws)
+
+
+@benchmark("parse_workbook")
+def bench_parse_workbook(ctx):
+    """parse_workbook_to_payload on an in-memory workbook: 9 section sheets x 500 rows."""
+    from openpyxl import Workbook
+    from app.pqp.ingest.ai_import import parse_workbook_to_payload
+    from app.pqp.sections import DEFAULT_SECTION_TITLES, SECTION_DEFS
+    rng = ctx["rng"]
+    wb = Workbook()
+    wb.remove(wb.active)
+    n = 0
+    for idx, cols in enumerate(SECTION_DEFS, start=1):
+        ws = wb.create_sheet(DEFAULT_SECTION_TITLES.get(idx, f"Section {idx}")[:31])
+        ws.append([c for c in cols if c != "id"])
+        for r in _synthetic_rows(cols, 500, rng):
+            ws.append([r[c] for c in cols if c != "id"])
+            n += 1
+    buf = io.BytesIO()
+    wb.save(buf)
+    data = buf.getvalue()
+
+    def run():
+        parse_workbook_to_payload(io.BytesIO(data), "BENCH-00001")
+    return run, n
+
+
+@benchmark("csv_import")
+def bench_csv_import(ctx):
+    """CsvSectionImport.merge_into: 50k-row CSV (10% updates by id) into a 20k-row section."""
+    from app.pqp.ingest.csv_import import CsvSectionImport
+    from app.pqp.sections import SECTION_DEFS
+    rng = ctx["rng"]
+    cols = SECTION_DEFS[1]
+    existing = _synthetic_rows(cols, 20_000, rng)
+    incoming = _synthetic_rows(cols, 50_000, rng)
+    for i in range(0, 5_000):
+        incoming[i]["id"] = existing[i]["id"]
+    s = io.StringIO(newline="")
+    w = csv.writer(s)
+    w.writerow(cols)
+    w.writerows([r[c] for c in cols] for r in incoming)
+    data = s.getvalue().encode("utf-8")
+
+    def run():
+        rows = [dict(r) for r in existing]
+        imp = CsvSectionImport(io.BytesIO(data), cols, max_bytes=None)
+        for _ in imp.merge_into(rows):
+            pass
+    return run, len(incoming)
+
+
+@benchmark("dashboard_stats")
+def bench_dashboard_stats(ctx):
+    """dashboard_stats.compute: the tiles aggregate over every project, uncached."""
+    from app.extensions import db
+    from app.pqp.dashboard_stats import compute
+
+    def run():
+        compute(db.session.connection())
+    return run, None
+
+
+# -------------------------- runner --------------------------
+
+def run_one(name, ctx, repeat: int, warmup: int) -> dict:
+    call, rows = BENCHMARKS[name](ctx)
+    for _ in range(warmup):
+        call()
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        call()
+        times.append((time.perf_counter() - t0) * 1000)
+    times.sort()
+    out = {"n": repeat, "min_ms": times[0], "median_ms": statistics.median(times),
+           "p95_ms": _pct(times, 95), "max_ms": times[-1]}
+    if rows:
+        out["rows"] = rows
+        out["rows_per_s"] = rows / (out["median_ms"] / 1000) if out["median_ms"] else 0.0
+    return out
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--only", help=f"comma list of: {', '.join(BENCHMARKS)}")
+    ap.add_argument("--repeat", type=int, default=20)
+    ap.add_argument("--warmup", type=int, default=2)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--json", help="write results to this file")
+    ap.add_argument("--compare", help="earlier --json results to diff against")
+    args = ap.parse_args(argv)
+
+    names = [n.strip() for n in args.only.split(",")] if args.only else list(BENCHMARKS)
+    unknown = [n for n in names if n not in BENCHMARKS]
+    if unknown:
+        ap.error(f"unknown benchmark(s): {', '.join(unknown)}")
+
+    from dotenv import load_dotenv
+    from app import create_app
+    load_dotenv()
+    app = create_app()
+    ctx = {"app": app, "rng": random.Random(args.seed)}
+    baseline = {}
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as fh:
+            baseline = json.load(fh).get("results", {})
+
+    results = {}
+    print(f"{'benchmark':16s} {'min':>9s} {'median':>9s} {'p95':>9s} {'max':>9s} {'rows/s':>10s}  vs base")
+    with app.app_context():
+        for name in names:
+            r = results[name] = run_one(name, ctx, args.repeat, args.warmup)
+            base = baseline.get(name, {}).get("median_ms")
+            delta = f"{(r['median_ms'] / base - 1) * 100:+.1f}%" if base else ""
+            rate = f"{r['rows_per_s']:>10,.0f}" if "rows_per_s" in r else f"{'':>10s}"
+            print(f"{name:16s} {r['min_ms']:9.2f} {r['median_ms']:9.2f} {r['p95_ms']:9.2f} "
+                  f"{r['max_ms']:9.2f} {rate}  {delta}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump({"python": sys.version.split()[0], "seed": args.seed, "repeat": args.repeat,
+                       "results": results}, fh, indent=2)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,39 @@
+# gunicorn.conf.py — picked up automatically by `gunicorn` from the project root
+# (render.yaml / Procfile keep their command-line flags; these only add hooks).
+#
+# Works with and without --preload. With it, the app is imported once in the
+# master (warm-up then runs there and workers share it copy-on-write) and
+# post_fork below gives each worker fresh DB connections; without it every
+# worker imports and warms the app itself. Either way everything at module
+# level here runs before the app is loaded.
+import os
+import shutil
+
+# Prometheus multiprocess mode: every worker writes its metrics here and
+# /metrics merges them (app/metrics.py). The directory must exist, emptied of a
+# previous run's files (they'd be merged into the new counters), before any
+# prometheus_client metric is created. This file is read before gunicorn loads
+# the app, also under --preload, so it is set up here rather than in a hook.
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/pqp-prometheus")
+shutil.rmtree(os.environ["PROMETHEUS_MULTIPROC_DIR"], ignore_errors=True)
+os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+# Warm each worker at boot (app/warmup.py) so the first request after a deploy
+# doesn't pay for reflection, schema scans and template compilation.
+os.environ.setdefault("PQP_WARMUP", "1")
+
+
+def child_exit(server, worker):
+    # prometheus_client directly: importing app.metrics would load the whole app into the master
+    try:
+        from prometheus_client import multiprocess
+    except ImportError:
+        return
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def post_fork(server, worker):
+    # with --preload the app (and its connection pool) was created in the master
+    if server.cfg.preload_app:
+        from app.warmup import after_fork
+        after_fork()
@@ -0,0 +1,93 @@
+"""
+One-off cleanup: remove duplicate rows already stored in PQP sections.
+
+Repeated imports before the content-hash dedup could append the same row
+several times under different ids. A row counts as a duplicate when its
+content_hash (normalised non-empty fields, id ignored) matches an earlier
+row in the same section; the first occurrence is kept.
+
+    python scripts/dedupe_sections.py                 # dry run, all projects
+    python scripts/dedupe_sections.py --code P-0123   # dry run, one project
+    python scripts/dedupe_sections.py --apply         # write the changes
+
+Each section is rewritten in its own transaction under the section lock, so
+it is safe to run while the app is serving.
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from dotenv import load_dotenv
+from sqlalchemy import select
+
+from app import create_app, db
+from app.pqp.pqp_models import PQPSection
+from app.pqp.ingest.import_diff import dedupe_rows
+from app.pqp.section_lock import SectionBusy, lock_section
+
+
+def _rows(sec):
+    raw = sec.rows_json
+    if isinstance(raw, str):
+        try:
+            raw = json.loads(raw or "[]")
+        except Exception:
+            return []
+    return raw if isinstance(raw, list) else []
+
+
+def dedupe_section(sec_id, code, n, apply):
+    """Returns (rows_before, rows_removed) for one section."""
+    lock_section(db.session, code, n)
+    sec = db.session.execute(
+        select(PQPSection).where(PQPSection.id == sec_id).execution_options(populate_existing=True)
+    ).scalar_one()
+    rows = _rows(sec)
+    kept, removed = dedupe_rows(rows)
+    if removed and apply:
+        sec.rows_json = json.dumps(kept)
+        db.session.commit()
+    else:
+        db.session.rollback()
+    return len(rows), removed
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--code", help="only this project code")
+    ap.add_argument("--apply", action="store_true", help="write changes (default: dry run)")
+    args = ap.parse_args()
+
+    load_dotenv()
+    app = create_app()
+    with app.app_context():
+        q = select(PQPSection.id, PQPSection.project_code, PQPSection.section_number)
+        if args.code:
+            q = q.where(PQPSection.project_code == args.code)
+        targets = db.session.execute(q.order_by(PQPSection.project_code, PQPSection.section_number)).all()
+        db.session.rollback()
+
+        total_rows = total_removed = busy = 0
+        for sec_id, code, n in targets:
+            try:
+                before, removed = dedupe_section(sec_id, code, n, args.apply)
+            except SectionBusy:
+                busy += 1
+                print(f"busy:  {code} section {n} (skipped, run again later)")
+                continue
+            total_rows += before
+            total_removed += removed
+            if removed:
+                print(f"{'fixed' if args.apply else 'would'}: {code} section {n}: "
+                      f"{removed} of {before} rows are duplicates")
+
+        verb = "removed" if args.apply else "would remove"
+        print(f"{len(targets)} sections, {total_rows} rows, {verb} {total_removed}"
+              + (f", {busy} busy" if busy else ""))
+
+
+if __name__ == "__main__":
+    main()
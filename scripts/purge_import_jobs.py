@@ -0,0 +1,56 @@
+"""
+Import job retention, by hand (the app also runs it hourly from the AI
+import preview route).
+
+    python scripts/purge_import_jobs.py                  # env / default retention
+    python scripts/purge_import_jobs.py --preview-days 1 --keep-days 30
+    python scripts/purge_import_jobs.py --compress-legacy
+
+Deletes preview/failed jobs older than --preview-days, drops payload, diff
+and undo of committed jobs older than --keep-days, and with
+--compress-legacy moves pre-gzip payloads into payload_gz. Run
+scripts/upgrade_schema.py first on an existing database.
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from dotenv import load_dotenv
+from sqlalchemy import func
+
+from app import create_app, db
+from app.pqp.models_import import ImportJob
+from app.pqp.ingest.job_retention import KEEP_DAYS, PREVIEW_DAYS, compress_legacy, purge_import_jobs
+
+
+def _sizes():
+    n, raw, stored = db.session.query(
+        func.count(ImportJob.id),
+        func.coalesce(func.sum(ImportJob.payload_bytes), 0),
+        func.coalesce(func.sum(ImportJob.stored_bytes), 0),
+    ).one()
+    return f"{n} jobs, payloads {int(raw) / 1e6:.1f} MB raw / {int(stored) / 1e6:.1f} MB stored"
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--preview-days", type=int, default=PREVIEW_DAYS)
+    ap.add_argument("--keep-days", type=int, default=KEEP_DAYS)
+    ap.add_argument("--compress-legacy", action="store_true")
+    args = ap.parse_args()
+
+    load_dotenv()
+    app = create_app()
+    with app.app_context():
+        print("before:", _sizes())
+        if args.compress_legacy:
+            print("compressed legacy payloads:", compress_legacy(db.session))
+        res = purge_import_jobs(db.session, preview_days=args.preview_days, keep_days=args.keep_days)
+        print(f"deleted {res['deleted']} preview/failed jobs, archived {res['archived']} committed jobs")
+        print("after: ", _sizes())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Recompute pqp.project_summaries from scratch.
+
+Section and checklist writes keep the summaries current as they happen;
+this fills them in for existing data (after the table is first created by
+scripts/init_db.py) and, run nightly, refreshes what drifts with the date
+alone: inferred status past end_date and per-project overdue counts.
+
+    python scripts/rebuild_project_summaries.py                  # every ProjectRecords code
+    python scripts/rebuild_project_summaries.py --code 291RT --code "291RT P700"
+    python scripts/rebuild_project_summaries.py --batch 20
+
+Each batch holds the section locks of its projects (--batch x 9 advisory
+locks) while it runs; batches that can't get them in time are skipped and
+listed, run again for those codes.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from dotenv import load_dotenv
+
+from app import create_app, db
+from app.pqp.project_summary import available, rebuild
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--code", action="append", help="only these project codes (repeatable)")
+    ap.add_argument("--batch", type=int, default=50, help="projects per transaction")
+    args = ap.parse_args()
+
+    load_dotenv()
+    app = create_app()
+    with app.app_context():
+        if not available(db.session.connection()):
+            raise SystemExit("pqp.project_summaries does not exist; run scripts/init_db.py first")
+        t0 = time.perf_counter()
+        res = rebuild(db.session, codes=args.code, batch=args.batch)
+        print(f"rebuilt {res['written']} project summaries in {time.perf_counter() - t0:.1f}s")
+        if res["skipped"]:
+            print(f"skipped {len(res['skipped'])} (sections busy):", " ".join(res["skipped"]))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Stress test for concurrent section writes (lost-update check).
+
+Fires N concurrent "add row" saves at one PQP section, optionally mixed with
+CSV import commits into the same section, then counts the rows that landed.
+Every save appends a row with a unique marker, so any shortfall is a lost
+update.
+
+    # in-process (Flask test client, real database from DATABASE_URL)
+    python scripts/stress_section_saves.py --saves 300 --threads 32
+
+    # against a running server (e.g. gunicorn with 2 workers x 4 threads)
+    python scripts/stress_section_saves.py --base-url http://localhost:5000 --imports 10
+
+Exit code 0 when nothing was lost, 1 otherwise. Use a throwaway project code:
+the rows are left in place for inspection.
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import threading
+import time
+import urllib.parse
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+MARK_COL = "Project Description"   # a section 1 column (SECTION_DEFS[0])
+
+
+# -------------------------- transports --------------------------
+
+class HttpClient:
+    def __init__(self, base_url):
+        self.base = base_url.rstrip("/")
+
+    def post_form(self, path, data):
+        body = urllib.parse.urlencode(data).encode()
+        req = urllib.request.Request(self.base + path, data=body, method="POST",
+                                     headers={"Accept": "application/json"})
+        with urllib.request.urlopen(req, timeout=60) as r:
+            return r.status
+
+    def post_file(self, path, filename, content):
+        boundary = uuid.uuid4().hex
+        body = (f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"{filename}\"\r\n"
+                f"Content-Type: text/csv\r\n\r\n").encode() + content + f"\r\n--{boundary}--\r\n".encode()
+        req = urllib.request.Request(self.base + path, data=body, method="POST",
+                                     headers={"Content-Type": f"multipart/form-data; boundary={boundary}"})
+        with urllib.request.urlopen(req, timeout=120) as r:
+            return r.status
+
+    def get_json(self, path):
+        with urllib.request.urlopen(self.base + path, timeout=60) as r:
+            return json.loads(r.read())
+
+
+class AppClient:
+    """Flask test client; one per thread (each request gets its own app context)."""
+
+    def __init__(self):
+        from dotenv import load_dotenv
+        from app import create_app
+        load_dotenv()
+        self.app = create_app()
+        self._local = threading.local()
+
+    def _c(self):
+        if not hasattr(self._local, "c"):
+            self._local.c = self.app.test_client()
+        return self._local.c
+
+    def post_form(self, path, data):
+        return self._c().post(path, data=data, headers={"Accept": "application/json"}).status_code
+
+    def post_file(self, path, filename, content):
+        return self._c().post(path, data={"file": (io.BytesIO(content), filename)},
+                              content_type="multipart/form-data").status_code
+
+    def get_json(self, path):
+        return self._c().get(path).get_json()
+
+
+# -------------------------- run --------------------------
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--base-url", help="hit a running server instead of the in-process app")
+    ap.add_argument("--code", default="ZZ-STRESS", help="throwaway project code")
+    ap.add_argument("--saves", type=int, default=300)
+    ap.add_argument("--imports", type=int, default=0, help="concurrent CSV import commits")
+    ap.add_argument("--rows-per-import", type=int, default=20)
+    ap.add_argument("--threads", type=int, default=32)
+    args = ap.parse_args()
+
+    from app.pqp.sections import SECTION_DEFS
+    cols = SECTION_DEFS[0]
+    client = HttpClient(args.base_url) if args.base_url else AppClient()
+    run = uuid.uuid4().hex[:8]
+    code_q = urllib.parse.quote(args.code)
+    save_path = f"/pqp/pqp/{code_q}/section/0/save"
+    import_path = f"/pqp/pqp/import/{code_q}/0/commit"
+
+    def save(i):
+        data = {c: "" for c in cols if c != "id"}
+        data[MARK_COL] = f"stress-{run}-s{i}"
+        return client.post_form(save_path, data)
+
+    def import_csv(j):
+        buf = io.StringIO()
+        buf.write(",".join(f'"{c}"' for c in cols) + "\n")
+        for k in range(args.rows_per_import):
+            buf.write(",".join(f"stress-{run}-i{j}-{k}" if c == MARK_COL else "" for c in cols) + "\n")
+        return client.post_file(import_path, f"stress-{j}.csv", buf.getvalue().encode())
+
+    jobs = [("save", i) for i in range(args.saves)] + [("import", j) for j in range(args.imports)]
+    jobs.sort(key=lambda t: hash((run, t)))          # interleave saves and imports
+    statuses = {}
+    lock = threading.Lock()
+
+    def one(job):
+        kind, n = job
+        try:
+            st = save(n) if kind == "save" else import_csv(n)
+        except Exception as e:
+            st = f"error: {e.__class__.__name__}"
+        with lock:
+            statuses[(kind, st)] = statuses.get((kind, st), 0) + 1
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as ex:
+        list(ex.map(one, jobs))
+    elapsed = time.perf_counter() - t0
+
+    q = urllib.parse.urlencode({"per_page": 1, f"f.{MARK_COL}": f"stress-{run}-s"})
+    saved = client.get_json(f"/api/pqp/grid/{code_q}/1?{q}")["total"]
+    q = urllib.parse.urlencode({"per_page": 1, f"f.{MARK_COL}": f"stress-{run}-i"})
+    imported = client.get_json(f"/api/pqp/grid/{code_q}/1?{q}")["total"]
+
+    ok_saves = sum(n for (k, st), n in statuses.items() if k == "save" and st == 200)
+    ok_imports = sum(n for (k, st), n in statuses.items() if k == "import" and st == 200)
+    expected_imported = ok_imports * args.rows_per_import
+
+    print(f"run {run}: {len(jobs)} requests in {elapsed:.1f}s with {args.threads} threads")
+    for (k, st), n in sorted(statuses.items(), key=str):
+        print(f"  {k:6} {st}: {n}")
+    print(f"  saves:   {saved} rows stored / {ok_saves} accepted")
+    print(f"  imports: {imported} rows stored / {expected_imported} accepted")
+    try:
+        print("  lock stats:", client.get_json("/pqp/debug/locks"))
+    except Exception:
+        pass
+
+    lost = (ok_saves - saved) + (expected_imported - imported)
+    if lost:
+        print(f"FAIL: {lost} rows lost")
+        return 1
+    print("OK: no lost updates")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+"""
+Idempotent in-place schema upgrades for tables that already exist.
+
+db.create_all() (scripts/init_db.py, create_tables.py) only creates missing
+tables; it never adds columns to existing ones. Every model change that adds
+a column also appends its DDL here. Safe to run any number of times:
+
+    python scripts/upgrade_schema.py
+
+Running workers keep their cached table shapes (grid_data schema cache, the
+dashboard query built from them) until they restart, so restart the app
+after upgrading a live database.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from dotenv import load_dotenv
+from sqlalchemy import text
+
+from app import create_app, db
+
+# (description, statement) — run in order, each must be idempotent
+UPGRADES = [
+    ("import_jobs.diff (import diff preview)",
+     "alter table import_jobs add column if not exists diff json"),
+    ("import_jobs.undo (import rollback)",
+     "alter table import_jobs add column if not exists undo json"),
+    ("import_jobs.rolled_back_at",
+     "alter table import_jobs add column if not exists rolled_back_at timestamp"),
+    ("import_jobs.payload_gz (compressed payload)",
+     "alter table import_jobs add column if not exists payload_gz bytea"),
+    ("import_jobs.payload_bytes",
+     "alter table import_jobs add column if not exists payload_bytes integer"),
+    ("import_jobs.stored_bytes",
+     "alter table import_jobs add column if not exists stored_bytes integer"),
+    ("import_jobs.purged_at (retention)",
+     "alter table import_jobs add column if not exists purged_at timestamp"),
+    ("import_jobs created_at index (retention)",
+     "create index if not exists ix_import_jobs_status_created on import_jobs (status, created_at)"),
+]
+
+
+def main():
+    load_dotenv()
+    app = create_app()
+    with app.app_context():
+        for label, sql in UPGRADES:
+            db.session.execute(text(sql))
+            print("ok:", label)
+        db.session.commit()
+    print("done; restart the app so workers drop their cached table shapes")
+
+
+if __name__ == "__main__":
+    main()